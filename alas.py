@@ -9,6 +9,7 @@ from cached_property import cached_property
 
 from module.base.decorator import del_cached_property
 from module.config.config import AzurLaneConfig, TaskEnd
+from module.config.persistence import flush_all
 from module.config.utils import deep_get, deep_set
 from module.exception import *
 from module.logger import logger
@@ -131,13 +132,15 @@ class AzurLaneAutoScript:
                 content=f"<{self.config_name}> Exception occured",
             )
             exit(1)
+        finally:
+            # Write delayed config modifications at the end of each task, also before exiting on errors
+            flush_all()
 
     def save_error_log(self):
         """
         Save last 60 screenshots in ./log/error/<timestamp>
         Save logs to ./log/error/<timestamp>/log.txt
         """
-        from module.base.utils import save_image
         from module.handler.sensitive_info import (handle_sensitive_image,
                                                    handle_sensitive_logs)
         if self.config.Error_SaveError:
@@ -146,10 +149,12 @@ class AzurLaneAutoScript:
             folder = f'./log/error/{int(time.time() * 1000)}'
             logger.warning(f'Saving error: {folder}')
             os.mkdir(folder)
-            for data in self.device.screenshot_deque:
-                image_time = datetime.strftime(data['time'], '%Y-%m-%d_%H-%M-%S-%f')
-                image = handle_sensitive_image(data['image'])
-                save_image(image, f'{folder}/{image_time}.png')
+            # Dump compressed screenshots only, PNG encoding takes seconds.
+            # Sensitive info is masked before dumping, so no raw screenshot is left on disk.
+            # Screenshots are converted to PNG on demand.
+            self.device.screenshot_deque.dump(folder, handler=handle_sensitive_image)
+            logger.info(f'Screenshots are saved as lz4, convert them to PNG by: '
+                        f'python -m module.device.screenshot_buffer {folder}')
             with open(logger.log_file, 'r', encoding='utf-8') as f:
                 lines = f.readlines()
                 start = 0
@@ -427,19 +432,22 @@ class AzurLaneAutoScript:
         """
         future = future + timedelta(seconds=1)
         self.config.start_watching()
-        while 1:
-            if datetime.now() > future:
-                return True
-            if self.stop_event is not None:
-                if self.stop_event.is_set():
-                    logger.info("Update event detected")
-                    logger.info(f"[{self.config_name}] exited. Reason: Update")
-                    exit(0)
-
-            time.sleep(5)
-
-            if self.config.should_reload():
-                return False
+        with self.config.watch_changes() as watch:
+            while 1:
+                now = datetime.now()
+                if now > future:
+                    return True
+                if self.stop_event is not None:
+                    if self.stop_event.is_set():
+                        logger.info("Update event detected")
+                        logger.info(f"[{self.config_name}] exited. Reason: Update")
+                        exit(0)
+
+                # Wake up immediately on config changes, check stop event every 5s
+                timeout = min((future - now).total_seconds(), 5)
+                if watch.wait(timeout=max(timeout, 0)):
+                    if self.config.should_reload():
+                        return False
 
     def get_next_task(self):
         """
@@ -38,7 +38,9 @@ class ConfigModel:
     UseOcrServer: bool = False
     StartOcrServer: bool = False
     OcrServerPort: int = 22268
+    OcrServerWorkers: int = 1
     OcrClientAddress: str = "127.0.0.1:22268"
+    OcrCache: bool = True
 
     # Update
     EnableReload: bool = True
@@ -0,0 +1,92 @@
+import module.config.server as server
+
+server.server = 'cn'  # Don't need to edit, it's used to avoid error.
+
+import os
+import time
+
+import numpy as np
+from PIL import Image
+from scipy import optimize
+
+from module.config.config import AzurLaneConfig
+from module.map_detection.perspective import Perspective
+
+"""
+This file is use to compare the vanish point solver in Perspective.load against the old brute-force search.
+It will load each screenshot in a folder twice, outside Alas, and print the time cost of perspective calculation
+and the differences of detected lines.
+"""
+
+
+class BrutePerspective(Perspective):
+    """
+    Perspective calculation before the solver, for comparison.
+    """
+
+    def _vanish_point_solve(self):
+        return None
+
+    def _distant_point_solve(self):
+        return None
+
+
+def perspective_cost(persp, repeat=10):
+    """
+    Returns:
+        float: Time cost of solving vanish point and distant point in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        vanish_point = persp._vanish_point_solve()
+        if vanish_point is None:
+            vanish_point = optimize.brute(persp._vanish_point_value, persp.config.VANISH_POINT_RANGE)
+        persp.vanish_point = vanish_point
+        if persp._distant_point_solve() is None:
+            optimize.brute(persp._distant_point_value, persp.config.DISTANCE_POINT_X_RANGE)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def benchmark(folder, config):
+    """
+    Args:
+        folder (str): Folder of map screenshots, 1280x720.
+        config (AzurLaneConfig):
+    """
+    total_brute, total_solve = 0., 0.
+    for file in sorted(os.listdir(folder)):
+        if not file.endswith('.png'):
+            continue
+        image = np.array(Image.open(os.path.join(folder, file)).convert('RGB'))
+        brute, solve = BrutePerspective(config), Perspective(config)
+        try:
+            brute.load(image)
+            solve.load(image)
+        except Exception as e:
+            print(f'{file}: {e}')
+            continue
+
+        cost_brute, cost_solve = perspective_cost(brute), perspective_cost(solve)
+        total_brute += cost_brute
+        total_solve += cost_solve
+        same = len(brute.horizontal) == len(solve.horizontal) and len(brute.vertical) == len(solve.vertical) \
+            and np.allclose(brute.horizontal.mid, solve.horizontal.mid, atol=1) \
+            and np.allclose(brute.vertical.mid, solve.vertical.mid, atol=1)
+        print(f'{file}: brute {cost_brute:.2f}ms, solve {cost_solve:.2f}ms, '
+              f'vanish_point {np.round(brute.vanish_point)} -> {np.round(solve.vanish_point)}, '
+              f'distant_point {round(brute.distant_point[0])} -> {round(solve.distant_point[0])}, '
+              f'lines {"same" if same else "DIFFERENT"}')
+    print(f'Total: brute {total_brute:.2f}ms, solve {total_solve:.2f}ms')
+
+
+"""
+Step 1:
+    Put your folder of map screenshots here.
+"""
+folder = ''
+
+"""
+Step 2:
+    Run.
+"""
+benchmark(folder, AzurLaneConfig('template'))
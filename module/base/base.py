@@ -1,3 +1,4 @@
+from module.base.batch import ButtonBatch
 from module.base.button import Button
 from module.base.decorator import cached_property
 from module.base.timer import Timer
@@ -64,6 +65,10 @@ class ModuleBase:
     def emotion(self) -> Emotion:
         return Emotion(config=self.config)
 
+    @cached_property
+    def button_batch(self) -> ButtonBatch:
+        return ButtonBatch()
+
     def early_ocr_import(self):
         """
         Start a thread to import cnocr and mxnet while the Alas instance just starting to take screenshots
@@ -167,17 +172,56 @@ class ModuleBase:
         elif offset:
             if isinstance(offset, bool):
                 offset = self.config.BUTTON_OFFSET
-            appear = button.match(self.device.image, offset=offset,
-                                  threshold=self.config.BUTTON_MATCH_SIMILARITY if threshold is None else threshold)
+            appear = self.button_batch.match(
+                self.device.image, button, offset=offset,
+                threshold=self.config.BUTTON_MATCH_SIMILARITY if threshold is None else threshold)
         else:
-            appear = button.appear_on(self.device.image,
-                                      threshold=self.config.COLOR_SIMILAR_THRESHOLD if threshold is None else threshold)
+            appear = self.button_batch.appear_on(
+                self.device.image, button,
+                threshold=self.config.COLOR_SIMILAR_THRESHOLD if threshold is None else threshold)
 
         if appear and interval:
             self.interval_timer[button.name].reset()
 
         return appear
 
+    def appear_batch(self, buttons, offset=0, threshold=None):
+        """
+        Check a list of buttons on the current screenshot at once.
+        Results are memorized, following `appear()` calls on the same frame cost nothing.
+
+        Args:
+            buttons (list[Button, Template]):
+            offset (bool, int):
+            threshold (int, float): 0 to 1 if use offset, bigger means more similar,
+                0 to 255 if not use offset, smaller means more similar
+
+        Returns:
+            list[bool]: In the same order of `buttons`.
+
+        Examples:
+            ```
+            self.device.screenshot()
+            if any(self.appear_batch([POPUP_CONFIRM, POPUP_CANCEL], offset=(20, 20))):
+                pass
+            ```
+        """
+        for button in buttons:
+            self.device.stuck_record_add(button)
+
+        if offset:
+            if isinstance(offset, bool):
+                offset = self.config.BUTTON_OFFSET
+            result = self.button_batch.match_batch(
+                self.device.image, buttons, offset=offset,
+                threshold=self.config.BUTTON_MATCH_SIMILARITY if threshold is None else threshold)
+        else:
+            result = self.button_batch.appear_on_batch(
+                self.device.image, buttons,
+                threshold=self.config.COLOR_SIMILAR_THRESHOLD if threshold is None else threshold)
+
+        return result.tolist()
+
     def appear_then_click(self, button, screenshot=False, genre='items', offset=0, interval=0, threshold=None):
         button = self.ensure_button(button)
         appear = self.appear(button, offset=offset, interval=interval, threshold=threshold)
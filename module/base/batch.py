@@ -0,0 +1,169 @@
+import numpy as np
+
+from module.base.template import Template
+from module.base.utils import get_color
+
+
+class ButtonBatch:
+    """
+    Evaluate many buttons on the same screenshot, and memorize results of the current frame.
+
+    Screenshot is identified by object identity, `Device.screenshot()` always creates a new image,
+    so results are dropped automatically once a new screenshot is taken.
+    Calling `appear()` on the same button multiple times in one frame costs only a dict lookup.
+
+    Examples:
+        batch = ButtonBatch()
+        batch.appear_on_batch(image, [POPUP_CONFIRM, POPUP_CANCEL], threshold=10)
+        batch.match_batch(image, [GOTO_MAIN, BACK_ARROW], offset=(30, 30), threshold=0.85)
+    """
+
+    def __init__(self):
+        self.image = None
+        # Key: area, Value: (r, g, b)
+        self.color = {}
+        # Key: (area, id(template), offset), Value: (similarity, button_offset)
+        self.similarity = {}
+        # Key: (file, similarity), Value: bool
+        self.template = {}
+        self.hit = 0
+        self.miss = 0
+
+    def bind(self, image):
+        """
+        Args:
+            image (np.ndarray): Screenshot.
+        """
+        if image is not self.image:
+            self.image = image
+            self.color = {}
+            self.similarity = {}
+            self.template = {}
+
+    def get_color(self, area):
+        """
+        Args:
+            area (tuple):
+
+        Returns:
+            tuple: (r, g, b)
+        """
+        area = tuple(area)
+        try:
+            color = self.color[area]
+            self.hit += 1
+            return color
+        except KeyError:
+            self.miss += 1
+            color = get_color(self.image, area)
+            self.color[area] = color
+            return color
+
+    def get_similarity(self, button, offset):
+        """
+        Args:
+            button (Button):
+            offset (int, tuple):
+
+        Returns:
+            float: Similarity, 0 to 1.
+        """
+        button.ensure_template()
+        key = (tuple(button.area), id(button.image), offset)
+        try:
+            similarity, button_offset = self.similarity[key]
+            self.hit += 1
+        except KeyError:
+            self.miss += 1
+            similarity, button_offset = button.match_similarity(self.image, offset=offset)
+            self.similarity[key] = (similarity, button_offset)
+        # Restore the side effect of Button.match()
+        button._button_offset = button_offset
+        return similarity
+
+    def appear_on(self, image, button, threshold=10):
+        """
+        Same as `Button.appear_on()`, but memorized.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            button (Button):
+            threshold (int): 0 to 255, smaller means more similar.
+
+        Returns:
+            bool:
+        """
+        return bool(self.appear_on_batch(image, [button], threshold=threshold)[0])
+
+    def appear_on_batch(self, image, buttons, threshold=10):
+        """
+        Color detection on a list of buttons in one vectorized comparison.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            buttons (list[Button]):
+            threshold (int): 0 to 255, smaller means more similar.
+
+        Returns:
+            np.ndarray: Array of bool, in the same order of `buttons`.
+        """
+        self.bind(image)
+        if not len(buttons):
+            return np.array([], dtype=bool)
+        # Same as color_similar(), average colors are truncated to int
+        colors = np.array([self.get_color(button.area) for button in buttons]).astype(int)
+        expected = np.array([button.color for button in buttons]).astype(int)
+        diff = colors - expected
+        diff = np.max(np.maximum(diff, 0), axis=1) - np.min(np.minimum(diff, 0), axis=1)
+        return diff <= threshold
+
+    def match(self, image, button, offset=30, threshold=0.85):
+        """
+        Same as `Button.match()`, but memorized.
+        Results are cached as similarity, so checks under different thresholds still share the same cache.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            button (Button, Template):
+            offset (int, tuple): Detection area offset.
+            threshold (float): 0 to 1, bigger means more similar.
+
+        Returns:
+            bool:
+        """
+        self.bind(image)
+        if isinstance(button, Template):
+            key = (button.file, threshold)
+            try:
+                appear = self.template[key]
+                self.hit += 1
+            except KeyError:
+                self.miss += 1
+                appear = button.match(image, similarity=threshold)
+                self.template[key] = appear
+            return appear
+
+        return self.get_similarity(button, offset) > threshold
+
+    def match_batch(self, image, buttons, offset=30, threshold=0.85):
+        """
+        Template matching on a list of buttons.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            buttons (list[Button, Template]):
+            offset (int, tuple): Detection area offset.
+            threshold (float): 0 to 1, bigger means more similar.
+
+        Returns:
+            np.ndarray: Array of bool, in the same order of `buttons`.
+        """
+        self.bind(image)
+        return np.array([self.match(image, button, offset=offset, threshold=threshold) for button in buttons],
+                        dtype=bool)
+
+    def clear(self):
+        self.image = None
+        self.color = {}
+        self.similarity = {}
+        self.template = {}
@@ -5,6 +5,7 @@ import imageio
 from PIL import ImageDraw
 
 from module.base.decorator import cached_property
+from module.base.frame import FRAME_CACHE
 from module.base.resource import Resource
 from module.base.utils import *
 from module.config.server import VALID_SERVER
@@ -218,7 +219,7 @@ class Button(Resource):
                 offset = np.array(offset)
         else:
             offset = np.array((-3, -offset, 3, offset))
-        image = crop(image, offset + self.area, copy=False)
+        image = FRAME_CACHE.crop(image, offset + self.area)
 
         if self.is_gif:
             for template in self.image:
@@ -234,6 +235,39 @@ class Button(Resource):
             self._button_offset = area_offset(self._button, offset[:2] + np.array(point))
             return similarity > threshold
 
+    def match_similarity(self, image, offset=30):
+        """
+        Template matching without threshold, returns the best similarity among all frames.
+
+        Args:
+            image: Screenshot.
+            offset (int, tuple): Detection area offset.
+
+        Returns:
+            float: 0-1. Similarity.
+            tuple: Button area after offset.
+        """
+        self.ensure_template()
+
+        if isinstance(offset, tuple):
+            if len(offset) == 2:
+                offset = np.array((-offset[0], -offset[1], offset[0], offset[1]))
+            else:
+                offset = np.array(offset)
+        else:
+            offset = np.array((-3, -offset, 3, offset))
+        image = FRAME_CACHE.crop(image, offset + self.area)
+
+        templates = self.image if self.is_gif else [self.image]
+        similarity, point = -1., (0, 0)
+        for template in templates:
+            res = cv2.matchTemplate(template, image, cv2.TM_CCOEFF_NORMED)
+            _, sim, _, loc = cv2.minMaxLoc(res)
+            if sim > similarity:
+                similarity, point = sim, loc
+        button_offset = area_offset(self._button, offset[:2] + np.array(point))
+        return similarity, button_offset
+
     def match_binary(self, image, offset=30, threshold=0.85):
         """Detects button by template matching. To Some button, its location may not be static.
            This method will apply template matching under binarization.
@@ -256,14 +290,11 @@ class Button(Resource):
                 offset = np.array(offset)
         else:
             offset = np.array((-3, -offset, 3, offset))
-        image = crop(image, offset + self.area, copy=False)
+        # graying and binarization
+        image_binary = FRAME_CACHE.binary(image, offset + self.area)
 
         if self.is_gif:
             for template in self.image_binary:
-                # graying
-                image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                # binarization
-                _, image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
                 # template matching
                 res = cv2.matchTemplate(template, image_binary, cv2.TM_CCOEFF_NORMED)
                 _, similarity, _, point = cv2.minMaxLoc(res)
@@ -272,10 +303,6 @@ class Button(Resource):
                     return True
             return False
         else:
-            # graying
-            image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            # binarization
-            _, image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
             # template matching
             res = cv2.matchTemplate(self.image_binary, image_binary, cv2.TM_CCOEFF_NORMED)
             _, similarity, _, point = cv2.minMaxLoc(res)
@@ -304,10 +331,9 @@ class Button(Resource):
                 offset = np.array(offset)
         else:
             offset = np.array((-3, -offset, 3, offset))
-        image = crop(image, offset + self.area, copy=False)
+        image_luma = FRAME_CACHE.luma(image, offset + self.area)
 
         if self.is_gif:
-            image_luma = rgb2luma(image)
             for template in self.image_luma:
                 res = cv2.matchTemplate(template, image_luma, cv2.TM_CCOEFF_NORMED)
                 _, similarity, _, point = cv2.minMaxLoc(res)
@@ -315,7 +341,6 @@ class Button(Resource):
                 if similarity > threshold:
                     return True
         else:
-            image_luma = rgb2luma(image)
             res = cv2.matchTemplate(self.image_luma, image_luma, cv2.TM_CCOEFF_NORMED)
             _, similarity, _, point = cv2.minMaxLoc(res)
             self._button_offset = area_offset(self._button, offset[:2] + np.array(point))
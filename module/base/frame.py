@@ -0,0 +1,182 @@
+from module.base.utils import *
+
+
+class FrameCache:
+    """
+    Cache of images derived from the current screenshot, such as crops, gray, luma and binary images.
+
+    The cache is bound to the screenshot by object identity.
+    `Device.image` binds a new frame on every assignment, so the cache is dropped automatically
+    once a new screenshot is taken. Images other than the current screenshot are never cached,
+    methods here just compute them directly.
+
+    Results are shared between callers, don't modify them in place.
+
+    Examples:
+        from module.base.frame import FRAME_CACHE
+        luma = FRAME_CACHE.luma(self.device.image, area=(100, 100, 200, 150))
+    """
+
+    def __init__(self):
+        # (image, cache) in one tuple, so they can be swapped atomically
+        # in case worker threads are reading the previous frame.
+        self._frame = (None, {})
+        self.hit = 0
+        self.miss = 0
+
+    @property
+    def image(self):
+        return self._frame[0]
+
+    def bind(self, image):
+        """
+        Args:
+            image (np.ndarray): New screenshot.
+        """
+        if image is not self._frame[0]:
+            self._frame = (image, {})
+
+    def clear(self):
+        self._frame = (None, {})
+
+    def reset_stats(self):
+        self.hit = 0
+        self.miss = 0
+
+    @property
+    def stats(self):
+        """
+        Returns:
+            dict: hit, miss, rate and amount of cached images of the current frame.
+        """
+        total = self.hit + self.miss
+        return {
+            'hit': self.hit,
+            'miss': self.miss,
+            'rate': self.hit / total if total else 0.,
+            'cached': len(self._frame[1]),
+        }
+
+    def get(self, image, key, func):
+        """
+        Args:
+            image (np.ndarray): Screenshot.
+            key (tuple): Cache key in the current frame.
+            func (callable): Function to generate the result, if cache missed.
+
+        Returns:
+            Any:
+        """
+        frame, cache = self._frame
+        if image is not frame:
+            return func()
+        try:
+            result = cache[key]
+            self.hit += 1
+            return result
+        except KeyError:
+            self.miss += 1
+            result = func()
+            cache[key] = result
+            return result
+
+    @staticmethod
+    def _area(area):
+        return None if area is None else tuple(map(int, map(round, area)))
+
+    def crop(self, image, area):
+        """
+        Same as `crop(image, area, copy=False)`.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            area (tuple):
+
+        Returns:
+            np.ndarray:
+        """
+        area = self._area(area)
+        return self.get(image, ('crop', area), lambda: crop(image, area, copy=False))
+
+    def _crop_or_full(self, image, area):
+        return image if area is None else self.crop(image, area)
+
+    def gray(self, image, area=None):
+        """
+        Same as `rgb2gray()` on the crop.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            area (tuple): Area to crop, or None for the whole screenshot.
+
+        Returns:
+            np.ndarray: Shape (height, width)
+        """
+        area = self._area(area)
+        return self.get(image, ('gray', area), lambda: rgb2gray(self._crop_or_full(image, area)))
+
+    def luma(self, image, area=None):
+        """
+        Same as `rgb2luma()` on the crop.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            area (tuple): Area to crop, or None for the whole screenshot.
+
+        Returns:
+            np.ndarray: Shape (height, width)
+        """
+        area = self._area(area)
+        return self.get(image, ('luma', area), lambda: rgb2luma(self._crop_or_full(image, area)))
+
+    def hsv(self, image, area=None):
+        """
+        Same as `rgb2hsv()` on the crop.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            area (tuple): Area to crop, or None for the whole screenshot.
+
+        Returns:
+            np.ndarray: Hue (0~360), Saturation (0~100), Value (0~100).
+        """
+        area = self._area(area)
+        return self.get(image, ('hsv', area), lambda: rgb2hsv(self._crop_or_full(image, area)))
+
+    def yuv(self, image, area=None):
+        """
+        Same as `rgb2yuv()` on the crop.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            area (tuple): Area to crop, or None for the whole screenshot.
+
+        Returns:
+            np.ndarray: Shape (height, width, channel)
+        """
+        area = self._area(area)
+        return self.get(image, ('yuv', area), lambda: rgb2yuv(self._crop_or_full(image, area)))
+
+    def binary(self, image, area=None):
+        """
+        Graying and OTSU binarization, the same as the pre-processing in `Button.match_binary()`.
+        OTSU threshold depends on the whole input, so results are cached per area.
+
+        Args:
+            image (np.ndarray): Screenshot.
+            area (tuple): Area to crop, or None for the whole screenshot.
+
+        Returns:
+            np.ndarray: Shape (height, width)
+        """
+        area = self._area(area)
+
+        def func():
+            image_gray = cv2.cvtColor(self._crop_or_full(image, area), cv2.COLOR_BGR2GRAY)
+            _, image_binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+            return image_binary
+
+        return self.get(image, ('binary', area), func)
+
+
+FRAME_CACHE = FrameCache()
@@ -1,14 +1,15 @@
 import copy
 import datetime
-import operator
 import threading
 
 import pywebio
 
-from module.base.filter import Filter
+from module.base.decorator import cached_property
 from module.config.config_generated import GeneratedConfig
 from module.config.config_manual import ManualConfig, OutputConfig
 from module.config.config_updater import ConfigUpdater
+from module.config.persistence import LOCK, WriteBehind, file_stamp
+from module.config.scheduler import Function, TaskScheduler
 from module.config.watcher import ConfigWatcher
 from module.config.utils import *
 from module.exception import RequestHumanTakeover, ScriptError
@@ -20,28 +21,6 @@ class TaskEnd(Exception):
     pass
 
 
-class Function:
-    def __init__(self, data):
-        self.enable = deep_get(data, keys="Scheduler.Enable", default=False)
-        self.command = deep_get(data, keys="Scheduler.Command", default="Unknown")
-        self.next_run = deep_get(data, keys="Scheduler.NextRun", default=DEFAULT_TIME)
-
-    def __str__(self):
-        enable = "Enable" if self.enable else "Disable"
-        return f"{self.command} ({enable}, {str(self.next_run)})"
-
-    __repr__ = __str__
-
-    def __eq__(self, other):
-        if not isinstance(other, Function):
-            return False
-
-        if self.command == other.command and self.next_run == other.next_run:
-            return True
-        else:
-            return False
-
-
 def name_to_function(name):
     """
     Args:
@@ -62,13 +41,19 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
 
     # Class property
     is_hoarding_task = True
+    # Seconds to merge modifications of bound arguments into one write, 0 to write immediately.
+    WRITE_BEHIND_DELAY = 1.
 
     def __setattr__(self, key, value):
         if key in self.bound:
             path = self.bound[key]
-            self.modified[path] = value
-            if self.auto_update:
-                self.update()
+            with LOCK:
+                self.modified[path] = value
+                # In multi_set(), modifications are applied together by update() on exit
+                if self.auto_update:
+                    if key not in self.overridden:
+                        super().__setattr__(key, value)
+                    self.writer.schedule()
         else:
             super().__setattr__(key, value)
 
@@ -85,6 +70,8 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
         self.bound = {}
         # If write after every variable modification.
         self.auto_update = True
+        # Writes of variable modifications are merged and delayed.
+        self.writer = WriteBehind(self.config_file, flush=self.flush, delay=self.WRITE_BEHIND_DELAY)
         # Force override variables
         # Key: Argument name in GeneratedConfig. Value: Modified value.
         self.overridden = {}
@@ -122,11 +109,24 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
         self.save()
 
     def load(self):
-        self.data = self.read_file(self.config_name)
-        self.config_override()
-
-        for path, value in self.modified.items():
-            deep_set(self.data, keys=path, value=value)
+        """
+        Returns:
+            bool: If config file was read again, because it was changed by others.
+        """
+        with LOCK:
+            WriteBehind.flush_file(self.writer.file, exclude=self.writer)
+            # Re-read only if file changed since last read or write
+            changed = self.writer.is_modified()
+            if changed:
+                stamp = file_stamp(self.writer.file)
+                self.data = self.read_file(self.config_name)
+                self.writer.record(stamp)
+            self.config_override()
+
+            for path, value in self.modified.items():
+                deep_set(self.data, keys=path, value=value)
+                self.scheduler.touch(path)
+            return changed
 
     def bind(self, func, func_list=None):
         """
@@ -179,6 +179,14 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
         for arg, value in self.overridden.items():
             super().__setattr__(arg, value)
 
+    @cached_property
+    def scheduler(self):
+        """
+        Scheduler index, updated incrementally in `get_next_task()`.
+        Paths set into `self.data` should be told by `scheduler.touch()`.
+        """
+        return TaskScheduler(self.SCHEDULER_PRIORITY)
+
     @property
     def hoarding(self):
         minutes = int(
@@ -202,35 +210,14 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
         """
         Calculate tasks, set pending_task and waiting_task
         """
-        pending = []
-        waiting = []
-        error = []
         now = datetime.now()
         if AzurLaneConfig.is_hoarding_task:
             now -= self.hoarding
-        for func in self.data.values():
-            func = Function(func)
-            if not func.enable:
-                continue
-            if not isinstance(func.next_run, datetime):
-                error.append(func)
-            elif func.next_run < now:
-                pending.append(func)
-            else:
-                waiting.append(func)
-
-        f = Filter(regex=r"(.*)", attr=["command"])
-        f.load(self.SCHEDULER_PRIORITY)
-        if pending:
-            pending = f.apply(pending)
-        if waiting:
-            waiting = f.apply(waiting)
-            waiting = sorted(waiting, key=operator.attrgetter("next_run"))
-        if error:
-            pending = error + pending
+        self.scheduler.sync(self.data)
+        self.scheduler.refresh(now)
 
-        self.pending_task = pending
-        self.waiting_task = waiting
+        self.pending_task = self.scheduler.pending
+        self.waiting_task = self.scheduler.waiting
 
     def get_next(self):
         """
@@ -260,24 +247,59 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
             raise RequestHumanTakeover
 
     def save(self, mod_name='alas'):
-        if not self.modified:
-            return False
+        with LOCK:
+            if not self.modified:
+                return False
 
-        for path, value in self.modified.items():
-            deep_set(self.data, keys=path, value=value)
+            modified = self.modified.copy()
+            for path, value in modified.items():
+                deep_set(self.data, keys=path, value=value)
+                self.scheduler.touch(path)
 
-        logger.info(
-            f"Save config {filepath_config(self.config_name, mod_name)}, {dict_to_kv(self.modified)}"
-        )
-        # Don't use self.modified = {}, that will create a new object.
-        self.modified.clear()
-        self.write_file(self.config_name, data=self.data)
+            logger.info(
+                f"Save config {filepath_config(self.config_name, mod_name)}, {dict_to_kv(modified)}"
+            )
+            self.write_file(self.config_name, data=self.data)
+            self.writer.record(written=True)
+            # Don't use self.modified = {}, that will create a new object.
+            # Keep the ones modified during writing.
+            for path, value in modified.items():
+                if self.modified.get(path, None) is value:
+                    self.modified.pop(path, None)
+            return True
+
+    def flush(self):
+        """
+        Write pending modifications.
+        Called by write-behind timer and at task ends.
+        Arguments are bound again if config file was changed by others, same as `update()`.
+        """
+        with LOCK:
+            self.writer.cancel()
+            if not self.modified:
+                return False
+            if self.load() and self.task is not None:
+                self.bind(self.task)
+            return self.save()
+
+    def start_watching(self):
+        # Write pending modifications first, so a delayed write is not noticed as a config change
+        self.writer.watch()
+        super().start_watching()
+
+    def should_reload(self):
+        # Writes of our own are not config changes
+        if self.writer.is_own_change():
+            return False
+        return super().should_reload()
 
     def update(self):
-        self.load()
-        self.config_override()
-        self.bind(self.task)
-        self.save()
+        with LOCK:
+            self.writer.cancel()
+            self.load()
+            self.config_override()
+            self.bind(self.task)
+            self.save()
 
     def override(self, **kwargs):
         now = datetime.now().replace(microsecond=0)
@@ -293,6 +315,7 @@ class AzurLaneConfig(ConfigUpdater, ManualConfig, GeneratedConfig, ConfigWatcher
                 )
                 if isinstance(next_run, datetime) and next_run > limit:
                     deep_set(self.data, keys=f"{task}.Scheduler.NextRun", value=now)
+                    self.scheduler.touch(f"{task}.Scheduler.NextRun")
 
         for task in ["Commission", "Research", "Reward"]:
             if not self.is_task_enabled(task):
@@ -73,6 +73,20 @@ class ManualConfig:
     module.device
     """
     DEVICE_OVER_HTTP = False
+    # Run short read-only shell queries (getprop, dumpsys, pm list, ps) through one long-lived `adb shell`
+    # on each device, instead of opening a new adb connection for every command.
+    # Other commands always use their own connection, see ShellSession.ALLOWED
+    DEVICE_SHELL_SESSION = True
+    # Seconds to cache system properties from getprop
+    DEVICE_PROP_CACHE_TTL = 300
+    # Capture screenshots in background thread, to overlap capturing with image detection.
+    # Useful on slow screenshot methods like ADB.
+    DEVICE_SCREENSHOT_PREFETCH = False
+    # Max seconds since a prefetched screenshot was captured
+    DEVICE_SCREENSHOT_PREFETCH_STALENESS = 0.5
+    # Track latency and failures of screenshot methods, switch to the fastest healthy one at runtime.
+    # Only switch between methods tested in screenshot benchmark, switches are not saved to user config.
+    DEVICE_SCREENSHOT_ADAPTIVE = False
     FORWARD_PORT_RANGE = (20000, 21000)
     REVERSE_SERVER_PORT = 7903
 
@@ -215,6 +229,11 @@ class ManualConfig:
     HOMO_EDGE_DETECT = True
     HOMO_EDGE_HOUGHLINES_THRESHOLD = 180
     HOMO_EDGE_COLOR_RANGE = (0, 33)
+    # Predict grid lattice from the previous detection and swipe vector,
+    # check HOMO_TRACK_TILES tiles within HOMO_TRACK_RANGE pixels, search the whole image if failed.
+    HOMO_TRACK = True
+    HOMO_TRACK_RANGE = 20
+    HOMO_TRACK_TILES = 9
     # ((x, y), [upper-left, upper-right, bottom-left, bottom-right])
     HOMO_STORAGE = None
 
@@ -247,6 +266,11 @@ class ManualConfig:
     # Parameters for perspective calculating
     VANISH_POINT_RANGE = ((540, 740), (-3000, -1000))
     DISTANCE_POINT_X_RANGE = ((-3200, -1600),)
+    # Vanish point and distant point are solved from line intersections,
+    # brute force search over the ranges above is used if the fitting is bad.
+    VANISH_POINT_INLIER_THRESHOLD = 30
+    VANISH_POINT_RESIDUAL_THRESHOLD = 15
+    DISTANT_POINT_INLIER_THRESHOLD = 3
     # Parameters for line cleansing
     COINCIDENT_POINT_ENCOURAGE_DISTANCE = 3
     ERROR_LINES_TOLERANCE = (-10, 10)
@@ -0,0 +1,183 @@
+import atexit
+import os
+import signal
+import threading
+import weakref
+
+from module.logger import logger
+
+# One lock shared by all config objects in this process.
+# Config objects of the same file flush each other before reading, a shared lock prevents deadlock.
+LOCK = threading.RLock()
+_WRITERS = weakref.WeakSet()
+
+
+def file_stamp(file):
+    """
+    Args:
+        file (str):
+
+    Returns:
+        tuple: (mtime_ns, size, inode), or None if file not exists.
+            Atomic writes replace the file, so inode changes even if mtime resolution is low.
+    """
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class WriteBehind:
+    """
+    Coalesce config writes.
+
+    Assigning a bound argument used to read the whole config file and write it back immediately.
+    Now modifications are collected, and written in one atomic write after `delay` seconds,
+    or at checkpoints such as `AzurLaneConfig.update()`, whichever comes first.
+
+    It also remembers the file stamp of the last read or write,
+    so a config file that nobody else has touched doesn't need to be read again.
+    """
+
+    def __init__(self, file, flush, delay=1.):
+        """
+        Args:
+            file (str): Path to config file.
+            flush (callable): Function to write modifications, called with LOCK held.
+            delay (float): Seconds to wait before writing, 0 to write immediately.
+        """
+        self.file = file
+        self._flush = flush
+        self.delay = delay
+        self.timer = None
+        self.stamp = None
+        # Stamp of our last write
+        self.written = None
+        # If file was read again, after others changed it, since `watch()`
+        self.changed = False
+        with LOCK:
+            _WRITERS.add(self)
+
+    @property
+    def pending(self):
+        return self.timer is not None
+
+    def schedule(self):
+        """
+        Request a write. Requests within the delay are merged into one write.
+        """
+        with LOCK:
+            if self.delay <= 0:
+                self.flush()
+                return
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self._on_timer)
+                self.timer.name = 'ConfigWriteBehind'
+                # Not a daemon thread, so pending writes are done before process exits
+                self.timer.start()
+
+    def cancel(self):
+        with LOCK:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+    def flush(self):
+        """
+        Write pending modifications now.
+        """
+        with LOCK:
+            self.cancel()
+            self._flush()
+
+    def _on_timer(self):
+        with LOCK:
+            # Cancelled or flushed by a checkpoint while waiting for lock
+            if self.timer is not threading.current_thread():
+                return
+            self.timer = None
+            try:
+                self._flush()
+            except Exception as e:
+                logger.exception(e)
+
+    def is_modified(self):
+        """
+        Returns:
+            bool: If file changed since the last `record()`.
+        """
+        return self.stamp is None or file_stamp(self.file) != self.stamp
+
+    def record(self, stamp=None, written=False):
+        """
+        Args:
+            stamp (tuple): File stamp taken before reading, or None to stat now.
+            written (bool): True if recording our own write, False if recording a read.
+        """
+        if not written and self.stamp is not None:
+            self.changed = True
+        self.stamp = stamp if stamp is not None else file_stamp(self.file)
+        if written:
+            self.written = self.stamp
+
+    def watch(self):
+        """
+        Write pending modifications, then start telling own writes apart from changes made by others.
+        """
+        with LOCK:
+            self.flush()
+            self.changed = False
+
+    def is_own_change(self):
+        """
+        Returns:
+            bool: If file is changed by our own writes only, since `watch()`.
+        """
+        with LOCK:
+            return not self.changed and self.written is not None and file_stamp(self.file) == self.written
+
+    @staticmethod
+    def flush_file(file, exclude=None):
+        """
+        Write pending modifications from all config objects of the same file in this process,
+        so the file is up-to-date before reading.
+
+        Args:
+            file (str):
+            exclude (WriteBehind):
+        """
+        with LOCK:
+            for writer in list(_WRITERS):
+                if writer is not exclude and writer.pending and writer.file == file:
+                    writer.flush()
+
+
+def flush_all():
+    """
+    Write pending modifications of all config objects in this process.
+    """
+    with LOCK:
+        for writer in list(_WRITERS):
+            if writer.pending:
+                try:
+                    writer.flush()
+                except Exception as e:
+                    logger.exception(e)
+
+
+def _on_sigterm(signum, frame):
+    flush_all()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+# Writes are delayed, don't lose them on exit.
+# SIGKILL can't be handled, the delay is the most that can be lost.
+atexit.register(flush_all)
+if hasattr(signal, 'SIGTERM') and threading.current_thread() is threading.main_thread():
+    try:
+        if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, _on_sigterm)
+    except (ValueError, OSError):
+        pass
@@ -0,0 +1,348 @@
+import heapq
+import threading
+from datetime import datetime
+
+from module.base.filter import Filter
+from module.config.utils import DEFAULT_TIME, deep_get
+
+
+class Function:
+    def __init__(self, data):
+        self.enable = deep_get(data, keys="Scheduler.Enable", default=False)
+        self.command = deep_get(data, keys="Scheduler.Command", default="Unknown")
+        self.next_run = deep_get(data, keys="Scheduler.NextRun", default=DEFAULT_TIME)
+
+    def __str__(self):
+        enable = "Enable" if self.enable else "Disable"
+        return f"{self.command} ({enable}, {str(self.next_run)})"
+
+    __repr__ = __str__
+
+    def __eq__(self, other):
+        if not isinstance(other, Function):
+            return False
+
+        if self.command == other.command and self.next_run == other.next_run:
+            return True
+        else:
+            return False
+
+
+class ScheduledTask:
+    def __init__(self, key, signature, priority, version):
+        """
+        Args:
+            key (str): Task name in config data.
+            signature (tuple): (enable, command, next_run, order)
+            priority (int): Index of the first matched filter in SCHEDULER_PRIORITY,
+                or None if task doesn't match any.
+            version (int): Increased every time the task changes, to invalidate heap entries.
+        """
+        self.key = key
+        self.signature = signature
+        self.priority = priority
+        self.version = version
+        # 'pending', 'waiting', 'error', or None if not scheduled
+        self.state = None
+
+        enable, command, next_run, order = signature
+        self.order = order
+        self.function = Function({})
+        self.function.enable = enable
+        self.function.command = command
+        self.function.next_run = next_run
+
+
+class TaskScheduler:
+    """
+    Persistent index of the scheduler queue.
+
+    `AzurLaneConfig.get_next_task()` used to create Function objects for all tasks,
+    apply SCHEDULER_PRIORITY and sort them on every scheduling decision.
+    Here, tasks are kept in three heaps and updated incrementally:
+        error heap, keyed by order
+        waiting heap, keyed by (next_run, priority, order)
+        pending heap, keyed by (priority, order)
+    Config tells which paths it set into data by `touch()`, and `sync()` only re-indexes tasks touched.
+    All tasks are compared only if data is a new object, such as the config file being read again.
+    Outdated heap entries are dropped lazily.
+    `refresh()` moves tasks whose run time has been reached into pending heap.
+
+    The result is the same as the old implementation:
+        pending: tasks with invalid next_run in config order, then tasks sorted by priority
+        waiting: tasks sorted by next_run, then priority
+
+    Examples:
+        scheduler = TaskScheduler(SCHEDULER_PRIORITY)
+        scheduler.sync(config.data)
+        scheduler.refresh(datetime.now())
+        task = scheduler.next_task()
+
+        deep_set(config.data, keys='Commission.Scheduler.NextRun', value=now)
+        scheduler.touch('Commission.Scheduler.NextRun')
+        scheduler.sync(config.data)
+    """
+
+    def __init__(self, priority):
+        """
+        Args:
+            priority (str): Filter string, such as `Restart > Commission > Tactical`
+        """
+        self.filter = Filter(regex=r"(.*)", attr=["command"])
+        self.filter.load(priority)
+        # Key: command. Value: Index of the first matched filter.
+        self.priority_cache = {}
+        # Key: Task name in config data. Value: ScheduledTask
+        self.tasks = {}
+        self.error_heap = []
+        self.waiting_heap = []
+        self.pending_heap = []
+        # Config data of the last sync, and tasks touched since then
+        self._data = None
+        self._touched = set()
+        self.now = None
+        self._version = 0
+        # Increased every time the queue changes, callers can use it to skip redundant work.
+        self.revision = 0
+        self._cache_revision = -1
+        self._pending = []
+        self._waiting = []
+        self._lock = threading.RLock()
+
+    def get_priority(self, command):
+        """
+        Args:
+            command (str):
+
+        Returns:
+            int: Index of the first matched filter, or None if task doesn't match any.
+        """
+        try:
+            return self.priority_cache[command]
+        except KeyError:
+            pass
+
+        priority = None
+        obj = Function({})
+        obj.command = command
+        for index, f in enumerate(self.filter.filter):
+            if self.filter.apply_filter_to_obj(obj=obj, filter=f):
+                priority = index
+                break
+        self.priority_cache[command] = priority
+        return priority
+
+    def _set(self, key, signature):
+        self._version += 1
+        enable, command, next_run, order = signature
+        task = ScheduledTask(key, signature, priority=self.get_priority(command), version=self._version)
+        self.tasks[key] = task
+        if not enable:
+            pass
+        elif not isinstance(next_run, datetime):
+            task.state = 'error'
+            heapq.heappush(self.error_heap, (task.order, key, task.version))
+        elif task.priority is None:
+            # Dropped by SCHEDULER_PRIORITY
+            pass
+        elif self.now is not None and next_run < self.now:
+            task.state = 'pending'
+            heapq.heappush(self.pending_heap, (task.priority, task.order, key, task.version))
+        else:
+            task.state = 'waiting'
+            heapq.heappush(self.waiting_heap, (next_run, task.priority, task.order, key, task.version))
+
+    def _is_valid(self, key, version, state):
+        task = self.tasks.get(key)
+        return task is not None and task.version == version and task.state == state
+
+    @staticmethod
+    def signature(data, key, order):
+        """
+        Returns:
+            tuple: (enable, command, next_run, order)
+        """
+        value = data.get(key, {})
+        return (
+            deep_get(value, keys="Scheduler.Enable", default=False),
+            deep_get(value, keys="Scheduler.Command", default="Unknown"),
+            deep_get(value, keys="Scheduler.NextRun", default=DEFAULT_TIME),
+            order,
+        )
+
+    def touch(self, path):
+        """
+        Tell that a path in config data was set, task will be re-indexed in the next `sync()`.
+
+        Args:
+            path (str): Such as `Commission.Scheduler.NextRun`
+        """
+        key, _, path = path.partition('.')
+        if path.startswith('Scheduler.'):
+            with self._lock:
+                self._touched.add(key)
+
+    def sync(self, data):
+        """
+        Update the index from config data.
+        Only touched tasks are re-indexed, unless `data` is a new object.
+
+        Args:
+            data (dict): Config data.
+
+        Returns:
+            bool: If any task changed.
+        """
+        with self._lock:
+            touched, self._touched = self._touched, set()
+            if data is self._data and all(key in self.tasks for key in touched):
+                changed = False
+                for key in touched:
+                    signature = self.signature(data, key, self.tasks[key].order)
+                    if self.tasks[key].signature != signature:
+                        self._set(key, signature)
+                        changed = True
+            else:
+                changed = self._sync_all(data)
+                self._data = data
+
+            if changed:
+                self._compact()
+                self.revision += 1
+            return changed
+
+    def _sync_all(self, data):
+        """
+        Diff the `Scheduler` group of all tasks.
+
+        Returns:
+            bool: If any task changed.
+        """
+        changed = False
+        for order, key in enumerate(data.keys()):
+            signature = self.signature(data, key, order)
+            task = self.tasks.get(key)
+            if task is not None and task.signature == signature:
+                continue
+            self._set(key, signature)
+            changed = True
+        for key in list(self.tasks.keys()):
+            if key not in data:
+                self.tasks.pop(key)
+                changed = True
+        return changed
+
+    def refresh(self, now):
+        """
+        Move tasks between pending and waiting according to current time.
+
+        Args:
+            now (datetime): Tasks with next_run earlier than `now` are pending.
+                `now` may go backwards when task hoarding is toggled.
+
+        Returns:
+            bool: If any task moved.
+        """
+        with self._lock:
+            changed = False
+            if self.now is not None and now < self.now:
+                # Rare, re-check all pending tasks
+                pending = []
+                for entry in self.pending_heap:
+                    priority, order, key, version = entry
+                    if not self._is_valid(key, version, 'pending'):
+                        continue
+                    task = self.tasks[key]
+                    if task.function.next_run < now:
+                        pending.append(entry)
+                    else:
+                        task.state = 'waiting'
+                        heapq.heappush(self.waiting_heap, (task.function.next_run, priority, order, key, version))
+                        changed = True
+                heapq.heapify(pending)
+                self.pending_heap = pending
+            self.now = now
+
+            while self.waiting_heap:
+                next_run, priority, order, key, version = self.waiting_heap[0]
+                if not self._is_valid(key, version, 'waiting'):
+                    heapq.heappop(self.waiting_heap)
+                    continue
+                if next_run >= now:
+                    break
+                heapq.heappop(self.waiting_heap)
+                self.tasks[key].state = 'pending'
+                heapq.heappush(self.pending_heap, (priority, order, key, version))
+                changed = True
+
+            if changed:
+                self.revision += 1
+            return changed
+
+    def _compact(self):
+        """
+        Rebuild heaps if there are too many outdated entries.
+        """
+        limit = len(self.tasks) * 2 + 16
+        if len(self.error_heap) > limit:
+            self.error_heap = [e for e in self.error_heap if self._is_valid(e[1], e[2], 'error')]
+            heapq.heapify(self.error_heap)
+        if len(self.waiting_heap) > limit:
+            self.waiting_heap = [e for e in self.waiting_heap if self._is_valid(e[3], e[4], 'waiting')]
+            heapq.heapify(self.waiting_heap)
+        if len(self.pending_heap) > limit:
+            self.pending_heap = [e for e in self.pending_heap if self._is_valid(e[2], e[3], 'pending')]
+            heapq.heapify(self.pending_heap)
+
+    def _peek(self, heap, state):
+        while heap:
+            entry = heap[0]
+            if self._is_valid(entry[-2], entry[-1], state):
+                return self.tasks[entry[-2]].function
+            heapq.heappop(heap)
+        return None
+
+    def next_task(self):
+        """
+        Returns:
+            Function: The first task in pending, or the first task in waiting if nothing pending.
+                None if no task enabled.
+        """
+        with self._lock:
+            task = self._peek(self.error_heap, 'error')
+            if task is not None:
+                return task
+            task = self._peek(self.pending_heap, 'pending')
+            if task is not None:
+                return task
+            return self._peek(self.waiting_heap, 'waiting')
+
+    def _build(self):
+        if self._cache_revision == self.revision:
+            return
+        error = sorted(e for e in self.error_heap if self._is_valid(e[1], e[2], 'error'))
+        pending = sorted(e for e in self.pending_heap if self._is_valid(e[2], e[3], 'pending'))
+        waiting = sorted(e for e in self.waiting_heap if self._is_valid(e[3], e[4], 'waiting'))
+        self._pending = [self.tasks[e[1]].function for e in error] + [self.tasks[e[2]].function for e in pending]
+        self._waiting = [self.tasks[e[3]].function for e in waiting]
+        self._cache_revision = self.revision
+
+    @property
+    def pending(self):
+        """
+        Returns:
+            list[Function]: Run time has been reached, but haven't been run due to task scheduling.
+        """
+        with self._lock:
+            self._build()
+            return self._pending.copy()
+
+    @property
+    def waiting(self):
+        """
+        Returns:
+            list[Function]: Run time haven't been reached, wait needed.
+        """
+        with self._lock:
+            self._build()
+            return self._waiting.copy()
@@ -1,10 +1,244 @@
 import os
+import select
+import struct
+import sys
+import threading
+import time
 from datetime import datetime
 
+from module.config.persistence import file_stamp
 from module.config.utils import filepath_config, DEFAULT_TIME
 from module.logger import logger
 
 
+class Inotify:
+    """
+    Minimal inotify binding with ctypes, watching folders for files being replaced or written.
+    Config files are written by atomic rename, so watching the file itself doesn't work,
+    the folder is watched instead.
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # Key: watch descriptor. Value: folder
+        self.folders = {}
+
+    def add(self, folder):
+        """
+        Args:
+            folder (str): Absolute path of folder.
+        """
+        if folder in self.folders.values():
+            return
+        import ctypes
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed on {folder}')
+        self.folders[wd] = folder
+
+    def read(self, timeout):
+        """
+        Args:
+            timeout (float): Seconds.
+
+        Returns:
+            set[str]: Absolute path of files that changed.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+
+        files = set()
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            folder = self.folders.get(wd)
+            if folder is not None and name:
+                files.add(os.path.join(folder, os.fsdecode(name)))
+        return files
+
+
+class FileWatch:
+    """
+    Handle of a watched file, returned by `ConfigChangeNotifier.watch()`.
+    """
+
+    def __init__(self, notifier, file):
+        self.notifier = notifier
+        self.file = file
+        self.event = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        Args:
+            timeout (float): Seconds, None to wait forever.
+
+        Returns:
+            bool: True if file changed, False if timeout.
+        """
+        changed = self.event.wait(timeout)
+        self.event.clear()
+        return changed
+
+    def close(self):
+        self.notifier.unwatch(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ConfigChangeNotifier:
+    """
+    Notify config file changes, one thread serves all config objects in this process.
+
+    Use inotify on Linux, so waiting schedulers wake up as soon as the GUI saves config.
+    On other platforms, or if inotify is unavailable, stat watched files periodically.
+    Files are also swept periodically under inotify,
+    in case changes are made on a network-mounted folder where inotify doesn't report.
+
+    Examples:
+        with CONFIG_NOTIFIER.watch('./config/alas.json') as watch:
+            if watch.wait(timeout=60):
+                print('config changed')
+    """
+    # Interval to stat watched files if inotify is unavailable.
+    POLL_INTERVAL = 2
+    # Interval to stat watched files under inotify.
+    SWEEP_INTERVAL = 10
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Key: absolute path of file. Value: set of FileWatch
+        self.watches = {}
+        # Key: absolute path of file. Value: last file stamp
+        self.stamps = {}
+        self.inotify = None
+        self.thread = None
+        self.has_watch = threading.Condition(self.lock)
+
+    def _init_inotify(self):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return Inotify()
+        except Exception as e:
+            logger.warning(f'Inotify unavailable, fallback to stat polling: {e}')
+            return None
+
+    def watch(self, file):
+        """
+        Args:
+            file (str): Path to file.
+
+        Returns:
+            FileWatch:
+        """
+        file = os.path.abspath(file)
+        watch = FileWatch(self, file)
+        with self.lock:
+            if self.thread is None:
+                self.inotify = self._init_inotify()
+                self.thread = threading.Thread(target=self._run, name='ConfigChangeNotifier', daemon=True)
+                self.thread.start()
+            if self.inotify is not None:
+                try:
+                    self.inotify.add(os.path.dirname(file))
+                except OSError as e:
+                    logger.warning(f'Inotify unavailable, fallback to stat polling: {e}')
+                    self.inotify = None
+            if file not in self.watches:
+                self.watches[file] = set()
+                self.stamps[file] = file_stamp(file)
+            self.watches[file].add(watch)
+            self.has_watch.notify_all()
+        return watch
+
+    def unwatch(self, watch):
+        """
+        Args:
+            watch (FileWatch):
+        """
+        with self.lock:
+            watches = self.watches.get(watch.file)
+            if watches is None:
+                return
+            watches.discard(watch)
+            if not watches:
+                self.watches.pop(watch.file, None)
+                self.stamps.pop(watch.file, None)
+
+    def check(self, files=None):
+        """
+        Stat files and notify the changed ones.
+
+        Args:
+            files (set[str]): Absolute path of files to check, None for all watched files.
+        """
+        with self.lock:
+            if files is None:
+                files = list(self.watches.keys())
+            for file in files:
+                if file not in self.watches:
+                    continue
+                stamp = file_stamp(file)
+                if stamp == self.stamps[file]:
+                    continue
+                self.stamps[file] = stamp
+                for watch in self.watches[file]:
+                    watch.event.set()
+
+    def _run(self):
+        while 1:
+            with self.lock:
+                while not self.watches:
+                    self.has_watch.wait()
+                inotify = self.inotify
+
+            if inotify is None:
+                time.sleep(self.POLL_INTERVAL)
+                self.check()
+                continue
+
+            try:
+                files = inotify.read(timeout=self.SWEEP_INTERVAL)
+            except OSError as e:
+                logger.warning(f'Inotify read failed, fallback to stat polling: {e}')
+                with self.lock:
+                    self.inotify = None
+                continue
+            if files:
+                self.check(files)
+            else:
+                # Timeout, sweep all
+                self.check()
+
+
+CONFIG_NOTIFIER = ConfigChangeNotifier()
+
+
 class ConfigWatcher:
     config_name = 'alas'
     start_mtime = DEFAULT_TIME
@@ -12,12 +246,27 @@ class ConfigWatcher:
     def start_watching(self) -> None:
         self.start_mtime = self.get_mtime()
 
+    @property
+    def config_file(self) -> str:
+        """
+        Path to config file
+        """
+        return filepath_config(self.config_name)
+
+    def watch_changes(self) -> FileWatch:
+        """
+        Returns:
+            FileWatch: Call `wait()` to block until config file changes.
+        """
+        return CONFIG_NOTIFIER.watch(self.config_file)
+
     def get_mtime(self) -> datetime:
         """
         Last modify time of the file
         """
-        timestamp = os.stat(filepath_config(self.config_name)).st_mtime
-        mtime = datetime.fromtimestamp(timestamp).replace(microsecond=0)
+        timestamp = os.stat(self.config_file).st_mtime
+        # Keep microseconds, changes right after start_watching() should be noticed.
+        mtime = datetime.fromtimestamp(timestamp)
         return mtime
 
     def should_reload(self) -> bool:
@@ -139,6 +139,7 @@ class Benchmark(DaemonBase, CampaignUI):
         for method in screenshot:
             result = self.benchmark_test(self.device.screenshot_methods[method])
             screenshot_result.append([method, result])
+        self.screenshot_result = screenshot_result
 
         area = (124, 4, 649, 106)  # Somewhere safe to click.
         click_result = []
@@ -219,26 +220,12 @@ class Benchmark(DaemonBase, CampaignUI):
         Returns:
             str: The fastest screenshot method on current device.
         """
-        screenshot = ['ADB', 'ADB_nc', 'uiautomator2', 'aScreenCap', 'aScreenCap_nc', 'DroidCast', 'DroidCast_raw']
-
-        def remove(*args):
-            return [l for l in screenshot if l not in args]
-
-        sdk = self.device.sdk_ver
-        logger.info(f'sdk_ver: {sdk}')
-        if not (21 <= sdk <= 28):
-            screenshot = remove('aScreenCap', 'aScreenCap_nc')
-        if self.device.is_chinac_phone_cloud:
-            screenshot = remove('ADB_nc', 'aScreenCap_nc')
-        if self.device.nemu_ipc_available():
-            screenshot.append('nemu_ipc')
-        if self.device.ldopengl_available():
-            screenshot.append('ldopengl')
-        screenshot = tuple(screenshot)
+        screenshot = self.device.screenshot_method_candidates()
 
         self.TEST_TOTAL = 3
         self.TEST_BEST = 1
         method, _ = self.benchmark(screenshot, tuple())
+        self.device.screenshot_selector.seed(self.screenshot_result)
 
         return method
 
@@ -1,6 +1,7 @@
 from lxml import etree
 
 from module.base.timer import Timer
+from module.device.connection import device_io
 from module.device.method.adb import Adb
 from module.device.method.uiautomator_2 import Uiautomator2
 from module.device.method.utils import HierarchyButton
@@ -14,6 +15,7 @@ class AppControl(Adb, WSA, Uiautomator2):
     _app_u2_family = ['uiautomator2', 'minitouch', 'scrcpy', 'MaaTouch', 'nemu_ipc']
     _hierarchy_interval = Timer(0.1)
 
+    @device_io
     def app_is_running(self) -> bool:
         method = self.config.Emulator_ControlMethod
         if self.is_wsa:
@@ -27,6 +29,7 @@ class AppControl(Adb, WSA, Uiautomator2):
         logger.attr('Package_name', package)
         return package == self.package
 
+    @device_io
     def app_start(self):
         method = self.config.Emulator_ControlMethod
         logger.info(f'App start: {self.package}')
@@ -37,6 +40,7 @@ class AppControl(Adb, WSA, Uiautomator2):
         else:
             self.app_start_adb()
 
+    @device_io
     def app_stop(self):
         method = self.config.Emulator_ControlMethod
         logger.info(f'App stop: {self.package}')
@@ -68,10 +72,11 @@ class AppControl(Adb, WSA, Uiautomator2):
         self._hierarchy_interval.reset()
 
         method = self.config.Emulator_ControlMethod
-        if method in AppControl._app_u2_family:
-            self.hierarchy = self.dump_hierarchy_uiautomator2()
-        else:
-            self.hierarchy = self.dump_hierarchy_adb()
+        with self.device_io_lock:
+            if method in AppControl._app_u2_family:
+                self.hierarchy = self.dump_hierarchy_uiautomator2()
+            else:
+                self.hierarchy = self.dump_hierarchy_adb()
         return self.hierarchy
 
     def xpath_to_button(self, xpath: str) -> HierarchyButton:
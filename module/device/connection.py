@@ -3,6 +3,7 @@ import logging
 import re
 import socket
 import subprocess
+import threading
 import time
 from functools import wraps
 
@@ -18,6 +19,7 @@ from module.device.env import IS_LINUX, IS_MACINTOSH, IS_WINDOWS
 from module.device.method.utils import (PackageNotInstalled, RETRY_TRIES, get_serial_pair, handle_adb_error,
                                         handle_unknown_host_service, possible_reasons, random_port, recv_all,
                                         remove_shell_warning, retry_sleep)
+from module.device.shell_session import PROP_CACHE, SHELL_SESSIONS, ShellSession
 from module.exception import EmulatorNotRunningError, RequestHumanTakeover
 from module.logger import logger
 from module.map.map_grids import SelectedGrids
@@ -76,6 +78,24 @@ def retry(func):
     return retry_wrapper
 
 
+def device_io(func):
+    """
+    Hold `Connection.device_io_lock` while calling `func`,
+    so controls don't run at the same time as screenshots from the prefetch thread.
+    """
+
+    @wraps(func)
+    def device_io_wrapper(self, *args, **kwargs):
+        """
+        Args:
+            self (Connection):
+        """
+        with self.device_io_lock:
+            return func(self, *args, **kwargs)
+
+    return device_io_wrapper
+
+
 class AdbDeviceWithStatus(AdbDevice):
     def __init__(self, client: AdbClient, serial: str, status: str):
         self.status = status
@@ -127,6 +147,14 @@ class Connection(ConnectionAttr):
 
         self.check_mumu_app_keep_alive()
 
+    @cached_property
+    def device_io_lock(self) -> threading.RLock:
+        """
+        Lock of adb, uiautomator2 and emulator connections.
+        Held in screenshot prefetch thread during captures, and in controls and app control in the main thread.
+        """
+        return threading.RLock()
+
     @Config.when(DEVICE_OVER_HTTP=False)
     def adb_command(self, cmd, timeout=10):
         """
@@ -213,6 +241,11 @@ class Connection(ConnectionAttr):
             else:
                 # socket
                 return result
+        elif self.config.DEVICE_SHELL_SESSION and ShellSession.accepts(cmd):
+            result = SHELL_SESSIONS.get(self.adb).run(cmd, timeout=timeout, rstrip=rstrip)
+            result = remove_shell_warning(result)
+            # str
+            return result
         else:
             result = self.adb.shell(cmd, stream=stream, timeout=timeout, rstrip=rstrip)
             result = remove_shell_warning(result)
@@ -254,7 +287,8 @@ class Connection(ConnectionAttr):
 
     def adb_getprop(self, name):
         """
-        Get system property in Android, same as `getprop <name>`
+        Get system property in Android, same as `getprop <name>`.
+        All properties are read at once and cached for DEVICE_PROP_CACHE_TTL seconds.
 
         Args:
             name (str): Property name
@@ -262,7 +296,8 @@ class Connection(ConnectionAttr):
         Returns:
             str:
         """
-        return self.adb_shell(['getprop', name]).strip()
+        return PROP_CACHE.get(
+            self.serial, name, ttl=self.config.DEVICE_PROP_CACHE_TTL, load=lambda: self.adb_shell(['getprop']))
 
     @cached_property
     @retry
@@ -484,15 +519,17 @@ class Connection(ConnectionAttr):
         logger.error('No `netcat` command available, please use screenshot methods without `_nc` suffix')
         raise RequestHumanTakeover
 
-    def adb_shell_nc(self, cmd, timeout=5, chunk_size=262144):
+    def adb_shell_nc(self, cmd, timeout=5, chunk_size=262144, buffer=None, size_hint=None):
         """
         Args:
             cmd (list):
             timeout (int):
             chunk_size (int): Default to 262144
+            buffer (RecvBuffer): Receive into a reusable buffer, or None to return bytes.
+            size_hint (callable): Function to get expected size from the first chunk, see `RecvBuffer.recv_all()`
 
         Returns:
-            bytes:
+            bytes, or memoryview if `buffer` is given
         """
         # Server start listening
         server = self.reverse_server
@@ -510,7 +547,10 @@ class Connection(ConnectionAttr):
             raise AdbTimeout('reverse server accept timeout')
 
         # Server receive data
-        data = recv_all(conn, chunk_size=chunk_size, recv_interval=0.001)
+        if buffer is None:
+            data = recv_all(conn, chunk_size=chunk_size, recv_interval=0.001)
+        else:
+            data = buffer.recv_all(conn, chunk_size=chunk_size, recv_interval=0.001, size_hint=size_hint)
 
         # Server close connection
         conn.close()
@@ -746,6 +786,8 @@ class Connection(ConnectionAttr):
         del_cached_property(self, '_minitouch_builder')
         del_cached_property(self, '_maatouch_builder')
         del_cached_property(self, 'reverse_server')
+        SHELL_SESSIONS.release(self.serial)
+        PROP_CACHE.clear(self.serial)
 
     def adb_disconnect(self):
         msg = self.adb_client.disconnect(self.serial)
@@ -2,6 +2,7 @@ from module.base.button import Button
 from module.base.decorator import cached_property
 from module.base.timer import Timer
 from module.base.utils import *
+from module.device.connection import device_io
 from module.device.method.hermit import Hermit
 from module.device.method.maatouch import MaaTouch
 from module.device.method.minitouch import Minitouch
@@ -26,6 +27,7 @@ class Control(Hermit, Minitouch, Scrcpy, MaaTouch, NemuIpc):
             'nemu_ipc': self.click_nemu_ipc,
         }
 
+    @device_io
     def click(self, button, control_check=True):
         """Method to click a button.
 
@@ -57,6 +59,7 @@ class Control(Hermit, Minitouch, Scrcpy, MaaTouch, NemuIpc):
 
             self.click(button, control_check=False)
 
+    @device_io
     def long_click(self, button, duration=(1, 1.2)):
         """Method to long click a button.
 
@@ -85,6 +88,7 @@ class Control(Hermit, Minitouch, Scrcpy, MaaTouch, NemuIpc):
         else:
             self.swipe_adb((x, y), (x, y), duration)
 
+    @device_io
     def swipe(self, p1, p2, duration=(0.1, 0.2), name='SWIPE', distance_check=True):
         self.handle_control_check(name)
         p1, p2 = ensure_int(p1, p2)
@@ -147,6 +151,7 @@ class Control(Hermit, Minitouch, Scrcpy, MaaTouch, NemuIpc):
         )
         self.swipe(p1, p2, duration=duration, name=name, distance_check=distance_check)
 
+    @device_io
     def drag(self, p1, p2, segments=1, shake=(0, 15), point_random=(-10, -10, 10, 10), shake_random=(-5, -5, 5, 5),
              swipe_duration=0.25, shake_duration=0.1, name='DRAG'):
         self.handle_control_check(name)
@@ -98,6 +98,8 @@ class Device(Screenshot, Control, AppControl):
         # Auto-select the fastest screenshot method
         if not self.config.is_template_config and self.config.Emulator_ScreenshotMethod == 'auto':
             self.run_simple_screenshot_benchmark()
+        if not self.config.is_template_config:
+            self.screenshot_adaptive_init()
 
         # Early init
         if self.config.is_actual_task:
@@ -194,11 +196,12 @@ class Device(Screenshot, Control, AppControl):
         return super().dump_hierarchy()
 
     def release_during_wait(self):
+        self.screenshot_prefetch_stop()
         # Scrcpy server is still sending video stream,
         # stop it during wait
-        if self.config.Emulator_ScreenshotMethod == 'scrcpy':
+        if self.screenshot_method == 'scrcpy':
             self._scrcpy_server_stop()
-        if self.config.Emulator_ScreenshotMethod == 'nemu_ipc':
+        if self.screenshot_method == 'nemu_ipc':
             self.nemu_ipc_release()
 
     def get_orientation(self):
@@ -245,6 +248,7 @@ class Device(Screenshot, Control, AppControl):
             raise GameNotRunningError('Game died')
 
     def handle_control_check(self, button):
+        self.screenshot_prefetch_invalidate()
         self.stuck_record_clear()
         self.click_record_add(button)
         self.click_record_check()
@@ -313,6 +317,7 @@ class Device(Screenshot, Control, AppControl):
             logger.critical('Please enable Alas.Error.HandleError or manually login to AzurLane')
             raise RequestHumanTakeover
         super().app_start()
+        self.screenshot_prefetch_invalidate()
         self.stuck_record_clear()
         self.click_record_clear()
 
@@ -322,5 +327,6 @@ class Device(Screenshot, Control, AppControl):
             logger.critical('Please enable Alas.Error.HandleError or manually login to AzurLane')
             raise RequestHumanTakeover
         super().app_stop()
+        self.screenshot_prefetch_invalidate()
         self.stuck_record_clear()
         self.click_record_clear()
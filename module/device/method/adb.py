@@ -7,11 +7,11 @@ import numpy as np
 from adbutils.errors import AdbError
 from lxml import etree
 
-from module.base.decorator import Config
+from module.base.decorator import Config, cached_property
 from module.config.server import DICT_PACKAGE_TO_ACTIVITY
 from module.device.connection import Connection
-from module.device.method.utils import (ImageTruncated, PackageNotInstalled, RETRY_TRIES, handle_adb_error,
-                                        handle_unknown_host_service, remove_prefix, retry_sleep)
+from module.device.method.utils import (ImageTruncated, PackageNotInstalled, RETRY_TRIES, RecvBuffer, handle_adb_error,
+                                        handle_unknown_host_service, retry_sleep)
 from module.exception import RequestHumanTakeover, ScriptError
 from module.logger import logger
 
@@ -75,10 +75,26 @@ def retry(func):
     return retry_wrapper
 
 
+def screencap_size(data):
+    """
+    Args:
+        data: The first chunk of raw data from `screencap`
+
+    Returns:
+        int: Expected size of the whole data.
+            Header is 12 bytes, or 16 bytes on Android 12+ which has an extra color space field.
+    """
+    width, height, _ = np.frombuffer(data[0:12], dtype=np.uint32)
+    # Header may be preceded by shell warnings, don't trust a wrong one
+    if not 0 < width <= 8192 or not 0 < height <= 8192:
+        return 0
+    return 16 + int(width) * int(height) * 4
+
+
 def load_screencap(data):
     """
     Args:
-        data: Raw data from `screencap`
+        data (bytes, memoryview): Raw data from `screencap`
 
     Returns:
         np.ndarray:
@@ -109,21 +125,29 @@ class Adb(Connection):
     __screenshot_method = [0, 1, 2]
     __screenshot_method_fixed = [0, 1, 2]
 
+    @cached_property
+    def _screencap_buffer(self) -> RecvBuffer:
+        # Reusable buffer to receive screenshots
+        return RecvBuffer()
+
     @staticmethod
     def __load_screenshot(screenshot, method):
         if method == 0:
             pass
         elif method == 1:
-            screenshot = screenshot.replace(b'\r\n', b'\n')
+            screenshot = bytes(screenshot).replace(b'\r\n', b'\n')
         elif method == 2:
-            screenshot = screenshot.replace(b'\r\r\n', b'\n')
+            screenshot = bytes(screenshot).replace(b'\r\r\n', b'\n')
         else:
             raise ScriptError(f'Unknown method to load screenshots: {method}')
 
         # fix compatibility issues for adb screencap decode problem when the data is from vmos pro
         # When use adb screencap for a screenshot from vmos pro, there would be a header more than that from emulator
         # which would cause image decode problem. So i check and remove the header there.
-        screenshot = remove_prefix(screenshot, b'long long=8 fun*=10\n')
+        # Sliced instead of remove_prefix(), screenshot may be a memoryview
+        prefix = b'long long=8 fun*=10\n'
+        if screenshot[:len(prefix)] == prefix:
+            screenshot = screenshot[len(prefix):]
 
         image = np.frombuffer(screenshot, np.uint8)
         if image is None:
@@ -150,15 +174,16 @@ class Adb(Connection):
 
         self.__screenshot_method_fixed = self.__screenshot_method
         if len(screenshot) < 500:
-            logger.warning(f'Unexpected screenshot: {screenshot}')
+            logger.warning(f'Unexpected screenshot: {bytes(screenshot)}')
         raise OSError(f'cannot load screenshot')
 
     @retry
     @Config.when(DEVICE_OVER_HTTP=False)
     def screenshot_adb(self):
-        data = self.adb_shell(['screencap', '-p'], stream=True)
+        stream = self.adb_shell(['screencap', '-p'], stream=True, recvall=False)
+        data = self._screencap_buffer.recv_all(stream)
         if len(data) < 500:
-            logger.warning(f'Unexpected screenshot: {data}')
+            logger.warning(f'Unexpected screenshot: {bytes(data)}')
 
         return self.__process_screenshot(data)
 
@@ -173,9 +198,9 @@ class Adb(Connection):
 
     @retry
     def screenshot_adb_nc(self):
-        data = self.adb_shell_nc(['screencap'])
+        data = self.adb_shell_nc(['screencap'], buffer=self._screencap_buffer, size_hint=screencap_size)
         if len(data) < 500:
-            logger.warning(f'Unexpected screenshot: {data}')
+            logger.warning(f'Unexpected screenshot: {bytes(data)}')
 
         return load_screencap(data)
 
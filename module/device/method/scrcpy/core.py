@@ -5,7 +5,6 @@ import time
 import typing as t
 from time import sleep
 
-import numpy as np
 from adbutils import AdbError, Network
 
 from module.base.decorator import cached_property
@@ -28,8 +27,13 @@ class ScrcpyCore(Connection):
     Module from https://github.com/leng-yue/py-scrcpy-client
     """
 
-    _scrcpy_last_frame: t.Optional[np.ndarray] = None
+    # Latest decoded frame, `av.VideoFrame`.
+    # Frames are converted to ndarray on demand in `screenshot_scrcpy()`,
+    # instead of converting every frame in the stream.
+    _scrcpy_last_frame = None
     _scrcpy_last_frame_time: float = 0.
+    # Notify when new frame received or stream loop stopped
+    _scrcpy_frame_condition = threading.Condition()
 
     _scrcpy_alive = False
     _scrcpy_server_stream: t.Optional[AdbConnection] = None
@@ -131,7 +135,8 @@ class ScrcpyCore(Connection):
         self._scrcpy_resolution = struct.unpack(">HH", ret)
         logger.attr('Scrcpy Resolution', self._scrcpy_resolution)
 
-        self._scrcpy_video_socket.setblocking(False)
+        # Block on recv() instead of polling, timeout to check `_scrcpy_alive`
+        self._scrcpy_video_socket.settimeout(1)
         self._scrcpy_alive = True
 
         logger.info('Start video stream loop thread')
@@ -156,6 +161,9 @@ class ScrcpyCore(Connection):
         #     logger.error(err)
 
         self._scrcpy_alive = False
+        with self._scrcpy_frame_condition:
+            self._scrcpy_last_frame = None
+            self._scrcpy_frame_condition.notify_all()
 
         if self._scrcpy_stream_loop_thread is not None:
             self._scrcpy_stream_loop_thread.join(1)
@@ -208,30 +216,39 @@ class ScrcpyCore(Connection):
             raise RequestHumanTakeover
 
         codec = CodecContext.create("h264", "r")
-        while self._scrcpy_alive:
-            try:
-                raw_h264 = self._scrcpy_video_socket.recv(0x10000)
-                if raw_h264 == b"":
+        try:
+            while self._scrcpy_alive:
+                try:
+                    raw_h264 = self._scrcpy_video_socket.recv(0x10000)
+                    if raw_h264 == b"":
+                        if self._scrcpy_alive:
+                            raise ScrcpyError("_scrcpy_stream_loop_thread: Video stream disconnected")
+                    packets = codec.parse(raw_h264)
+                    for packet in packets:
+                        frames = codec.decode(packet)
+                        for frame in frames:
+                            # logger.info('frame received')
+                            # Keep the decoded frame only, RGB conversion is done when screenshot requested
+                            with self._scrcpy_frame_condition:
+                                self._scrcpy_last_frame = frame
+                                self._scrcpy_last_frame_time = time.time()
+                                self._scrcpy_resolution = (frame.width, frame.height)
+                                self._scrcpy_frame_condition.notify_all()
+                except socket.timeout:
+                    # No new frames, screen is static
+                    continue
+                except InvalidDataError:
+                    continue
+                except (ConnectionError, OSError) as e:  # Socket Closed
                     if self._scrcpy_alive:
-                        raise ScrcpyError("_scrcpy_stream_loop_thread: Video stream disconnected")
-                packets = codec.parse(raw_h264)
-                for packet in packets:
-                    frames = codec.decode(packet)
-                    for frame in frames:
-                        # logger.info('frame received')
-                        frame = frame.to_ndarray(format="rgb24")
-                        self._scrcpy_last_frame = frame
-                        self._scrcpy_last_frame_time = time.time()
-                        self._scrcpy_resolution = (frame.shape[1], frame.shape[0])
-            except (BlockingIOError, InvalidDataError):
-                # only return nonempty frames, may block cv2 render thread
-                time.sleep(0.001)
-            except (ConnectionError, OSError) as e:  # Socket Closed
-                if self._scrcpy_alive:
-                    logger.error(f'_scrcpy_stream_loop_thread: {repr(e)}')
+                        logger.error(f'_scrcpy_stream_loop_thread: {repr(e)}')
+                        raise
+                except Exception as e:
+                    logger.error(f'_scrcpy_stream_loop_thread exception: {repr(e)}')
                     raise
-            except Exception as e:
-                logger.error(f'_scrcpy_stream_loop_thread exception: {repr(e)}')
-                raise
+        finally:
+            # Wake up waiters, so they can notice the thread died
+            with self._scrcpy_frame_condition:
+                self._scrcpy_frame_condition.notify_all()
 
         raise ScrcpyError('_scrcpy_stream_loop stopped')
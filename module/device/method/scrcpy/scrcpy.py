@@ -95,14 +95,18 @@ class Scrcpy(ScrcpyCore, Uiautomator2):
         with self._scrcpy_control_socket_lock:
             # Wait new frame
             now = time.time()
-            while 1:
-                time.sleep(0.001)
-                thread = self._scrcpy_stream_loop_thread
-                if thread is None or not thread.is_alive():
-                    raise ScrcpyError('_scrcpy_stream_loop_thread died')
-                if self._scrcpy_last_frame_time > now:
-                    screenshot = self._scrcpy_last_frame.copy()
-                    return screenshot
+            with self._scrcpy_frame_condition:
+                while 1:
+                    thread = self._scrcpy_stream_loop_thread
+                    if thread is None or not thread.is_alive():
+                        raise ScrcpyError('_scrcpy_stream_loop_thread died')
+                    if self._scrcpy_last_frame_time > now and self._scrcpy_last_frame is not None:
+                        frame = self._scrcpy_last_frame
+                        break
+                    self._scrcpy_frame_condition.wait(timeout=0.1)
+
+        # Convert outside the lock, to_ndarray() creates a new array so no copy needed
+        return frame.to_ndarray(format="rgb24")
 
     @retry
     def click_scrcpy(self, x, y):
@@ -131,6 +131,92 @@ def recv_all(stream, chunk_size=4096, recv_interval=0.000) -> bytes:
         raise AdbTimeout('adb read timeout')
 
 
+class RecvBuffer:
+    """
+    A reusable buffer to receive data with `socket.recv_into()`.
+
+    `recv_all()` gathers chunks into a list and joins them, which copies data twice.
+    Here data is received directly into a preallocated bytearray, which is kept and reused,
+    so receiving screenshots of the same size doesn't allocate memory after the first one.
+
+    Results are memoryviews of the buffer, they are invalid once the next receive starts.
+    Not thread-safe, each connection should have its own buffer.
+    """
+
+    def __init__(self, size=0):
+        """
+        Args:
+            size (int): Initial size in bytes.
+        """
+        self.buffer = bytearray(size)
+
+    def reserve(self, size, keep=0):
+        """
+        Ensure buffer is at least `size` bytes.
+
+        Args:
+            size (int):
+            keep (int): Amount of received bytes to keep when re-allocating.
+        """
+        if size <= len(self.buffer):
+            return
+        buffer = bytearray(size)
+        buffer[:keep] = self.buffer[:keep]
+        self.buffer = buffer
+
+    def recv_all(self, stream, chunk_size=4096, recv_interval=0.000, size_hint=None):
+        """
+        Same as `recv_all()`, but receives into the buffer.
+
+        Args:
+            stream:
+            chunk_size:
+            recv_interval (float): Default to 0.000, use 0.001 if receiving as server
+            size_hint (callable): Function that receives the first chunk (memoryview)
+                and returns the expected total size, such as sizes from image headers.
+
+        Returns:
+            memoryview:
+
+        Raises:
+            AdbTimeout
+        """
+        if isinstance(stream, AdbConnection):
+            stream = stream.conn
+            stream.settimeout(10)
+        else:
+            stream.settimeout(10)
+
+        received = 0
+        try:
+            while 1:
+                if len(self.buffer) - received < chunk_size:
+                    self.reserve(max(len(self.buffer) * 2, received + chunk_size), keep=received)
+                size = stream.recv_into(memoryview(self.buffer)[received:received + chunk_size], chunk_size)
+                if not size:
+                    break
+                if size_hint is not None and not received:
+                    try:
+                        expected = int(size_hint(memoryview(self.buffer)[:size]))
+                    except Exception:
+                        expected = 0
+                    # Plus one more chunk to receive EOF
+                    self.reserve(expected + chunk_size, keep=size)
+                received += size
+                # See https://stackoverflow.com/questions/23837827/python-server-program-has-high-cpu-usage/41749820#41749820
+                time.sleep(recv_interval)
+        except socket.timeout:
+            raise AdbTimeout('adb read timeout')
+
+        data = memoryview(self.buffer)[:received]
+        # Same as remove_shell_warning()
+        if data[:7] == b'WARNING':
+            index = self.buffer.find(b'\n', 0, received)
+            if index >= 0:
+                data = data[index + 1:]
+        return data
+
+
 def possible_reasons(*args):
     """
     Show possible reasons
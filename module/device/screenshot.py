@@ -1,13 +1,12 @@
 import os
 import time
-from collections import deque
-from datetime import datetime
 
 import cv2
 import numpy as np
 from PIL import Image
 
 from module.base.decorator import cached_property
+from module.base.frame import FRAME_CACHE
 from module.base.timer import Timer
 from module.base.utils import get_color, image_size, limit_in, save_image
 from module.device.method.adb import Adb
@@ -17,6 +16,9 @@ from module.device.method.ldopengl import LDOpenGL
 from module.device.method.nemu_ipc import NemuIpc
 from module.device.method.scrcpy import Scrcpy
 from module.device.method.wsa import WSA
+from module.device.screenshot_buffer import CompressedScreenshotBuffer, ScreenshotBuffer
+from module.device.screenshot_prefetch import ScreenshotPrefetcher
+from module.device.screenshot_stats import ScreenshotMethodSelector
 from module.exception import RequestHumanTakeover, ScriptError
 from module.logger import logger
 
@@ -27,7 +29,32 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
     _minicap_uninstalled = False
     _screenshot_interval = Timer(0.1)
     _last_save_time = {}
-    image: np.ndarray
+    _image = None
+    # If there are controls since the last screenshot, prefetched screenshots before now should be dropped
+    _screenshot_control_dirty = False
+    # Screenshot method switched by adaptive screenshot, only for this session
+    _screenshot_method_session = ''
+
+    @property
+    def image(self) -> np.ndarray:
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        """
+        Every new screenshot starts a new frame in FRAME_CACHE,
+        images derived from the previous screenshot are dropped.
+        """
+        self._image = value
+        FRAME_CACHE.bind(value)
+
+    @property
+    def frame_cache_stats(self):
+        """
+        Returns:
+            dict: hit, miss, rate and amount of cached images of the current frame.
+        """
+        return FRAME_CACHE.stats
 
     @cached_property
     def screenshot_methods(self):
@@ -48,29 +75,228 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
     def screenshot_method_override(self) -> str:
         return ''
 
-    def screenshot(self):
+    def _screenshot_capture(self):
         """
+        Take a screenshot, then dedither and rotate it.
+        May run in the prefetch thread, so it should not touch `self.image`.
+
         Returns:
             np.ndarray:
         """
-        self._screenshot_interval.wait()
-        self._screenshot_interval.reset()
+        if self.screenshot_method_override:
+            image = self.screenshot_methods.get(self.screenshot_method_override, self.screenshot_adb)()
+        elif self.screenshot_adaptive:
+            image = self._screenshot_adaptive()
+        else:
+            method = self.screenshot_methods.get(self.config.Emulator_ScreenshotMethod, self.screenshot_adb)
+            image = method()
 
-        for _ in range(2):
-            if self.screenshot_method_override:
-                method = self.screenshot_method_override
-            else:
-                method = self.config.Emulator_ScreenshotMethod
-            method = self.screenshot_methods.get(method, self.screenshot_adb)
-            self.image = method()
+        if self.config.Emulator_ScreenshotDedithering:
+            # This will take 40-60ms
+            cv2.fastNlMeansDenoising(image, image, h=17, templateWindowSize=1, searchWindowSize=2)
+        image = self._handle_orientated_image(image)
+        return image
+
+    @cached_property
+    def screenshot_selector(self) -> ScreenshotMethodSelector:
+        return ScreenshotMethodSelector()
+
+    def screenshot_method_candidates(self):
+        """
+        Returns:
+            tuple[str]: Screenshot methods that may work on current device.
+        """
+        screenshot = ['ADB', 'ADB_nc', 'uiautomator2', 'aScreenCap', 'aScreenCap_nc', 'DroidCast', 'DroidCast_raw']
+
+        def remove(*args):
+            return [l for l in screenshot if l not in args]
+
+        sdk = self.sdk_ver
+        logger.info(f'sdk_ver: {sdk}')
+        if not (21 <= sdk <= 28):
+            screenshot = remove('aScreenCap', 'aScreenCap_nc')
+        if self.is_chinac_phone_cloud:
+            screenshot = remove('ADB_nc', 'aScreenCap_nc')
+        if self.nemu_ipc_available():
+            screenshot.append('nemu_ipc')
+        if self.ldopengl_available():
+            screenshot.append('ldopengl')
+        return tuple(screenshot)
+
+    def screenshot_adaptive_init(self):
+        """
+        Let adaptive screenshot switch between all methods that may work,
+        no matter the screenshot method is set by user or by benchmark.
+        """
+        if not self.screenshot_adaptive:
+            return
+        candidates = self.screenshot_method_candidates()
+        self.screenshot_selector.add_candidates(candidates)
+        logger.info(f'Adaptive screenshot candidates: {candidates}')
+
+    @property
+    def screenshot_adaptive(self) -> bool:
+        return self.config.DEVICE_SCREENSHOT_ADAPTIVE \
+            and 'Emulator_ScreenshotMethod' not in self.config.overridden
+
+    @property
+    def screenshot_method(self) -> str:
+        """
+        Returns:
+            str: Screenshot method in use, which is Emulator_ScreenshotMethod
+                unless adaptive screenshot switched to another one.
+        """
+        if self._screenshot_method_session and self.screenshot_adaptive:
+            return self._screenshot_method_session
+        return self.config.Emulator_ScreenshotMethod
+
+    def _screenshot_measure(self, method):
+        """
+        Take a screenshot with given method and record its latency.
+
+        Args:
+            method (str): Screenshot method.
 
-            if self.config.Emulator_ScreenshotDedithering:
-                # This will take 40-60ms
-                cv2.fastNlMeansDenoising(self.image, self.image, h=17, templateWindowSize=1, searchWindowSize=2)
-            self.image = self._handle_orientated_image(self.image)
+        Returns:
+            np.ndarray:
+
+        Raises:
+            RequestHumanTakeover: If method failed after retries.
+        """
+        func = self.screenshot_methods.get(method, self.screenshot_adb)
+        start = time.time()
+        try:
+            image = func()
+        except RequestHumanTakeover:
+            self.screenshot_selector.failure(method)
+            raise
+        self.screenshot_selector.success(method, time.time() - start)
+        return image
+
+    def _screenshot_probe(self, method):
+        """
+        Measure a screenshot method not in use.
+        The image is dropped, probes should not affect the running task.
+
+        Args:
+            method (str): Screenshot method.
+        """
+        selector = self.screenshot_selector
+        logger.info(f'Probing screenshot method: {method}')
+        try:
+            image = self._screenshot_measure(method)
+        except RequestHumanTakeover:
+            logger.warning(f'Screenshot method {method} failed in probe')
+            return
+        except Exception as e:
+            logger.warning(f'Screenshot method {method} failed in probe: {e}')
+            selector.failure(method)
+            return
+        image = self._handle_orientated_image(image)
+        width, height = image_size(image)
+        if width != 1280 or height != 720 or sum(get_color(image, area=(0, 0, 1280, 720))) < 1:
+            logger.warning(f'Screenshot method {method} received invalid image in probe')
+            selector.failure(method)
+            return
+        logger.attr(method, selector.get(method))
+
+    def screenshot_method_switch(self, method):
+        """
+        Args:
+            method (str): Screenshot method to switch to.
+        """
+        current = self.screenshot_method
+        logger.attr(current, self.screenshot_selector.get(current))
+        logger.attr(method, self.screenshot_selector.get(method))
+        logger.warning(f'Switch screenshot method from {current} to {method}')
+        self._screenshot_method_session = method
+        self.screenshot_interval_set()
+
+    def _screenshot_adaptive(self):
+        """
+        Take a screenshot with the current method,
+        fallback to the fastest healthy method if it fails, or switch if another method is a lot faster.
+
+        Returns:
+            np.ndarray:
+        """
+        selector = self.screenshot_selector
+        current = self.screenshot_method
+
+        probe = selector.probe(current)
+        if probe is not None:
+            self._screenshot_probe(probe)
+
+        try:
+            image = self._screenshot_measure(current)
+        except RequestHumanTakeover:
+            fallback = selector.fallback(current)
+            if fallback is None:
+                raise
+            logger.error(f'Screenshot method {current} failed')
+            self.screenshot_method_switch(fallback)
+            return self._screenshot_measure(fallback)
+
+        better = selector.better(current)
+        if better is not None:
+            self.screenshot_method_switch(better)
+        return image
+
+    @cached_property
+    def screenshot_prefetcher(self) -> ScreenshotPrefetcher:
+        return ScreenshotPrefetcher(
+            capture=self._screenshot_capture,
+            interval=self._screenshot_interval,
+            lock=self.device_io_lock,
+            staleness=self.config.DEVICE_SCREENSHOT_PREFETCH_STALENESS,
+        )
+
+    def screenshot_prefetch_invalidate(self):
+        """
+        Called before controls, screenshots captured before the control finished will be dropped.
+        """
+        self._screenshot_control_dirty = True
+
+    def screenshot_prefetch_stop(self):
+        if 'screenshot_prefetcher' in self.__dict__:
+            self.screenshot_prefetcher.stop()
+
+    def _screenshot_prefetched(self, barrier=None):
+        """
+        Args:
+            barrier (float): Accept screenshots captured after it.
+
+        Returns:
+            np.ndarray:
+        """
+        if self._screenshot_control_dirty:
+            # Controls are synchronous, so now is after the last control
+            self._screenshot_control_dirty = False
+            barrier = time.time()
+        prefetcher = self.screenshot_prefetcher
+        if not prefetcher.is_running:
+            prefetcher.start()
+        return prefetcher.get(barrier=barrier)
+
+    def screenshot(self):
+        """
+        Returns:
+            np.ndarray:
+        """
+        prefetch = self.config.DEVICE_SCREENSHOT_PREFETCH
+        if not prefetch:
+            self._screenshot_interval.wait()
+            self._screenshot_interval.reset()
+
+        for trial in range(2):
+            if prefetch:
+                # Retry needs a screenshot taken after the checks
+                self.image = self._screenshot_prefetched(barrier=time.time() if trial else None)
+            else:
+                self.image = self._screenshot_capture()
 
             if self.config.Error_SaveError:
-                self.screenshot_deque.append({'time': datetime.now(), 'image': self.image})
+                self.screenshot_deque.append(self.image)
 
             if self.check_screen_size() and self.check_screen_black():
                 break
@@ -81,7 +307,7 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
 
     @property
     def has_cached_image(self):
-        return hasattr(self, 'image') and self.image is not None
+        return self.image is not None
 
     def _handle_orientated_image(self, image):
         """
@@ -91,7 +317,7 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
         Returns:
             np.ndarray:
         """
-        width, height = image_size(self.image)
+        width, height = image_size(image)
         if width == 1280 and height == 720:
             return image
 
@@ -110,7 +336,7 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
         return image
 
     @cached_property
-    def screenshot_deque(self):
+    def screenshot_deque(self) -> ScreenshotBuffer:
         try:
             length = int(self.config.Error_ScreenshotLength)
         except ValueError:
@@ -118,7 +344,12 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
             raise RequestHumanTakeover
         # Limit in 1~300
         length = max(1, min(length, 300))
-        return deque(maxlen=length)
+        if length > 1:
+            # Compress history in background
+            return CompressedScreenshotBuffer(length)
+        else:
+            # Keep the last screenshot as it is, no need to compress
+            return ScreenshotBuffer(length)
 
     def save_screenshot(self, genre='items', interval=None, to_base_folder=False):
         """Save a screenshot. Use millisecond timestamp as file name.
@@ -169,7 +400,7 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
                 logger.warning(f'Optimization.ScreenshotInterval {origin} is revised to {interval}')
                 self.config.Optimization_ScreenshotInterval = interval
             # Allow nemu_ipc to have a lower default
-            if self.config.Emulator_ScreenshotMethod in ['nemu_ipc', 'ldopengl']:
+            if self.screenshot_method in ['nemu_ipc', 'ldopengl']:
                 interval = limit_in(origin, 0.1, 0.2)
         elif interval == 'combat':
             origin = self.config.Optimization_CombatScreenshotInterval
@@ -185,7 +416,7 @@ class Screenshot(Adb, WSA, DroidCast, AScreenCap, Scrcpy, NemuIpc, LDOpenGL):
             raise ScriptError(f'Unknown screenshot interval: {interval}')
         # Screenshot interval in scrcpy is meaningless,
         # video stream is received continuously no matter you use it or not.
-        if self.config.Emulator_ScreenshotMethod == 'scrcpy':
+        if self.screenshot_method == 'scrcpy':
             interval = 0.1
 
         if interval != self._screenshot_interval.limit:
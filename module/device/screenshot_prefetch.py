@@ -0,0 +1,188 @@
+import threading
+import time
+
+from module.logger import logger
+
+
+class PrefetchFrame:
+    def __init__(self, start, end, image=None, error=None):
+        """
+        Args:
+            start (float): Time when capture started.
+            end (float): Time when capture finished.
+            image (np.ndarray):
+            error (Exception): Exception raised in capture, will be re-raised in consumer thread.
+        """
+        self.start = start
+        self.end = end
+        self.image = image
+        self.error = error
+
+
+class ScreenshotPrefetcher:
+    """
+    Capture screenshots in a background thread, so capturing overlaps image detection.
+
+    The producer keeps one frame in flight. Once a frame is taken, the next capture starts immediately,
+    paced by the screenshot interval timer. A frame is handed out only if:
+    - Capture started after `barrier`. Callers move the barrier after clicks and swipes,
+      so screenshots never show the screen before a control.
+    - Capture finished no more than `staleness` seconds ago.
+    Producer goes idle if no one requests screenshots for `idle` seconds.
+    Captures hold `lock`, which is shared with controls, so they don't use device connections at the same time.
+
+    Examples:
+        prefetcher = ScreenshotPrefetcher(capture=func, interval=timer, lock=device.device_io_lock)
+        prefetcher.start()
+        image = prefetcher.get(barrier=time.time())
+        prefetcher.stop()
+    """
+
+    def __init__(self, capture, interval, lock=None, staleness=0.5, idle=3.):
+        """
+        Args:
+            capture (callable): Function to take a screenshot, returns np.ndarray.
+            interval (Timer): Minimum interval between two captures.
+            lock (threading.RLock): Lock of device I/O, held during captures.
+            staleness (float): Max seconds since a frame was captured.
+            idle (float): Seconds to stop capturing if no requests.
+        """
+        self.capture = capture
+        self.interval = interval
+        self.lock = lock if lock is not None else threading.RLock()
+        self.staleness = staleness
+        self.idle = idle
+
+        self.condition = threading.Condition()
+        self.frame: PrefetchFrame = None
+        self.barrier = 0.
+        self.last_request = 0.
+        self.alive = False
+        self.thread: threading.Thread = None
+
+    @property
+    def is_running(self):
+        return self.alive and self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        with self.condition:
+            self.alive = True
+            self.frame = None
+            self.last_request = time.time()
+        self.thread = threading.Thread(target=self._run, name='ScreenshotPrefetch', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.alive = False
+            self.frame = None
+            self.condition.notify_all()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.thread = None
+
+    def invalidate(self, barrier=None):
+        """
+        Drop frames captured before `barrier`.
+
+        Args:
+            barrier (float): Timestamp, default to now.
+        """
+        with self.condition:
+            self.barrier = max(self.barrier, barrier if barrier is not None else time.time())
+            self.condition.notify_all()
+
+    def _is_acceptable(self, frame, now):
+        if frame is None:
+            return False
+        if frame.error is not None:
+            return True
+        return frame.start >= self.barrier and now - frame.end <= self.staleness
+
+    def _should_wait(self, now):
+        """
+        Returns:
+            bool: If producer should wait instead of capturing a new frame.
+        """
+        if now - self.last_request > self.idle:
+            return True
+        frame = self.frame
+        if frame is None:
+            return False
+        if frame.error is not None:
+            return True
+        return self._is_acceptable(frame, now)
+
+    def _run(self):
+        logger.info('Screenshot prefetch thread started')
+        try:
+            while 1:
+                with self.condition:
+                    while self.alive:
+                        now = time.time()
+                        if not self._should_wait(now):
+                            break
+                        # Wake up when the current frame becomes stale, or sleep until requested if idle
+                        timeout = None
+                        idle = now - self.last_request > self.idle
+                        if not idle and self.frame is not None and self.frame.error is None:
+                            timeout = max(self.frame.end + self.staleness - now, 0.01)
+                        self.condition.wait(timeout=timeout)
+                    if not self.alive:
+                        return
+
+                self.interval.wait()
+                self.interval.reset()
+                with self.lock:
+                    start = time.time()
+                    try:
+                        image = self.capture()
+                        frame = PrefetchFrame(start=start, end=time.time(), image=image)
+                    except Exception as e:
+                        frame = PrefetchFrame(start=start, end=time.time(), error=e)
+
+                with self.condition:
+                    if not self.alive:
+                        return
+                    self.frame = frame
+                    self.condition.notify_all()
+                    if frame.error is not None:
+                        # Let the consumer handle errors, and restart prefetching later
+                        self.alive = False
+                        return
+        finally:
+            logger.info('Screenshot prefetch thread stopped')
+
+    def get(self, barrier=None):
+        """
+        Get a frame captured after `barrier`.
+
+        Args:
+            barrier (float): Timestamp, or None to accept any frame within staleness.
+
+        Returns:
+            np.ndarray:
+
+        Raises:
+            Exception: Errors raised in capture.
+        """
+        with self.condition:
+            if barrier is not None:
+                self.barrier = max(self.barrier, barrier)
+            self.last_request = time.time()
+            self.condition.notify_all()
+            while 1:
+                frame = self.frame
+                if self._is_acceptable(frame, time.time()):
+                    # Take frame, producer starts the next capture
+                    self.frame = None
+                    self.condition.notify_all()
+                    if frame.error is not None:
+                        raise frame.error
+                    return frame.image
+                if not self.is_running:
+                    raise RuntimeError('Screenshot prefetch thread is not running')
+                self.condition.wait(timeout=0.1)
@@ -0,0 +1,190 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class MethodStats:
+    def __init__(self, window=20):
+        """
+        Args:
+            window (int): Amount of recent screenshots to calculate latency.
+        """
+        # Time cost of recent screenshots
+        self.costs = deque(maxlen=window)
+        # Consecutive failures
+        self.failures = 0
+        self.last_failure = 0.
+        self.last_record = 0.
+
+    @property
+    def latency(self):
+        """
+        Returns:
+            float: Median time cost of recent screenshots, or None if no records.
+        """
+        if not self.costs:
+            return None
+        return float(np.median(self.costs))
+
+    def success(self, cost):
+        self.costs.append(cost)
+        self.failures = 0
+        self.last_record = time.time()
+
+    def failure(self):
+        self.failures += 1
+        self.last_failure = time.time()
+        self.last_record = self.last_failure
+
+    def __str__(self):
+        latency = self.latency
+        latency = 'None' if latency is None else f'{latency:.3f}s'
+        return f'latency={latency}, samples={len(self.costs)}, failures={self.failures}'
+
+
+class ScreenshotMethodSelector:
+    """
+    Rolling latency and failure statistics of screenshot methods,
+    to switch to the fastest healthy method at runtime.
+
+    Methods are measured on every screenshot. Methods not in use are measured by benchmark results,
+    and by probes that take one screenshot with them every once in a while.
+    Methods without enough samples are probed more often, so they can be compared within minutes after start.
+    Switching has hysteresis, another method must be a lot faster and the last switch must be a while ago,
+    except when the current method fails.
+    """
+    # A method is unhealthy after this amount of consecutive failures
+    MAX_FAILURES = 1
+    # Unhealthy methods are not used or probed in this period of seconds
+    FAILURE_COOLDOWN = 1800
+    # Another method should be this times faster to switch
+    SWITCH_RATIO = 0.7
+    # Minimum samples of both methods to compare latency
+    MIN_SAMPLES = 5
+    # Minimum seconds between two switches caused by latency
+    SWITCH_INTERVAL = 600
+    # Seconds between two probes
+    PROBE_INTERVAL = 300
+    # Seconds between two probes, if any method has less than MIN_SAMPLES samples
+    BOOTSTRAP_INTERVAL = 5
+
+    def __init__(self):
+        # Key: method name. Value: MethodStats
+        self.stats = {}
+        # Method names that can be switched to, in preferred order
+        self.candidates = []
+        self.last_switch = 0.
+        self.last_probe = time.time()
+
+    def get(self, method):
+        """
+        Args:
+            method (str):
+
+        Returns:
+            MethodStats:
+        """
+        try:
+            return self.stats[method]
+        except KeyError:
+            stats = MethodStats()
+            self.stats[method] = stats
+            return stats
+
+    def seed(self, results):
+        """
+        Load benchmark results.
+
+        Args:
+            results (list): [[method, cost], ...], cost is float or 'Failed'
+        """
+        self.add_candidates([method for method, _ in results])
+        for method, cost in results:
+            if isinstance(cost, (int, float)):
+                self.get(method).success(cost)
+            else:
+                self.get(method).failure()
+
+    def add_candidates(self, methods):
+        """
+        Args:
+            methods (list[str], tuple[str]): Method names that can be switched to.
+        """
+        for method in methods:
+            if method not in self.candidates:
+                self.candidates.append(method)
+
+    def success(self, method, cost):
+        self.get(method).success(cost)
+
+    def failure(self, method):
+        self.get(method).failure()
+
+    def is_healthy(self, method):
+        stats = self.get(method)
+        if stats.failures < self.MAX_FAILURES:
+            return True
+        return time.time() - stats.last_failure > self.FAILURE_COOLDOWN
+
+    def fallback(self, current):
+        """
+        Args:
+            current (str): Current method, which just failed.
+
+        Returns:
+            str: The fastest healthy method other than current, or None if no method available.
+        """
+        available = [m for m in self.candidates
+                     if m != current and self.is_healthy(m) and self.get(m).latency is not None]
+        if not available:
+            return None
+        self.last_switch = time.time()
+        return min(available, key=lambda m: self.get(m).latency)
+
+    def better(self, current):
+        """
+        Args:
+            current (str):
+
+        Returns:
+            str: A method that is a lot faster than current, or None to stay.
+        """
+        if time.time() - self.last_switch < self.SWITCH_INTERVAL:
+            return None
+        stats = self.get(current)
+        if len(stats.costs) < self.MIN_SAMPLES:
+            return None
+        latency = stats.latency
+        available = [m for m in self.candidates if m != current and self.is_healthy(m)]
+        # Wait until all healthy methods have enough samples, or it may switch twice in a row
+        if not available or any(len(self.get(m).costs) < self.MIN_SAMPLES for m in available):
+            return None
+        best = min(available, key=lambda m: self.get(m).latency)
+        if self.get(best).latency < latency * self.SWITCH_RATIO:
+            self.last_switch = time.time()
+            return best
+        return None
+
+    def probe(self, current):
+        """
+        Args:
+            current (str):
+
+        Returns:
+            str: A method to measure in this screenshot, or None.
+        """
+        # Methods failed in benchmark or recently are not probed
+        available = [m for m in self.candidates if m != current and self.is_healthy(m)]
+        bootstrap = [m for m in available if len(self.get(m).costs) < self.MIN_SAMPLES]
+        interval = self.BOOTSTRAP_INTERVAL if bootstrap else self.PROBE_INTERVAL
+        if time.time() - self.last_probe < interval:
+            return None
+        self.last_probe = time.time()
+        if bootstrap:
+            # The one with the least samples
+            return min(bootstrap, key=lambda m: (len(self.get(m).costs), self.get(m).last_record))
+        if not available:
+            return None
+        # The one measured longest ago
+        return min(available, key=lambda m: self.get(m).last_record)
@@ -0,0 +1,248 @@
+import re
+import secrets
+import shlex
+import socket
+import threading
+import time
+
+from adbutils import AdbDevice, AdbTimeout
+
+from module.logger import logger
+
+
+class ShellSession:
+    """
+    A long-lived `adb shell sh` on one device, commands are sent through its stdin one by one.
+
+    `adb shell <cmd>` opens a new adb connection for every command, and connection setup takes most time
+    of small commands like `getprop` and `input tap`. With many devices on one adb server,
+    short-lived connections may also exhaust the adb server.
+
+    Output of each command is ended with a random sentinel and the exit code:
+        <output>\\n<sentinel>:<exit code>\\n
+    Commands run with stdin redirected to /dev/null, so they can't consume the following commands.
+    If a command times out, the session is closed, since the rest of its output is unknown.
+
+    Only short read-only queries in `ALLOWED` go through the session, see `accepts()`.
+    Other commands need their own connection, they may read stdin, start daemons
+    or run long enough to time out and take the session down with them.
+    """
+    # Command prefixes allowed in session
+    ALLOWED = [
+        ('getprop',),
+        ('dumpsys', 'window'),
+        ('dumpsys', 'activity', 'top'),
+        ('dumpsys', 'package'),
+        ('dumpsys', 'display'),
+        ('pm', 'list'),
+        ('pm', 'path'),
+        ('ps',),
+        ('pidof',),
+        ('echo',),
+    ]
+    # Shell syntax that could chain or redirect commands in a string command
+    REGEX_SHELL_SYNTAX = re.compile(r'[;&|<>`$()\n\\]')
+
+    def __init__(self, device: AdbDevice):
+        """
+        Args:
+            device (AdbDevice):
+        """
+        self.device = device
+        self.lock = threading.Lock()
+        self.stream = None
+        self.prefix = f'ALAS_EOC_{secrets.token_hex(4)}_'
+        self.count = 0
+
+    @classmethod
+    def accepts(cls, cmd):
+        """
+        Args:
+            cmd (list, str):
+
+        Returns:
+            bool: If `cmd` is a short read-only query that can run in session.
+        """
+        if isinstance(cmd, str):
+            if cls.REGEX_SHELL_SYNTAX.search(cmd):
+                return False
+            try:
+                cmd = shlex.split(cmd)
+            except ValueError:
+                return False
+        cmd = tuple(str(c) for c in cmd)
+        for prefix in cls.ALLOWED:
+            if cmd[:len(prefix)] == prefix:
+                return True
+        return False
+
+    @property
+    def is_open(self):
+        return self.stream is not None
+
+    def open(self):
+        if self.stream is not None:
+            return
+        logger.info(f'Open shell session: {self.device.serial}')
+        self.stream = self.device.shell('sh', stream=True)
+
+    def close(self):
+        stream = self.stream
+        self.stream = None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def run(self, cmd, timeout=10, rstrip=True):
+        """
+        Same as `adb shell <cmd>` with stream=False.
+
+        Args:
+            cmd (list, str):
+            timeout (int, float):
+            rstrip (bool): Strip the last empty line
+
+        Returns:
+            str:
+
+        Raises:
+            AdbTimeout:
+            ConnectionResetError: If session closed unexpectedly.
+        """
+        if not isinstance(cmd, str):
+            cmd = ' '.join(shlex.quote(str(c)) for c in cmd)
+
+        with self.lock:
+            self.count += 1
+            sentinel = f'{self.prefix}{self.count}'
+            # Start with a new line in case the command has an unterminated comment
+            script = f'{{ {cmd}\n}} </dev/null 2>&1; printf "\\n%s:%s\\n" {sentinel} $?\n'
+            try:
+                self.open()
+                conn = self.stream.conn
+                conn.settimeout(timeout)
+                conn.sendall(script.encode('utf-8'))
+                output = self._read_until(conn, sentinel.encode(), timeout=timeout)
+            except socket.timeout:
+                self.close()
+                raise AdbTimeout(f'Shell session timeout after {timeout}s: {cmd}')
+            except Exception:
+                self.close()
+                raise
+
+        output = output.decode('utf-8', errors='ignore')
+        return output.rstrip() if rstrip else output
+
+    def _read_until(self, conn, sentinel, timeout):
+        """
+        Args:
+            conn (socket.socket):
+            sentinel (bytes):
+            timeout (int, float):
+
+        Returns:
+            bytes: Command output.
+        """
+        marker = b'\n' + sentinel + b':'
+        data = bytearray()
+        deadline = time.time() + timeout
+        while 1:
+            index = data.find(marker)
+            if index >= 0 and data.find(b'\n', index + len(marker)) >= 0:
+                # Anything after the sentinel line is unexpected, e.g. output from background processes.
+                return bytes(data[:index])
+            if time.time() > deadline:
+                raise socket.timeout
+            chunk = conn.recv(65536)
+            if not chunk:
+                raise ConnectionResetError('Shell session closed by remote')
+            data += chunk
+
+
+class ShellSessionManager:
+    """
+    One shell session per device in this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Key: serial. Value: ShellSession
+        self.sessions = {}
+
+    def get(self, device: AdbDevice) -> ShellSession:
+        with self.lock:
+            session = self.sessions.get(device.serial)
+            if session is None:
+                session = ShellSession(device)
+                self.sessions[device.serial] = session
+            return session
+
+    def release(self, serial):
+        """
+        Args:
+            serial (str): Close sessions of this serial.
+        """
+        with self.lock:
+            session = self.sessions.pop(serial, None)
+        if session is not None:
+            session.close()
+
+
+SHELL_SESSIONS = ShellSessionManager()
+
+
+class PropCache:
+    """
+    System properties of each device, with TTL.
+
+    Properties are read by one `getprop` command that lists them all,
+    so checks like `cpu_abi`, `sdk_ver`, `is_avd` and `nemud.*` share one round trip.
+    Properties not listed are empty strings, same as `getprop <name>`.
+    """
+    # [ro.product.cpu.abi]: [x86_64]
+    REGEX_PROP = re.compile(r'^\[(.*?)]: \[(.*)]$', re.M)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Key: serial. Value: (timestamp, dict of properties)
+        self.props = {}
+
+    def get(self, serial, name, ttl, load):
+        """
+        Args:
+            serial (str):
+            name (str): Property name.
+            ttl (int, float): Seconds to keep properties.
+            load (callable): Function that returns output of `getprop`.
+
+        Returns:
+            str:
+        """
+        with self.lock:
+            row = self.props.get(serial)
+        if row is None or time.time() - row[0] > ttl:
+            output = load()
+            props = {key: value for key, value in self.REGEX_PROP.findall(output)}
+            if not props:
+                # Probably a broken output, don't keep it
+                return ''
+            row = (time.time(), props)
+            with self.lock:
+                self.props[serial] = row
+        return row[1].get(name, '').strip()
+
+    def clear(self, serial=None):
+        """
+        Args:
+            serial (str): Clear properties of this serial, or None to clear all.
+        """
+        with self.lock:
+            if serial is None:
+                self.props.clear()
+            else:
+                self.props.pop(serial, None)
+
+
+PROP_CACHE = PropCache()
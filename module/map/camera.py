@@ -43,11 +43,12 @@ class Camera(MapOperation):
         if np.any(np.abs(vector) > self.config.MAP_SWIPE_DROP):
             # Map grid fit
             if self.config.DEVICE_CONTROL_METHOD == 'minitouch':
-                distance = self.view.swipe_base * self.config.MAP_SWIPE_MULTIPLY_MINITOUCH
+                multiply = self.config.MAP_SWIPE_MULTIPLY_MINITOUCH
             elif self.config.DEVICE_CONTROL_METHOD == 'MaaTouch':
-                distance = self.view.swipe_base * self.config.MAP_SWIPE_MULTIPLY_MAATOUCH
+                multiply = self.config.MAP_SWIPE_MULTIPLY_MAATOUCH
             else:
-                distance = self.view.swipe_base * self.config.MAP_SWIPE_MULTIPLY
+                multiply = self.config.MAP_SWIPE_MULTIPLY
+            distance = self.view.swipe_base * multiply
             # Optimize swipe path
             if self.config.MAP_SWIPE_OPTIMIZE:
                 whitelist, blacklist = self.get_swipe_area_opt(vector)
@@ -56,6 +57,8 @@ class Camera(MapOperation):
 
             vector = distance * vector
             vector = -vector
+            # Map moves 1/multiply of the swipe distance
+            self.view.track(vector / multiply)
             self.device.swipe_vector(vector, name=name, box=box, whitelist_area=whitelist, blacklist_area=blacklist)
             # Donno why initial commit have a sleep here
             # self.device.sleep(0.3)
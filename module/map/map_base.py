@@ -3,6 +3,7 @@ import copy
 from module.base.utils import location2node, node2location
 from module.logger import logger
 from module.map.map_grids import SelectedGrids
+from module.map.map_path import PathEngine
 from module.map.utils import *
 from module.map_detection.grid_info import GridInfo
 
@@ -35,6 +36,9 @@ class CampaignMap:
         self.poor_map_data = False
         self.camera_sight = (-3, -1, 3, 2)
         self.grid_connection = {}
+        self._path_engine = None
+        # All grids, keeps attribute indexes between selects, None to rebuild after grids are replaced
+        self._all_grids = None
 
     def __iter__(self):
         return iter(self.grids.values())
@@ -72,6 +76,8 @@ class CampaignMap:
                 grid = self.grid_class()
                 grid.location = (x, y)
                 self.grids[(x, y)] = grid
+        self._all_grids = None
+        self.path_engine_reset()
 
         # camera_data can be generate automatically, but it's better to set it manually.
         self.camera_data = [location2node(loca) for loca in camera_2d((0, 0, *self._shape), sight=self.camera_sight)]
@@ -117,6 +123,7 @@ class CampaignMap:
 
         for loca, data in self._parse_text(text):
             self.grids[loca].decode(data)
+        self.path_engine_reset()
 
     @property
     def wall_data(self):
@@ -300,6 +307,7 @@ class CampaignMap:
                 self[start].is_portal = False
                 self[start].portal_link = None
 
+        self.path_engine_reset()
         return True
 
     def show(self):
@@ -511,6 +519,23 @@ class CampaignMap:
                  range(self.shape[0] + 1)])
             logger.info(text)
 
+    @property
+    def path_engine(self):
+        """
+        Returns:
+            PathEngine: Rebuilt after `path_engine_reset()`.
+        """
+        if self._path_engine is None:
+            self._path_engine = PathEngine(self, self.grid_connection)
+        return self._path_engine
+
+    def path_engine_reset(self):
+        """
+        PathEngine compiles grids and grid_connection, call this after any of them is replaced or modified.
+        Grid states like is_land and is_enemy don't need this, they are gathered in every solve.
+        """
+        self._path_engine = None
+
     def find_path_initial(self, location, has_ambush=True, has_enemy=True):
         """
         Args:
@@ -519,36 +544,9 @@ class CampaignMap:
             has_enemy (bool): False if only sea and land are considered
         """
         location = location_ensure(location)
-        ambush_cost = 10 if has_ambush else 1
-        for grid in self:
-            grid.cost = 9999
-            grid.connection = None
-        start = self[location]
-        start.cost = 0
-        visited = [start]
-        visited = set(visited)
-
-        while 1:
-            new = visited.copy()
-            for grid in visited:
-                for arr in self.grid_connection[grid.location]:
-                    arr = self[arr]
-                    if arr.is_land or arr.is_mechanism_block:
-                        continue
-                    cost = ambush_cost if arr.may_ambush else 1
-                    cost += grid.cost
-
-                    if cost < arr.cost:
-                        arr.cost = cost
-                        arr.connection = grid.location
-                    elif cost == arr.cost:
-                        if abs(arr.location[0] - grid.location[0]) == 1:
-                            arr.connection = grid.location
-                    if arr.is_sea or not has_enemy:
-                        new.add(arr)
-            if len(new) == len(visited):
-                break
-            visited = new
+        engine = self.path_engine
+        cost, prev = engine.solve([location], has_ambush=has_ambush, has_enemy=has_enemy)[0]
+        engine.apply(cost, prev)
 
         # self.show_cost()
         # self.show_connection()
@@ -561,13 +559,16 @@ class CampaignMap:
             has_ambush (bool): MAP_HAS_AMBUSH
         """
         location_dict = sorted(location_dict.items(), key=lambda kv: (int(kv[1] == current),))
-        for fleet, location in location_dict:
-            if location == ():
-                continue
-            self.find_path_initial(location, has_ambush=has_ambush)
-            attr = f'cost_{fleet}'
-            for grid in self:
-                grid.__setattr__(attr, grid.cost)
+        location_dict = [(fleet, location_ensure(location)) for fleet, location in location_dict if location != ()]
+        if not location_dict:
+            return
+        # Distance fields of all fleets in one pass
+        engine = self.path_engine
+        results = engine.solve([location for _, location in location_dict], has_ambush=has_ambush)
+        for (fleet, _), (cost, prev) in zip(location_dict, results):
+            engine.apply(cost, prev, attr=f'cost_{fleet}', connection=False)
+        # Current fleet is the last one, `cost` and `connection` are from it
+        engine.apply(*results[-1])
 
     def _find_path(self, location):
         """
@@ -783,16 +784,9 @@ class CampaignMap:
         Returns:
             SelectedGrids:
         """
-        result = []
-        for grid in self:
-            flag = True
-            for k, v in kwargs.items():
-                if grid.__getattribute__(k) != v:
-                    flag = False
-            if flag:
-                result.append(grid)
-
-        return SelectedGrids(result)
+        if self._all_grids is None:
+            self._all_grids = SelectedGrids(list(self.grids.values()))
+        return self._all_grids.select_by(kwargs, strict=False)
 
     def to_selected(self, grids):
         """
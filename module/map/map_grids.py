@@ -1,11 +1,52 @@
 import operator
 import typing as t
 
+import numpy as np
+
+
+class AttributeVersion:
+    """
+    Count attribute modifications of all instances, by attribute name,
+    so SelectedGrids knows when its attribute indexes are outdated.
+    """
+    # Modifications of all attributes
+    attr_version = 0
+    # Key: attribute name. Value: modifications of this attribute
+    attr_versions = {}
+
+    def __setattr__(self, key, value):
+        AttributeVersion.attr_version += 1
+        versions = AttributeVersion.attr_versions
+        versions[key] = versions.get(key, 0) + 1
+        object.__setattr__(self, key, value)
+
+    @classmethod
+    def version(cls, attr):
+        """
+        Args:
+            attr (str):
+
+        Returns:
+            int: Modifications of a plain attribute.
+                Properties are derived from other attributes, they use modifications of all attributes.
+        """
+        if hasattr(getattr(cls, attr, None), '__get__'):
+            return AttributeVersion.attr_version
+        return AttributeVersion.attr_versions.get(attr, 0)
+
 
 class SelectedGrids:
     def __init__(self, grids):
         self.grids = grids
         self.indexes: t.Dict[tuple, SelectedGrids] = {}
+        # Attribute indexes for `select()`, only for AttributeVersion objects
+        # Key: (attr, strict). Value: (version, dict), dict key: value or (type, value), value: np.ndarray of positions
+        self._attr_indexes = {}
+        # Attributes selected once, index them on the second select in the same version
+        # Key: (attr, strict). Value: version
+        self._attr_queried = {}
+        # (grids, classes of grids, or None if not all AttributeVersion objects)
+        self._tracked = (None, None)
 
     def __iter__(self):
         return iter(self.grids)
@@ -72,16 +113,104 @@ class SelectedGrids:
         Returns:
             SelectedGrids:
         """
-        def matched(obj):
-            flag = True
-            for k, v in kwargs.items():
-                obj_v = obj.__getattribute__(k)
-                if type(obj_v) != type(v) or obj_v != v:
-                    flag = False
-            return flag
+        return self.select_by(kwargs, strict=True)
+
+    def select_by(self, kwargs, strict=True):
+        """
+        Args:
+            kwargs (dict): Attributes of Grid.
+            strict (bool): True to match type and value, False to match value only.
+
+        Returns:
+            SelectedGrids:
+        """
+        positions = None
+        for k, v in kwargs.items():
+            index = self._attribute_index(k, strict)
+            if index is None:
+                return self._select_scan(kwargs, strict)
+            try:
+                found = index.get((type(v), v) if strict else v)
+            except TypeError:
+                # Unhashable
+                return self._select_scan(kwargs, strict)
+            if found is None or v != v:
+                return SelectedGrids([])
+            positions = found if positions is None else np.intersect1d(positions, found, assume_unique=True)
+
+        if positions is None:
+            return SelectedGrids(list(self.grids))
+        grids = self.grids
+        return SelectedGrids([grids[i] for i in positions.tolist()])
+
+    def _select_scan(self, kwargs, strict):
+        if strict:
+            def matched(obj):
+                for k, v in kwargs.items():
+                    obj_v = obj.__getattribute__(k)
+                    if type(obj_v) != type(v) or obj_v != v:
+                        return False
+                return True
+        else:
+            def matched(obj):
+                for k, v in kwargs.items():
+                    if obj.__getattribute__(k) != v:
+                        return False
+                return True
 
         return SelectedGrids([grid for grid in self.grids if matched(grid)])
 
+    def _attribute_index(self, attr, strict):
+        """
+        Index grids by attribute value.
+        An index is dropped when this attribute of any AttributeVersion object changes,
+        or any attribute changes, if it's a property.
+
+        Args:
+            attr (str):
+            strict (bool):
+
+        Returns:
+            dict: Key: value if not strict, (type, value) if strict. Value: np.ndarray of positions.
+                None if not indexed.
+        """
+        grids, classes = self._tracked
+        if grids is not self.grids:
+            classes = set(type(grid) for grid in self.grids)
+            if not all(issubclass(cls, AttributeVersion) for cls in classes):
+                classes = None
+            self._tracked = (self.grids, classes)
+            self._attr_indexes = {}
+            self._attr_queried = {}
+        if classes is None:
+            return None
+
+        version = max([cls.version(attr) for cls in classes], default=0)
+        key = (attr, strict)
+        try:
+            index_version, index = self._attr_indexes[key]
+            if index_version == version:
+                return index
+        except KeyError:
+            pass
+        # Scanning is faster for one-off selects
+        if self._attr_queried.get(key) != version:
+            self._attr_queried[key] = version
+            return None
+
+        index = {}
+        try:
+            for i, grid in enumerate(self.grids):
+                v = grid.__getattribute__(attr)
+                index.setdefault((type(v), v) if strict else v, []).append(i)
+        except TypeError:
+            # Unhashable values
+            index = None
+        if index is not None:
+            index = {k: np.array(v, dtype=np.int64) for k, v in index.items()}
+        self._attr_indexes[key] = (version, index)
+        return index
+
     def create_index(self, *attrs):
         indexes = {}
         # index_keys = [(grid.__getattribute__(attr) for attr in attrs) for grid in self.grids]
@@ -243,7 +372,13 @@ class SelectedGrids:
         Returns:
             SelectedGrids:
         """
-        g = [grid for grid in self.grids if grid not in grids]
+        try:
+            exclude = set(grids)
+        except TypeError:
+            # Unhashable
+            g = [grid for grid in self.grids if grid not in grids]
+            return SelectedGrids(g)
+        g = [grid for grid in self.grids if grid not in exclude]
         return SelectedGrids(g)
 
     def sort(self, *args):
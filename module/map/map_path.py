@@ -0,0 +1,159 @@
+import numpy as np
+
+# Cost of unreachable grids, same as GridInfo.cost
+COST_UNREACHABLE = 9999
+_INF = 1 << 30
+
+
+class PathEngine:
+    """
+    Shortest path on a campaign map with numpy arrays.
+
+    `CampaignMap.find_path_initial` used to relax GridInfo objects round by round in Python,
+    and `find_path_initial_multi_fleet` repeated it for each fleet.
+    Here, grid connections, including walls and portals, are compiled into edge arrays once,
+    grid states are gathered into arrays, and distance fields of all fleets are relaxed together.
+    Results are cached until grid states change.
+
+    Rules are the same as the old implementation:
+    - Land and mechanism blocks can't be entered.
+    - Entering a grid that may have ambush costs `ambush_cost`, otherwise 1.
+    - Paths only go through sea grids, unless `has_enemy` is False. Enemies are reachable but not passable.
+    - If several neighbours give the same cost, prefer the horizontal one.
+    """
+
+    def __init__(self, grids, grid_connection):
+        """
+        Args:
+            grids (list[GridInfo]):
+            grid_connection (dict): Key: location. Value: set of connected locations.
+        """
+        self.grids = list(grids)
+        self.locations = [grid.location for grid in self.grids]
+        self.index = {location: i for i, location in enumerate(self.locations)}
+
+        src, dst = [], []
+        for location, connection in grid_connection.items():
+            i = self.index.get(location)
+            if i is None:
+                continue
+            # Sorted, so results don't depend on set order
+            for other in sorted(connection):
+                j = self.index.get(other)
+                if j is not None:
+                    src.append(i)
+                    dst.append(j)
+        self.src = np.array(src, dtype=np.int64)
+        self.dst = np.array(dst, dtype=np.int64)
+        locations = np.array(self.locations, dtype=np.int64).reshape(-1, 2)
+        if len(self.src):
+            self.horizontal = np.abs(locations[self.src, 0] - locations[self.dst, 0]) == 1
+        else:
+            self.horizontal = np.zeros(0, dtype=bool)
+
+        self._state = None
+        # Key: source index. Value: (cost, connection) arrays
+        self._cache = {}
+
+    def _gather(self, has_ambush, has_enemy):
+        """
+        Returns:
+            tuple: passable, step cost, expandable arrays of grids.
+        """
+        ambush_cost = 10 if has_ambush else 1
+        passable = np.array([not (g.is_land or g.is_mechanism_block) for g in self.grids], dtype=bool)
+        step = np.array([ambush_cost if g.may_ambush else 1 for g in self.grids], dtype=np.int64)
+        if has_enemy:
+            expandable = np.array([g.is_sea for g in self.grids], dtype=bool)
+        else:
+            expandable = np.ones(len(self.grids), dtype=bool)
+        return passable, step, expandable
+
+    def _relax(self, sources, passable, step, expandable):
+        """
+        Args:
+            sources (list[int]): Index of start grids.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Cost and predecessor index (-1 for none), shape (len(sources), n).
+        """
+        n = len(self.grids)
+        fleets = len(sources)
+        rows = np.arange(fleets)
+        cost = np.full((fleets, n), _INF, dtype=np.int64)
+        cost[rows, sources] = 0
+        # Start grid is always expanded
+        expand = np.repeat(expandable[np.newaxis], fleets, axis=0)
+        expand[rows, sources] = True
+
+        edge = passable[self.dst]
+        src, dst, horizontal = self.src[edge], self.dst[edge], self.horizontal[edge]
+        flat_dst = (rows[:, np.newaxis] * n + dst[np.newaxis]).ravel()
+        while 1:
+            # Costs through every edge of every fleet at once
+            cand = np.where(expand[:, src], cost[:, src], _INF) + step[dst]
+            new = cost.copy().ravel()
+            np.minimum.at(new, flat_dst, cand.ravel())
+            new = new.reshape(fleets, n)
+            if np.array_equal(new, cost):
+                break
+            cost = new
+
+        # Pick predecessors, minimum cost first, then horizontal, then edge order.
+        prev = np.full((fleets, n), -1, dtype=np.int64)
+        cand = np.where(expand[:, src], cost[:, src], _INF) + step[dst]
+        for f in range(fleets):
+            best = (cand[f] == cost[f, dst]) & (cand[f] < _INF)
+            best[dst == sources[f]] = False
+            order = np.flatnonzero(best)
+            if not len(order):
+                continue
+            order = order[np.lexsort((order, ~horizontal[order], dst[order]))]
+            targets, first = np.unique(dst[order], return_index=True)
+            prev[f, targets] = src[order[first]]
+        cost[cost >= _INF] = COST_UNREACHABLE
+        return cost, prev
+
+    def solve(self, locations, has_ambush=True, has_enemy=True):
+        """
+        Args:
+            locations (list[tuple]): Start locations.
+            has_ambush (bool): MAP_HAS_AMBUSH
+            has_enemy (bool): False if only sea and land are considered
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Cost and predecessor index of each start location.
+        """
+        passable, step, expandable = self._gather(has_ambush, has_enemy)
+        state = (passable.tobytes(), step.tobytes(), expandable.tobytes())
+        if state != self._state:
+            self._state = state
+            self._cache = {}
+
+        sources = [self.index[tuple(location)] for location in locations]
+        missing = [s for s in dict.fromkeys(sources) if s not in self._cache]
+        if missing:
+            cost, prev = self._relax(missing, passable, step, expandable)
+            for row, s in enumerate(missing):
+                self._cache[s] = (cost[row], prev[row])
+        return [self._cache[s] for s in sources]
+
+    def apply(self, cost, prev, attr='cost', connection=True):
+        """
+        Write results to GridInfo.
+
+        Args:
+            cost (np.ndarray):
+            prev (np.ndarray):
+            attr (str): Attribute name of cost.
+            connection (bool): If write `GridInfo.connection`
+        """
+        cost = cost.tolist()
+        if connection:
+            locations = self.locations
+            for grid, c, p in zip(self.grids, cost, prev.tolist()):
+                grid.__setattr__(attr, c)
+                grid.connection = locations[p] if p >= 0 else None
+        else:
+            for grid, c in zip(self.grids, cost):
+                grid.__setattr__(attr, c)
@@ -53,3 +53,15 @@ class MapDetector:
         self.lower_edge = bool(self.backend.lower_edge)
         self.upper_edge = bool(self.backend.upper_edge)
         self.generate = self.backend.generate
+
+    def track(self, vector):
+        """
+        Tell backend the camera movement before the next `load()`,
+        so it can predict grid lattice instead of a full detection.
+        Only homography backend supports tracking.
+
+        Args:
+            vector (tuple, np.ndarray): Map movement on screen in pixels.
+        """
+        if isinstance(self.backend, Homography):
+            self.backend.track(vector)
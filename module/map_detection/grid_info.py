@@ -1,7 +1,8 @@
 from module.base.utils import location2node
+from module.map.map_grids import AttributeVersion
 
 
-class GridInfo:
+class GridInfo(AttributeVersion):
     """
     Class that gather basic information of a grid in map_v1.
 
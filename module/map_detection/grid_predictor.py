@@ -8,6 +8,9 @@ from module.template.assets import *
 
 
 class GridPredictor:
+    # Shared by all grids in a view during View.predict(), see PredictorBatch.
+    batch = None
+
     def __init__(self, location, image, corner, config):
         """
         Args:
@@ -164,6 +167,28 @@ class GridPredictor:
         count = cv2.countNonZero(image)
         return count
 
+    def relative_match(self, template, area, shape, color=None, similarity=0.85):
+        """
+        Args:
+            template (Template):
+            area (tuple): upper_left_x, upper_left_y, bottom_right_x, bottom_right_y, such as (-1, -1, 1, 1).
+            shape (tuple): Output image shape, (width, height).
+            color (tuple): Target RGB to match on color_similarity_2d(), None to match on rgb2gray().
+            similarity (float): 0 to 1.
+
+        Returns:
+            bool: If matches.
+        """
+        if self.batch is not None:
+            return self.batch.similarity(self, template, area, shape, color) > similarity
+
+        image = self.relative_crop(area, shape=shape)
+        if color is None:
+            image = rgb2gray(image)
+        else:
+            image = color_similarity_2d(image, color=color)
+        return template.match(image, similarity=similarity)
+
     def predict_enemy_scale(self):
         """
         Detect the icon on the upper-left which shows enemy scale: Large, Middle, Small.
@@ -171,15 +196,15 @@ class GridPredictor:
         Returns:
             int: 1: Small, 2: Middle, 3: Large, 0: Unknown.
         """
-        image = self.relative_crop((-0.415 - 0.7, -0.62 - 0.7, -0.415, -0.62), shape=(50, 50))
-        red = color_similarity_2d(image, (255, 130, 132))
-        yellow = color_similarity_2d(image, (255, 235, 156))
+        area = (-0.415 - 0.7, -0.62 - 0.7, -0.415, -0.62)
+        red = (255, 130, 132)
+        yellow = (255, 235, 156)
 
-        if TEMPLATE_ENEMY_L.match(red, similarity=0.75):
+        if self.relative_match(TEMPLATE_ENEMY_L, area, shape=(50, 50), color=red, similarity=0.75):
             scale = 3
-        elif TEMPLATE_ENEMY_M.match(yellow):
+        elif self.relative_match(TEMPLATE_ENEMY_M, area, shape=(50, 50), color=yellow):
             scale = 2
-        elif TEMPLATE_ENEMY_S.match(yellow):
+        elif self.relative_match(TEMPLATE_ENEMY_S, area, shape=(50, 50), color=yellow):
             scale = 1
         else:
             scale = 0
@@ -202,7 +227,6 @@ class GridPredictor:
                 if TEMPLATE_ENEMY_BOSS.match(image, similarity=0.7):
                     return 'Siren_Siren'
 
-        image_dic = {}
         scaling_dic = self.config.MAP_ENEMY_GENRE_DETECTION_SCALING
         for name, template in self.template_enemy_genre.items():
             if template is None:
@@ -215,11 +239,9 @@ class GridPredictor:
             scaling = scaling_dic.get(short_name, 1)
             scaling = (scaling,) if not isinstance(scaling, tuple) else scaling
             for scale in scaling:
-                if scale not in image_dic:
-                    shape = tuple(np.round(np.array((60, 60)) * scale).astype(int))
-                    image_dic[scale] = rgb2gray(self.relative_crop((-0.5, -1, 0.5, 0), shape=shape))
-
-                if template.match(image_dic[scale], similarity=self.config.MAP_ENEMY_GENRE_SIMILARITY):
+                shape = tuple(np.round(np.array((60, 60)) * scale).astype(int).tolist())
+                if self.relative_match(template, (-0.5, -1, 0.5, 0), shape=shape,
+                                       similarity=self.config.MAP_ENEMY_GENRE_SIMILARITY):
                     return name
 
         return None
@@ -228,9 +250,8 @@ class GridPredictor:
         if self.enemy_genre == 'Siren_Siren':
             return False
 
-        image = self.relative_crop((-0.55, -0.2, 0.45, 0.2), shape=(50, 20))
-        image = color_similarity_2d(image, color=(255, 77, 82))
-        if TEMPLATE_ENEMY_BOSS.match(image, similarity=0.75):
+        if self.relative_match(TEMPLATE_ENEMY_BOSS, (-0.55, -0.2, 0.45, 0.2), shape=(50, 20), color=(255, 77, 82),
+                               similarity=0.75):
             return True
 
         # Small boss icon
@@ -246,14 +267,11 @@ class GridPredictor:
         return self.relative_rgb_count(area=(-0.5, -1, 0.5, 0), color=(255, 255, 60), shape=(50, 50)) > 35
 
     def predict_fleet(self):
-        image = self.relative_crop((-1, -2, -0.5, -1.5), shape=(50, 50))
-        image = color_similarity_2d(image, color=(255, 255, 255))
-        return TEMPLATE_FLEET_AMMO.match(image)
+        return self.relative_match(TEMPLATE_FLEET_AMMO, (-1, -2, -0.5, -1.5), shape=(50, 50), color=(255, 255, 255))
 
     def predict_submarine(self):
-        image = self.relative_crop((-0.86, 0.08, -0.36, 0.58), shape=(50, 50))
-        image = color_similarity_2d(image, color=(255, 243, 156))
-        return TEMPLATE_SUBMARINE.match(image)
+        return self.relative_match(TEMPLATE_SUBMARINE, (-0.86, 0.08, -0.36, 0.58), shape=(50, 50),
+                                   color=(255, 243, 156))
 
     def predict_caught_by_siren(self):
         image = self.relative_crop((-1, -1.5, 1, 0.5), shape=(120, 120))
@@ -348,3 +366,102 @@ class GridPredictor:
         res = cv2.matchTemplate(piece_2, piece_1, cv2.TM_CCOEFF_NORMED)
         _, similarity, _, point = cv2.minMaxLoc(res)
         return similarity > threshold
+
+
+class PredictorBatch:
+    """
+    Template matching on relative crops of all grids in a view, one call for all grids.
+
+    Grids ask for similarities one by one in GridPredictor.predict(), with the same template, area and shape.
+    The first request computes it for all grids: crops are stacked into one tall image,
+    color processed at once, and matched with one cv2.matchTemplate() call.
+
+    Examples:
+        batch = PredictorBatch(grids)
+        for grid in grids:
+            grid.batch = batch
+            try:
+                grid.predict()
+            finally:
+                grid.batch = None
+    """
+
+    def __init__(self, grids):
+        """
+        Args:
+            grids (list[GridPredictor]):
+        """
+        self.grids = list(grids)
+        # Key: grid object id. Value: index in self.grids
+        self.index = {id(grid): index for index, grid in enumerate(self.grids)}
+        # Key: (area, shape, color). Value: np.ndarray, processed crops stacked vertically.
+        # Key: (area, shape). Value: np.ndarray, crops in RGB stacked vertically.
+        self.images = {}
+        # Key: (template file, area, shape, color). Value: np.ndarray, similarity of each grid.
+        self.similarities = {}
+
+    def image(self, area, shape, color):
+        """
+        Args:
+            area (tuple): upper_left_x, upper_left_y, bottom_right_x, bottom_right_y, such as (-1, -1, 1, 1).
+            shape (tuple): Output image shape, (width, height).
+            color (tuple): Target RGB to use color_similarity_2d(), None to use rgb2gray().
+
+        Returns:
+            np.ndarray: Shape (height * len(grids), width).
+        """
+        key = (area, shape, color)
+        try:
+            return self.images[key]
+        except KeyError:
+            pass
+
+        try:
+            image = self.images[(area, shape)]
+        except KeyError:
+            width, height = shape
+            image = np.empty((len(self.grids) * height, width, 3), dtype=np.uint8)
+            for index, grid in enumerate(self.grids):
+                image[index * height:(index + 1) * height] = grid.relative_crop(area, shape=shape)
+            self.images[(area, shape)] = image
+
+        if color is None:
+            image = rgb2gray(image)
+        else:
+            image = color_similarity_2d(image, color=color)
+
+        self.images[key] = image
+        return image
+
+    def similarity(self, grid, template, area, shape, color=None):
+        """
+        Args:
+            grid (GridPredictor):
+            template (Template):
+            area (tuple):
+            shape (tuple):
+            color (tuple):
+
+        Returns:
+            float: Same as the similarity in Template.match() on this grid.
+        """
+        key = (template.file, area, shape, color)
+        try:
+            return self.similarities[key][self.index[id(grid)]]
+        except KeyError:
+            pass
+
+        width, height = shape
+        image = self.image(area, shape, color)
+        templates = template.image if template.is_gif else [template.image]
+        similarity = np.full(len(self.grids), -1., dtype=np.float32)
+        for frame in templates:
+            t_height = frame.shape[0]
+            res = cv2.matchTemplate(image, frame, cv2.TM_CCOEFF_NORMED)
+            # Drop results across two crops, leaving (grids, height - t_height + 1, width - t_width + 1)
+            res = np.concatenate([res, np.full((t_height - 1, res.shape[1]), -1., dtype=res.dtype)])
+            res = res.reshape(len(self.grids), height, -1)[:, :height - t_height + 1]
+            np.maximum(similarity, res.max(axis=(1, 2)), out=similarity)
+
+        self.similarities[key] = similarity
+        return similarity[self.index[id(grid)]]
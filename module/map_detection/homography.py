@@ -52,6 +52,8 @@ class Homography:
     homo_size: tuple
     homo_loca: np.ndarray
     homo_loaded: bool
+    # Predicted homo_loca of the next detection, or None
+    track_loca: np.ndarray
 
     map_inner: np.ndarray
     _map_edge_count: tuple
@@ -63,6 +65,7 @@ class Homography:
         """
         self.config = config
         self.homo_loaded = False
+        self.track_loca = None
 
     @cached_property
     def ui_mask_homo_stroke(self):
@@ -152,6 +155,7 @@ class Homography:
         self.homo_invt = cv2.invert(homo)[1]
         self.homo_size = tuple(size.tolist())
         self.homo_loaded = True
+        self.track_loca = None
 
     def detect(self, image):
         """
@@ -178,17 +182,22 @@ class Homography:
         # Image.fromarray(image_edge, mode='L').show()
 
         # Find free tile
-        if self.search_tile_center(image_edge, threshold_good=self.config.HOMO_CENTER_GOOD_THRESHOLD,
-                                   threshold=self.config.HOMO_CENTER_THRESHOLD):
+        if self.search_tile_track(image_edge, threshold=self.config.HOMO_CENTER_GOOD_THRESHOLD):
+            pass
+        elif self.search_tile_center(image_edge, threshold_good=self.config.HOMO_CENTER_GOOD_THRESHOLD,
+                                     threshold=self.config.HOMO_CENTER_THRESHOLD):
             pass
         elif self.search_tile_corner(image_edge, threshold=self.config.HOMO_CORNER_THRESHOLD):
             pass
         elif self.search_tile_rectangle(image_edge, threshold=self.config.HOMO_RECTANGLE_THRESHOLD):
             pass
         else:
+            self.track_loca = None
             raise MapDetectionError('Failed to find a free tile')
 
         self.homo_loca %= self.config.HOMO_TILE
+        # Camera usually stays, track the current lattice until told otherwise
+        self.track_loca = self.homo_loca.copy() if self.config.HOMO_TRACK else None
 
         # Detect map edges
         self.lower_edge, self.upper_edge, self.left_edge, self.right_edge = False, False, False, False
@@ -214,6 +223,71 @@ class Homography:
             point2str(*self.homo_loca, length=3))
                     )
 
+    def track(self, vector):
+        """
+        Predict grid lattice of the next detection from camera movement.
+        Camera moves on a plane parallel to the map, which is a translation after perspective transform.
+        The map under screen center moves by `vector` on screen, so the lattice moves by
+        the difference of its two ends after transform.
+
+        Args:
+            vector (tuple, np.ndarray): Map movement on screen in pixels, such as the swipe in `_map_swipe()`.
+        """
+        if not self.config.HOMO_TRACK or self.track_loca is None:
+            return
+        center = np.subtract(self.config.SCREEN_CENTER, self.config.DETECTING_AREA[:2])
+        start, end = perspective_transform([center, np.add(center, vector)], data=self.homo_data)
+        self.track_loca = (self.track_loca + end - start) % self.config.HOMO_TILE
+
+    def search_tile_track(self, image, threshold=0.9):
+        """
+        Search for the center of empty tile, only around the lattice predicted by `track()`.
+        This is a shortcut of `search_tile_center()`, which runs template matching on the whole image.
+        Tiles close to screen center are checked one by one in small areas, within HOMO_TRACK_RANGE pixels.
+
+        Args:
+            image (np.ndarray): Monochrome image.
+            threshold (float):
+
+        Returns:
+            bool: If success. Returns False to fallback to full search.
+        """
+        if self.track_loca is None:
+            return False
+        template = ASSETS.tile_center_image
+        size = np.array(template.shape[::-1])
+        shape = np.array(image.shape[::-1])
+        tile = np.array(self.config.HOMO_TILE)
+        pad = self.config.HOMO_TRACK_RANGE
+
+        # Upper-left of templates on predicted tiles
+        first = (self.track_loca + self.config.HOMO_CENTER_OFFSET) % tile
+        x = np.arange(first[0], shape[0] - size[0] + 1, tile[0])
+        y = np.arange(first[1], shape[1] - size[1] + 1, tile[1])
+        if not len(x) or not len(y):
+            return False
+        tiles = np.array(np.meshgrid(x, y)).reshape((2, -1)).T
+        center = perspective_transform(
+            [np.subtract(self.config.SCREEN_CENTER, self.config.DETECTING_AREA[:2])], data=self.homo_data)[0]
+        tiles = tiles[np.argsort(np.linalg.norm(tiles + size / 2 - center, axis=1))]
+
+        similarity = 0
+        for loca in tiles[:self.config.HOMO_TRACK_TILES]:
+            x1, y1 = np.maximum(np.round(loca - pad).astype(int), 0)
+            x2, y2 = np.minimum(np.round(loca + size + pad).astype(int), shape)
+            result = cv2.matchTemplate(image[y1:y2, x1:x2], template, cv2.TM_CCOEFF_NORMED)
+            _, sim, _, loca = cv2.minMaxLoc(result)
+            similarity = max(similarity, sim)
+            if sim > threshold:
+                loca = np.add(loca, (x1, y1))
+                self.homo_loca = loca - self.config.HOMO_CENTER_OFFSET
+                self.map_inner = loca
+                logger.attr_align('tile_track', f'{float2str(sim)} (good match)')
+                return True
+
+        logger.attr_align('tile_track', f'{float2str(similarity)} (bad match)')
+        return False
+
     def search_tile_center(self, image, threshold_good=0.9, threshold=0.8, encourage=1.0):
         """
         Search for the center of empty tile.
@@ -0,0 +1,536 @@
+import math
+
+import numpy as np
+from scipy import signal
+
+
+class PeakFinder:
+    """
+    Same as `scipy.signal.find_peaks()` on flattened images, for the parameters used in map detection.
+
+    `scipy.signal.find_peaks()` walks through samples one by one for prominences and widths,
+    which is slow on flattened images without `wlen`, as each peak searches until a higher one.
+    Here, local maxima are found on the whole array at once, the rest only work on peaks,
+    prominences and widths are range queries on a `BlockTable` of the array.
+    Images are flattened into reused buffers instead of `np.pad()` and `ravel()` copies.
+
+    Results are the same as scipy. Parameters other than height, distance, prominence, width and wlen
+    are passed to scipy.
+
+    Horizontal and vertical passes of an image are done in one call, see `image_hv()`,
+    both flattened images are in one signal, as two segments that don't affect each other.
+    """
+    SUPPORTED = ('height', 'distance', 'prominence', 'width', 'wlen')
+
+    def __init__(self):
+        # Key: (shape, dtype, pad). Value: (signal buffer, output buffer, segment bounds)
+        self.buffers = {}
+
+    def find_peaks(self, x, **param):
+        """
+        Args:
+            x (np.ndarray): 1D array.
+            **param: Parameters of `scipy.signal.find_peaks()`
+
+        Returns:
+            np.ndarray: Indices of peaks.
+        """
+        if not self._supported(param):
+            return signal.find_peaks(x, **param)[0]
+        return self._find_peaks(x, param, bounds=np.array([0, len(x)]))
+
+    @classmethod
+    def _supported(cls, param):
+        """
+        Returns:
+            bool: If parameters can be done here, instead of scipy.
+        """
+        return all(key in cls.SUPPORTED for key in param) \
+            and not any(isinstance(value, np.ndarray) for value in param.values())
+
+    def _find_peaks(self, x, param, bounds):
+        """
+        Args:
+            x (np.ndarray): 1D array.
+            param (dict): Supported parameters of `scipy.signal.find_peaks()`
+            bounds (np.ndarray): Start of each segment and the end of the last one.
+                Peaks in each segment are the same as `scipy.signal.find_peaks(x[start:end])`.
+
+        Returns:
+            np.ndarray: Indices of peaks.
+        """
+        table = BlockTable(x)
+        height = param.get('height', None)
+        peaks = self._local_maxima(x, table, bounds, height)
+        distance = param.get('distance', None)
+        if distance is not None:
+            split = np.searchsorted(peaks, bounds[1:-1])
+            keep = [self._select_by_distance(p, x[p], distance) for p in np.split(peaks, split)]
+            peaks = peaks[np.concatenate(keep)]
+
+        prominence, width = param.get('prominence', None), param.get('width', None)
+        if prominence is None and width is None:
+            return peaks
+        wlen = param.get('wlen', None)
+        segment = np.searchsorted(bounds, peaks, side='right') - 1
+        prominences, left_bases, right_bases = self._prominences(
+            x, table, peaks, bounds[segment], bounds[segment + 1] - 1, wlen)
+        if prominence is not None:
+            keep = self._select(prominences, prominence)
+            peaks, prominences = peaks[keep], prominences[keep]
+            left_bases, right_bases = left_bases[keep], right_bases[keep]
+        if width is not None:
+            widths = self._widths(x, table, peaks, prominences, left_bases, right_bases)
+            peaks = peaks[self._select(widths, width)]
+        return peaks
+
+    @staticmethod
+    def _select(values, interval):
+        """
+        Args:
+            values (np.ndarray):
+            interval: Minimum, or tuple of (minimum, maximum), None for no limit.
+
+        Returns:
+            np.ndarray: Mask.
+        """
+        try:
+            vmin, vmax = interval
+        except (TypeError, ValueError):
+            vmin, vmax = interval, None
+        keep = np.ones(len(values), dtype=bool)
+        if vmin is not None:
+            keep &= vmin <= values
+        if vmax is not None:
+            keep &= values <= vmax
+        return keep
+
+    @classmethod
+    def _local_maxima(cls, x, table, bounds, height=None):
+        """
+        Local maxima, a flat peak is at its middle (rounded down). Samples at both ends of segments are not peaks.
+
+        Args:
+            x (np.ndarray):
+            table (BlockTable):
+            bounds (np.ndarray): Start of each segment and the end of the last one.
+            height: Minimum, or tuple of (minimum, maximum), None for no limit.
+
+        Returns:
+            np.ndarray: Peaks within height.
+        """
+        n = len(x)
+        # Peaks start at a rising edge
+        rising = np.zeros(n, dtype=bool)
+        np.greater(x[1:], x[:-1], out=rising[1:])
+        rising[bounds[:-1]] = False
+        if height is not None:
+            rising &= cls._select(x, height)
+        # Sharp peaks, most of them
+        peaks = rising.copy()
+        peaks[:-1] &= x[:-1] > x[1:]
+        peaks[bounds[1:] - 1] = False
+        # Flat peaks, find the end of flat, most of them have only a few samples
+        rising[:-1] &= x[:-1] == x[1:]
+        rising[bounds[1:] - 1] = False
+        start = np.flatnonzero(rising)
+        value = x[start]
+        # End of the segment of each flat
+        limit = bounds[np.searchsorted(bounds, start, side='right')]
+        end = start + 2
+        todo = np.arange(len(start))
+        for _ in range(8):
+            todo = todo[end[todo] < limit[todo]]
+            todo = todo[x[end[todo]] == value[todo]]
+            if not len(todo):
+                break
+            end[todo] += 1
+        todo = todo[end[todo] < limit[todo]]
+        if len(todo):
+            # Long flats, search the first sample that is different
+            higher = table.find(end[todo], limit[todo] - 1, value[todo], greater=True, last=False)
+            lower = table.find(end[todo], limit[todo] - 1, np.nextafter(value[todo], -np.inf),
+                               greater=False, last=False)
+            higher[higher < 0] = n
+            lower[lower < 0] = n
+            end[todo] = np.minimum(np.minimum(higher, lower), limit[todo])
+
+        flat = end < limit
+        flat[flat] = x[end[flat]] < value[flat]
+        peaks[(start[flat] + end[flat] - 1) // 2] = True
+        return np.flatnonzero(peaks)
+
+    @staticmethod
+    def _select_by_distance(peaks, heights, distance):
+        """
+        Keep higher peaks and remove lower peaks within `distance`, same order as scipy.
+
+        Peaks are processed in rounds instead of one by one.
+        In each round, peaks higher than all undecided neighbours are kept, and their neighbours are removed,
+        which is the same as processing from the highest.
+        """
+        n = len(peaks)
+        if n < 2:
+            return np.ones(n, dtype=bool)
+        distance = math.ceil(distance)
+        # Same priority as scipy, including the order of equal heights
+        rank = np.empty(n, dtype=np.int32)
+        rank[np.argsort(heights.astype(np.float64))] = np.arange(n)
+
+        keep = np.zeros(n, dtype=bool)
+        index = np.arange(n)
+        while len(index):
+            # Neighbours of peaks[i] are peaks[lower[i]:upper[i]], among undecided peaks
+            m = len(index)
+            if m * 16 > peaks[-1] - peaks[0]:
+                # Dense peaks, count[i + distance] is the number of peaks <= i
+                count = np.zeros(peaks[-1] - peaks[0] + 2 * distance, dtype=np.int64)
+                count[peaks - peaks[0] + distance] = 1
+                count = np.cumsum(count)
+                lower = count[peaks - peaks[0]]
+                upper = count[peaks - peaks[0] + 2 * distance - 1]
+            else:
+                lower = np.searchsorted(peaks, peaks - distance, side='right')
+                upper = np.searchsorted(peaks, peaks + distance, side='left')
+
+            # Range maximum of rank
+            level = np.log2(upper - lower).astype(np.int64)
+            highest = np.empty(m, dtype=np.int32)
+            table = rank
+            for k in range(int(level.max()) + 1):
+                if k:
+                    half = 1 << (k - 1)
+                    table = table.copy()
+                    table[:m - half] = np.maximum(table[:m - half], table[half:])
+                row = np.flatnonzero(level == k)
+                highest[row] = np.maximum(table[lower[row]], table[upper[row] - (1 << k)])
+            highest = highest == rank
+            keep[index[highest]] = True
+
+            # Remove neighbours of kept peaks, including themselves
+            removed = np.bincount(lower[highest], minlength=m + 1) - np.bincount(upper[highest], minlength=m + 1)
+            removed = np.cumsum(removed[:m]) > 0
+            index, peaks, rank = index[~removed], peaks[~removed], rank[~removed]
+        return keep
+
+    @staticmethod
+    def _prominences(x, table, peaks, left_bound, right_bound, wlen=None):
+        """
+        Same as `scipy.signal.peak_prominences()`.
+
+        Args:
+            x (np.ndarray):
+            table (BlockTable):
+            peaks (np.ndarray):
+            left_bound (np.ndarray): First sample of the segment of each peak.
+            right_bound (np.ndarray): Last sample of the segment of each peak.
+            wlen (int, float):
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: prominences, left_bases, right_bases
+        """
+        heights = x[peaks]
+        if wlen is not None:
+            wlen = math.ceil(wlen)
+        if wlen is not None and wlen >= 2:
+            left_bound = np.maximum(peaks - wlen // 2, left_bound)
+            right_bound = np.minimum(peaks + wlen // 2, right_bound)
+
+        # Bases are the lowest samples before reaching a higher sample, the ones closest to peak if equal
+        higher = table.find(left_bound, peaks - 1, heights, greater=True, last=True)
+        left = np.where(higher >= 0, higher + 1, left_bound)
+        left_min = table.min(left, peaks)
+        left_bases = table.find(left, peaks, left_min, greater=False, last=True)
+        higher = table.find(peaks + 1, right_bound, heights, greater=True, last=False)
+        right = np.where(higher >= 0, higher - 1, right_bound)
+        right_min = table.min(peaks, right)
+        right_bases = table.find(peaks, right, right_min, greater=False, last=False)
+
+        prominences = heights.astype(np.float64) - np.maximum(left_min, right_min)
+        return prominences, left_bases, right_bases
+
+    @staticmethod
+    def _widths(x, table, peaks, prominences, left_bases, right_bases, rel_height=0.5):
+        """
+        Same as `scipy.signal.peak_widths()`, returns widths only.
+        """
+        heights = x[peaks].astype(np.float64) - prominences * rel_height
+
+        ips = []
+        for direction, bases in [(-1, left_bases), (1, right_bases)]:
+            # Samples at bases are always not higher than `heights`
+            if direction < 0:
+                ip = table.find(bases, peaks, heights, greater=False, last=True)
+            else:
+                ip = table.find(peaks, bases, heights, greater=False, last=False)
+            ip_value = x[ip].astype(np.float64)
+            below = ip_value < heights
+            ip = ip.astype(np.float64)
+            # Interpolate if true intersection height is between samples
+            if np.any(below):
+                i = ip[below].astype(np.int64)
+                ip[below] -= direction * (heights[below] - ip_value[below]) \
+                    / (x[i - direction].astype(np.float64) - ip_value[below])
+            ips.append(ip)
+
+        left_ips, right_ips = ips
+        return right_ips - left_ips
+
+    def image(self, image, is_horizontal, param, pad=0, mask=None):
+        """
+        Find peaks in flattened image, rows for vertical lines, columns for horizontal lines.
+
+        Args:
+            image (np.ndarray): Monochrome image.
+            is_horizontal (bool): True if detects horizontal lines.
+            param (dict): Parameters use in scipy.signal.find_peaks.
+            pad (int): Pad each row with white pixels.
+            mask (np.ndarray, None):
+
+        Returns:
+            np.ndarray: Image of peaks in white, others in black.
+                This is a reused buffer, it's valid until the next call with the same image shape.
+        """
+        if is_horizontal:
+            result, _ = self.image_hv(image, param, pad=(pad, None), mask=mask)
+        else:
+            _, result = self.image_hv(image, param, pad=(None, pad), mask=mask)
+        return result
+
+    def image_hv(self, image, param, pad=(0, 0), mask=None):
+        """
+        Find peaks for horizontal lines and vertical lines in one call.
+        Same as `image()` on both directions, but peaks are searched in one signal.
+
+        Args:
+            image (np.ndarray): Monochrome image.
+            param (dict): Parameters use in scipy.signal.find_peaks.
+            pad (tuple): Pad each row with white pixels, (horizontal, vertical).
+                None to skip that direction.
+            mask (np.ndarray, None):
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Images of peaks of horizontal lines and vertical lines,
+                or None if skipped. These are reused buffers, valid until the next call with the same image shape.
+        """
+        directions = [(is_horizontal, pad_) for is_horizontal, pad_ in zip((True, False), pad) if pad_ is not None]
+        key = (image.shape, image.dtype, pad)
+        try:
+            data, out, bounds = self.buffers[key]
+        except KeyError:
+            height, width = image.shape
+            shapes = [(width, height + pad_) if is_horizontal else (height, width + pad_)
+                      for is_horizontal, pad_ in directions]
+            bounds = np.cumsum([0] + [h * w for h, w in shapes])
+            data = np.full(bounds[-1], 255, dtype=image.dtype)
+            out = np.zeros(bounds[-1], dtype=np.uint8)
+            self.buffers[key] = (data, out, bounds)
+
+        # Flattened images of both directions are segments of one signal
+        segments = []
+        for (is_horizontal, pad_), start, end in zip(directions, bounds[:-1], bounds[1:]):
+            if is_horizontal:
+                image_ = image.T
+            else:
+                image_ = image
+            shape = (image_.shape[0], image_.shape[1] + pad_)
+            data[start:end].reshape(shape)[:, :image_.shape[1]] = image_
+            segments.append(out[start:end].reshape(shape)[:, :image_.shape[1]])
+
+        if self._supported(param):
+            peaks = self._find_peaks(data, param, bounds=bounds)
+        else:
+            peaks = np.concatenate([signal.find_peaks(data[start:end], **param)[0] + start
+                                    for start, end in zip(bounds[:-1], bounds[1:])])
+        out.fill(0)
+        out[peaks] = 255
+
+        results = {}
+        for (is_horizontal, _), result in zip(directions, segments):
+            if is_horizontal:
+                result = result.T
+            if mask is not None:
+                result &= mask
+            results[is_horizontal] = result
+        return results.get(True), results.get(False)
+
+
+class BlockTable:
+    """
+    Range queries on a 1D array, for many ranges at once.
+
+    Array is split into blocks, sparse tables of block maximums and minimums answer queries on whole blocks,
+    the rest are samples at both ends, no more than one block each.
+    """
+    BLOCK = 16
+
+    def __init__(self, x):
+        """
+        Args:
+            x (np.ndarray): 1D array.
+        """
+        self.x = x
+        starts = np.arange(0, len(x), self.BLOCK)
+        self.max_table = self._sparse_table(np.maximum.reduceat(x, starts), np.maximum)
+        self.min_table = self._sparse_table(np.minimum.reduceat(x, starts), np.minimum)
+        self.offset = np.arange(self.BLOCK)
+
+    @staticmethod
+    def _sparse_table(blocks, func):
+        """
+        Returns:
+            list[np.ndarray]: table[k][i] is func() of blocks[i:i + 2 ** k]
+        """
+        table = [blocks]
+        step = 1
+        while step * 2 <= len(blocks):
+            prev = table[-1]
+            table.append(func(prev[:-step], prev[step:]))
+            step *= 2
+        return table
+
+    def _samples(self, lo, hi, last):
+        """
+        Samples in [lo, hi], no more than one block.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: positions, values, mask of valid samples.
+                Positions are in descending order if `last`.
+        """
+        if last:
+            position = hi[:, np.newaxis] - self.offset
+            valid = position >= lo[:, np.newaxis]
+        else:
+            position = lo[:, np.newaxis] + self.offset
+            valid = position <= hi[:, np.newaxis]
+        values = self.x[np.clip(position, 0, len(self.x) - 1)]
+        return position, values, valid
+
+    def _find_samples(self, lo, hi, value, greater, last):
+        position, values, valid = self._samples(lo, hi, last)
+        if greater:
+            hit = values > value[:, np.newaxis]
+        else:
+            hit = values <= value[:, np.newaxis]
+        hit &= valid
+        found = hit.any(axis=1)
+        return np.where(found, position[np.arange(len(lo)), hit.argmax(axis=1)], -1)
+
+    def _find_block(self, lo, hi, value, greater, last):
+        """
+        Last or first block in [lo, hi] that has a sample > value (greater) or <= value (not greater).
+        """
+        table = self.max_table if greater else self.min_table
+        if last:
+            cur = hi + 1
+        else:
+            cur = lo.copy()
+        # No need to try steps longer than the longest range
+        span = np.max(hi - lo, initial=0) + 1
+        levels = min(len(table), max(int(span).bit_length(), 1))
+        for k in range(levels - 1, -1, -1):
+            step = 1 << k
+            level = table[k]
+            if last:
+                index = cur - step
+                can = index >= lo
+            else:
+                index = cur
+                can = cur + step - 1 <= hi
+            block = level[np.clip(index, 0, len(level) - 1)]
+            skip = can & ((block <= value) if greater else (block > value))
+            if last:
+                cur = np.where(skip, cur - step, cur)
+            else:
+                cur = np.where(skip, cur + step, cur)
+        if last:
+            cur = cur - 1
+            return np.where(cur >= lo, cur, -1)
+        else:
+            return np.where(cur <= hi, cur, -1)
+
+    def find(self, lo, hi, value, greater, last):
+        """
+        Find the last or first index in [lo, hi] that x > value (greater) or x <= value (not greater).
+
+        Args:
+            lo (np.ndarray): Lower bounds, inclusive.
+            hi (np.ndarray): Upper bounds, inclusive. Range is empty if hi < lo.
+            value (np.ndarray):
+            greater (bool):
+            last (bool): True for the last index, False for the first.
+
+        Returns:
+            np.ndarray: Indexes, -1 if not found.
+        """
+        size = self.BLOCK
+        lo, hi = np.asarray(lo), np.asarray(hi)
+        value = np.asarray(value)
+        result = np.full(len(lo), -1, dtype=np.int64)
+        todo = np.flatnonzero(lo <= hi)
+        if not len(todo):
+            return result
+        lo, hi, value = lo[todo], hi[todo], value[todo]
+        lo_block, hi_block = lo // size, hi // size
+
+        # Samples in the block to start with
+        if last:
+            first = self._find_samples(np.maximum(lo, hi_block * size), hi, value, greater, last)
+        else:
+            first = self._find_samples(lo, np.minimum(hi, lo_block * size + size - 1), value, greater, last)
+        result[todo] = first
+        rest = np.flatnonzero((first < 0) & (lo_block < hi_block))
+        if not len(rest):
+            return result
+        todo, lo, hi, value = todo[rest], lo[rest], hi[rest], value[rest]
+        lo_block, hi_block = lo_block[rest], hi_block[rest]
+
+        # Whole blocks between
+        block = self._find_block(lo_block + 1, hi_block - 1, value, greater, last)
+        found = block >= 0
+        if np.any(found):
+            start = block[found] * size
+            result[todo[found]] = self._find_samples(start, start + size - 1, value[found], greater, last)
+        # Samples in the block to end with
+        rest = ~found
+        if np.any(rest):
+            todo, lo, hi, value = todo[rest], lo[rest], hi[rest], value[rest]
+            lo_block, hi_block = lo_block[rest], hi_block[rest]
+            if last:
+                end = self._find_samples(lo, lo_block * size + size - 1, value, greater, last)
+            else:
+                end = self._find_samples(hi_block * size, hi, value, greater, last)
+            result[todo] = end
+        return result
+
+    def min(self, lo, hi):
+        """
+        Minimum of x[lo:hi + 1], lo <= hi.
+
+        Returns:
+            np.ndarray:
+        """
+        size = self.BLOCK
+        lo_block, hi_block = lo // size, hi // size
+        position, values, valid = self._samples(lo, np.minimum(hi, lo_block * size + size - 1), last=False)
+        head = np.where(valid, values, values.max(initial=0)).min(axis=1)
+        position, values, valid = self._samples(np.maximum(lo, hi_block * size), hi, last=False)
+        tail = np.where(valid, values, values.max(initial=0)).min(axis=1)
+        result = np.minimum(head, tail)
+
+        # Whole blocks between
+        start, end = lo_block + 1, hi_block - 1
+        between = np.flatnonzero(start <= end)
+        if len(between):
+            start, end = start[between], end[between]
+            k = np.floor(np.log2(end - start + 1)).astype(np.int64)
+            middle = np.empty(len(between), dtype=result.dtype)
+            for level in np.unique(k):
+                row = k == level
+                table = self.min_table[level]
+                middle[row] = np.minimum(table[start[row]], table[end[row] - (1 << level) + 1])
+            result[between] = np.minimum(result[between], middle)
+        return result
+
+
+PEAK_FINDER = PeakFinder()
@@ -3,12 +3,12 @@ import warnings
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageOps
-from scipy import signal
 
 from module.base.utils import *
 from module.config.config import AzurLaneConfig
 from module.exception import MapDetectionError
 from module.logger import logger
+from module.map_detection.peak_finder import PEAK_FINDER
 from module.map_detection.utils import *
 from module.map_detection.utils_assets import *
 
@@ -70,36 +70,18 @@ class Perspective:
         image = self.load_image(image)
 
         # Lines detection
-        inner_h = self.detect_lines(
+        inner_h, inner_v = self.detect_lines(
             image,
-            is_horizontal=True,
             param=self.config.INTERNAL_LINES_FIND_PEAKS_PARAMETERS,
             threshold=self.config.INTERNAL_LINES_HOUGHLINES_THRESHOLD,
-            theta=self.config.HORIZONTAL_LINES_THETA_THRESHOLD
-        ).move(*self.config.DETECTING_AREA[:2])
-        inner_v = self.detect_lines(
+        )
+        edge_h, edge_v = self.detect_lines(
             image,
-            is_horizontal=False,
-            param=self.config.INTERNAL_LINES_FIND_PEAKS_PARAMETERS,
-            threshold=self.config.INTERNAL_LINES_HOUGHLINES_THRESHOLD,
-            theta=self.config.VERTICAL_LINES_THETA_THRESHOLD
-        ).move(*self.config.DETECTING_AREA[:2])
-        edge_h = self.detect_lines(
-            image,
-            is_horizontal=True,
-            param=self.config.EDGE_LINES_FIND_PEAKS_PARAMETERS,
-            threshold=self.config.EDGE_LINES_HOUGHLINES_THRESHOLD,
-            theta=self.config.HORIZONTAL_LINES_THETA_THRESHOLD,
-            pad=self.config.DETECTING_AREA[2] - self.config.DETECTING_AREA[0]
-        ).move(*self.config.DETECTING_AREA[:2])
-        edge_v = self.detect_lines(
-            image,
-            is_horizontal=False,
             param=self.config.EDGE_LINES_FIND_PEAKS_PARAMETERS,
             threshold=self.config.EDGE_LINES_HOUGHLINES_THRESHOLD,
-            theta=self.config.VERTICAL_LINES_THETA_THRESHOLD,
-            pad=self.config.DETECTING_AREA[3] - self.config.DETECTING_AREA[1]
-        ).move(*self.config.DETECTING_AREA[:2])
+            pad=(self.config.DETECTING_AREA[2] - self.config.DETECTING_AREA[0],
+                 self.config.DETECTING_AREA[3] - self.config.DETECTING_AREA[1])
+        )
 
         # Lines pre-cleansing
         horizontal = inner_h.add(edge_h).group()
@@ -119,8 +101,14 @@ class Perspective:
 
         # Calculate perspective
         self.crossings = self.horizontal.cross(self.vertical)
-        self.vanish_point = optimize.brute(self._vanish_point_value, self.config.VANISH_POINT_RANGE)
-        distance_point_x = optimize.brute(self._distant_point_value, self.config.DISTANCE_POINT_X_RANGE)[0]
+        self.vanish_point = self._vanish_point_solve()
+        if self.vanish_point is None:
+            logger.info('Vanish point fitting failed, use brute force')
+            self.vanish_point = optimize.brute(self._vanish_point_value, self.config.VANISH_POINT_RANGE)
+        distance_point_x = self._distant_point_solve()
+        if distance_point_x is None:
+            logger.info('Distant point fitting failed, use brute force')
+            distance_point_x = optimize.brute(self._distant_point_value, self.config.DISTANCE_POINT_X_RANGE)[0]
         self.distant_point = (distance_point_x, self.vanish_point[1])
         logger.attr_align('vanish_point', point2str(*self.vanish_point, length=5))
         logger.attr_align('distant_point', point2str(*self.distant_point, length=5))
@@ -174,34 +162,19 @@ class Perspective:
         return image
 
     @staticmethod
-    def find_peaks(image, is_horizontal, param, pad=0, mask=None):
+    def find_peaks(image, param, pad=(0, 0), mask=None):
         """
         Args:
             image(np.ndarray): Processed screenshot.
-            is_horizontal(bool): True if detects horizontal lines.
             param(dict): Parameters use in scipy.signal.find_peaks.
-            pad(int):
+            pad(tuple): (horizontal, vertical)
             mask(np.ndarray, None):
 
         Returns:
-            np.ndarray:
+            tuple[np.ndarray, np.ndarray]: Peaks of horizontal lines and vertical lines.
+                Reused buffers, valid until the next call with the same image shape.
         """
-        if is_horizontal:
-            image = image.T
-        if pad:
-            image = np.pad(image, ((0, 0), (0, pad)), mode='constant', constant_values=255)
-        origin_shape = image.shape
-        out = np.zeros(origin_shape[0] * origin_shape[1], dtype='uint8')
-        peaks, _ = signal.find_peaks(image.ravel(), **param)
-        out[peaks] = 255
-        out = out.reshape(origin_shape)
-        if pad:
-            out = out[:, :-pad]
-        if is_horizontal:
-            out = out.T
-        if mask is not None:
-            out &= mask
-        return out
+        return PEAK_FINDER.image_hv(image, param=param, pad=pad, mask=mask)
 
     def hough_lines(self, image, is_horizontal, threshold, theta):
         """
@@ -229,15 +202,21 @@ class Perspective:
         #     return Lines(lines, is_horizontal=is_horizontal)
         return Lines(lines, is_horizontal=is_horizontal)
 
-    def detect_lines(self, image, is_horizontal, param, threshold, theta, pad=0):
+    def detect_lines(self, image, param, threshold, pad=(0, 0)):
         """
         Method that wraps find_peaks and hough_lines
+
+        Returns:
+            tuple[Lines, Lines]: Horizontal lines and vertical lines.
         """
-        peaks = self.find_peaks(image, is_horizontal=is_horizontal, param=param, pad=pad, mask=ASSETS.ui_mask_stroke)
-        # self.show_array(peaks)
-        lines = self.hough_lines(peaks, is_horizontal=is_horizontal, threshold=threshold, theta=theta)
-        # self.draw(lines, Image.fromarray(peaks.astype(np.uint8), mode='L'))
-        return lines
+        peaks_h, peaks_v = self.find_peaks(image, param=param, pad=pad, mask=ASSETS.ui_mask_stroke)
+        # self.show_array(peaks_h)
+        horizontal = self.hough_lines(
+            peaks_h, is_horizontal=True, threshold=threshold, theta=self.config.HORIZONTAL_LINES_THETA_THRESHOLD)
+        vertical = self.hough_lines(
+            peaks_v, is_horizontal=False, threshold=threshold, theta=self.config.VERTICAL_LINES_THETA_THRESHOLD)
+        # self.draw(horizontal, Image.fromarray(peaks_h.astype(np.uint8), mode='L'))
+        return horizontal.move(*self.config.DETECTING_AREA[:2]), vertical.move(*self.config.DETECTING_AREA[:2])
 
     @staticmethod
     def show_array(arr):
@@ -299,6 +278,95 @@ class Perspective:
         distance = np.sum(np.log10(np.diff(mid) + 0.001))  # Add 0.001 to avoid log10(0).
         return distance
 
+    def _vanish_point_solve(self):
+        """Solve vanish point from intersections of vertical lines, instead of a brute-force search.
+
+        `_vanish_point_value` reaches its minimums where lines intersect, so intersections of every two lines
+        are the hypotheses, scored by `_vanish_point_value` (RANSAC with log loss).
+        The best one is refined by least squares over the lines passing near it.
+
+        Returns:
+            np.ndarray: np.array([x, y]), or None if lines don't agree on a point, use brute force then.
+        """
+        lines = self.vertical
+        if len(lines) < 2:
+            return None
+        rho, sin, cos = lines.rho, lines.sin, lines.cos
+
+        # Intersections of every two lines, x * cos + y * sin = rho
+        i, j = np.triu_indices(len(lines), k=1)
+        det = cos[i] * sin[j] - sin[i] * cos[j]
+        valid = np.abs(det) > 1e-6
+        i, j, det = i[valid], j[valid], det[valid]
+        x = (rho[i] * sin[j] - sin[i] * rho[j]) / det
+        y = (cos[i] * rho[j] - rho[i] * cos[j]) / det
+        (x1, x2), (y1, y2) = self.config.VANISH_POINT_RANGE
+        inside = (x >= x1) & (x <= x2) & (y >= y1) & (y <= y2)
+        if not np.any(inside):
+            return None
+        x, y = x[inside], y[inside]
+
+        # Same as _vanish_point_value(), on all hypotheses at once
+        distance = rho - x[:, np.newaxis] * cos - y[:, np.newaxis] * sin
+        value = np.sum(np.log10(np.abs(distance) + 0.001), axis=1)
+        best = np.argmin(value)
+
+        # Least squares on inliers
+        inlier = np.abs(distance[best]) < self.config.VANISH_POINT_INLIER_THRESHOLD
+        if np.count_nonzero(inlier) < min(len(lines), 3):
+            return None
+        a = np.stack([cos[inlier], sin[inlier]], axis=1)
+        point = np.linalg.lstsq(a, rho[inlier], rcond=None)[0]
+        residual = np.sqrt(np.mean((rho[inlier] - a @ point) ** 2))
+        if residual > self.config.VANISH_POINT_RESIDUAL_THRESHOLD:
+            return None
+        if not (x1 <= point[0] <= x2 and y1 <= point[1] <= y2):
+            return None
+        return point
+
+    def _distant_point_solve(self):
+        """Solve x of distant point from diagonals of the crossing lattice, instead of a brute-force search.
+
+        Diagonals of map grids meet at distant point, so lines that link crossings on adjacent horizontal lines
+        and adjacent vertical lines are the hypotheses, scored by `_distant_point_value`.
+
+        Returns:
+            float: x of distant point, or None if diagonals don't agree on a point, use brute force then.
+        """
+        h, v = len(self.horizontal), len(self.vertical)
+        if h < 2 or v < 2:
+            return None
+        # Crossings are in the order of horizontal lines then vertical lines
+        points = self.crossings.points.reshape(h, v, 2)
+        y0 = self.vanish_point[1]
+        # Diagonals in both directions, the ones that meet at right are out of range.
+        start = np.concatenate([points[:-1, :-1], points[:-1, 1:]]).reshape(-1, 2)
+        end = np.concatenate([points[1:, 1:], points[1:, :-1]]).reshape(-1, 2)
+        dy = end[:, 1] - start[:, 1]
+        valid = np.abs(dy) > 1e-6
+        start, end, dy = start[valid], end[valid], dy[valid]
+        x = start[:, 0] + (end[:, 0] - start[:, 0]) * (y0 - start[:, 1]) / dy
+        x1, x2 = self.config.DISTANCE_POINT_X_RANGE[0]
+        inside = (x >= x1) & (x <= x2)
+        if not np.any(inside):
+            return None
+        start, end, x = start[inside], end[inside], x[inside]
+
+        # Same as _distant_point_value(), on all hypotheses at once.
+        # Lines from (x, y0) to crossings, x at MID_Y
+        px, py = self.crossings.x, self.crossings.y
+        mid = x[:, np.newaxis] + (px - x[:, np.newaxis]) * ((Lines.MID_Y - y0) / (py - y0))
+        mid = np.sort(mid, axis=1)
+        value = np.sum(np.log10(np.diff(mid, axis=1) + 0.001), axis=1)
+        best = np.argmin(value)
+
+        # Diagonals that pass the best point, distance in pixels at the upper crossing
+        predict = end[:, 0] + (x[best] - end[:, 0]) * (end[:, 1] - start[:, 1]) / (end[:, 1] - y0)
+        inlier = np.abs(start[:, 0] - predict) < self.config.DISTANT_POINT_INLIER_THRESHOLD
+        if np.count_nonzero(inlier) < 3:
+            return None
+        return x[best]
+
     def mid_cleanse(self, mids, is_horizontal, threshold=3):
         """
         Args:
@@ -7,6 +7,7 @@ from module.logger import logger
 from module.map.map_grids import SelectedGrids
 from module.map_detection.detector import MapDetector
 from module.map_detection.grid import Grid
+from module.map_detection.grid_predictor import PredictorBatch
 from module.map_detection.utils import *
 from module.map_detection.utils_assets import *
 
@@ -102,8 +103,13 @@ class View(MapDetector):
         Predict grid info.
         """
         start_time = time.time()
+        batch = PredictorBatch(self)
         for grid in self:
-            grid.predict()
+            grid.batch = batch
+            try:
+                grid.predict()
+            finally:
+                grid.batch = None
         logger.attr_align('predict', len(self.grids.keys()), front=float2str(time.time() - start_time) + 's')
 
     def update(self, image):
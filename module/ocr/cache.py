@@ -0,0 +1,138 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from module.logger import logger
+
+# img_height in Hyperparams of cnocr, images are resized to this height before inference
+OCR_IMAGE_HEIGHT = 32
+
+
+def batch_width(image_list, height=OCR_IMAGE_HEIGHT):
+    """
+    Args:
+        image_list (list[np.ndarray]):
+        height (int):
+
+    Returns:
+        int: Width that model pads `image_list` to, same as AlOcr._preprocess_img_array()
+    """
+    return max([int(round(height / image.shape[0] * image.shape[1])) for image in image_list], default=0)
+
+
+def blank_image(width, height=OCR_IMAGE_HEIGHT):
+    """
+    An empty image to be sent along with others, so model pads the batch to `width`.
+
+    Args:
+        width (int):
+        height (int):
+
+    Returns:
+        np.ndarray:
+    """
+    return np.zeros((height, width), dtype=np.uint8)
+
+
+class OcrCache:
+    """
+    LRU cache of OCR model results of single images, keyed by the hash of a pre-processed image.
+
+    Many OCR areas rarely change between frames, such as oil, coins and timers.
+    After pre-processing, identical images produce identical bytes,
+    so the same images don't need to be fed to the model again.
+
+    Model pads all images in a batch to the widest one, which affects results,
+    so the padded width of the batch is part of the key.
+    Only missed images are sent to model, with a blank image of that width if needed, see `Ocr.ocr_model()`.
+    """
+    # Seconds between logs of hit rate
+    LOG_INTERVAL = 600
+
+    def __init__(self, maxsize=4096):
+        """
+        Args:
+            maxsize (int): Max amount of cached images.
+                Results are short strings, 4096 images take about 1MB.
+        """
+        self.maxsize = maxsize
+        # Key: bytes, Value: list[str]
+        self.cache = OrderedDict()
+        self.hit = 0
+        self.miss = 0
+        self.last_log = time.time()
+
+    @staticmethod
+    def key(image, lang, alphabet, width):
+        """
+        Args:
+            image (np.ndarray): Pre-processed image.
+            lang (str):
+            alphabet (str):
+            width (int): Padded width of the batch that `image` is in.
+
+        Returns:
+            bytes:
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f'{lang}|{alphabet}|{width}|{image.shape}|{image.dtype.str}|'.encode())
+        h.update(np.ascontiguousarray(image).tobytes())
+        return h.digest()
+
+    def get(self, key):
+        """
+        Args:
+            key (bytes):
+
+        Returns:
+            list[str]: OCR result of the image, or None if not cached.
+        """
+        try:
+            result = self.cache[key]
+        except KeyError:
+            self.miss += 1
+            return None
+        self.cache.move_to_end(key)
+        self.hit += 1
+        return result
+
+    def set(self, key, result):
+        """
+        Args:
+            key (bytes):
+            result (list[str]):
+        """
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def clear(self):
+        self.cache.clear()
+
+    @property
+    def stats(self):
+        """
+        Returns:
+            dict: hit, miss, rate and amount of cached images.
+        """
+        total = self.hit + self.miss
+        return {
+            'hit': self.hit,
+            'miss': self.miss,
+            'rate': round(self.hit / total, 3) if total else 0.,
+            'cached': len(self.cache),
+        }
+
+    def log_stats(self):
+        """
+        Log stats every LOG_INTERVAL seconds.
+        """
+        if time.time() - self.last_log > self.LOG_INTERVAL:
+            logger.info(f'Ocr cache stats: {self.stats}')
+            self.last_log = time.time()
+
+
+OCR_CACHE = OcrCache()
@@ -6,6 +6,7 @@ from module.base.button import Button
 from module.base.decorator import cached_property
 from module.base.utils import *
 from module.logger import logger
+from module.ocr.cache import OCR_CACHE, batch_width, blank_image
 from module.ocr.rpc import ModelProxyFactory
 from module.webui.setting import State
 
@@ -38,6 +39,8 @@ class Ocr:
         self.threshold = threshold
         self.alphabet = alphabet
         self.lang = lang
+        # Reuse results of identical pre-processed images, set False on objects that need a fresh inference
+        self.use_cache = State.deploy_config.OcrCache
 
     @property
     def cnocr(self) -> "AlOcr":
@@ -76,6 +79,33 @@ class Ocr:
         """
         return result
 
+    def ocr_model(self, image_list):
+        """
+        Args:
+            image_list (list[np.ndarray]): Pre-processed images.
+
+        Returns:
+            list[list[str]]: Results from OCR model, or from OCR_CACHE if the same images were recognized.
+        """
+        if not self.use_cache or not image_list:
+            return self.cnocr.atomic_ocr_for_single_lines(image_list, self.alphabet)
+
+        width = batch_width(image_list)
+        keys = [OCR_CACHE.key(image, self.lang, self.alphabet, width) for image in image_list]
+        result_list = [OCR_CACHE.get(key) for key in keys]
+        missed = [index for index, result in enumerate(result_list) if result is None]
+        if missed:
+            img_list = [image_list[index] for index in missed]
+            # Keep the padded width of the whole batch, so results are the same as a batch without cache
+            if batch_width(img_list) < width:
+                img_list.append(blank_image(width))
+            for index, result in zip(missed, self.cnocr.atomic_ocr_for_single_lines(img_list, self.alphabet)):
+                OCR_CACHE.set(keys[index], result)
+                result_list[index] = result
+        OCR_CACHE.log_stats()
+
+        return result_list
+
     def ocr(self, image, direct_ocr=False):
         """
         Args:
@@ -95,7 +125,7 @@ class Ocr:
         # This will show the images feed to OCR model
         # self.cnocr.debug(image_list)
 
-        result_list = self.cnocr.atomic_ocr_for_single_lines(image_list, self.alphabet)
+        result_list = self.ocr_model(image_list)
         result_list = [''.join(result) for result in result_list]
         result_list = [self.after_process(result) for result in result_list]
 
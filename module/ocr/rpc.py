@@ -1,39 +1,156 @@
 import argparse
 import multiprocessing
-import pickle
+import os
+import time
 
+import numpy as np
+
+from module.base.decorator import cached_property
 from module.logger import logger
+from module.ocr.cache import batch_width, blank_image
 from module.webui.setting import State
 
 process: multiprocessing.Process = None
+OCR_LANGUAGES = ["azur_lane", "cnocr", "jp", "tw"]
+# Version of RPC payload, returned by hello() of OCR server and router.
+# 1: Pickled images, servers before this version return "hello"
+# 2: Images packed by pack_image()
+OCR_PROTOCOL = 2
+
+
+def pack_image(image):
+    """
+    Serialize an image into raw buffer and shape header, without pickle.
+    msgpack in zerorpc sends bytes as it is.
+
+    Args:
+        image (np.ndarray):
+
+    Returns:
+        list: [shape, dtype, buffer]
+    """
+    image = np.ascontiguousarray(image)
+    return [list(image.shape), image.dtype.str, image.tobytes()]
+
+
+def unpack_image(data):
+    """
+    Args:
+        data (list): [shape, dtype, buffer]
+
+    Returns:
+        np.ndarray: A read-only array on the received buffer.
+    """
+    if not isinstance(data, (list, tuple)):
+        raise ValueError(f'Unknown image payload from OCR client, expected protocol {OCR_PROTOCOL}, '
+                         f'please update the Alas instance that calls this OCR server')
+    shape, dtype, buffer = data
+    if isinstance(dtype, bytes):
+        dtype = dtype.decode()
+    return np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape)
 
 
 class ModelProxy:
     client = None
     online = True
+    address = None
+    # Worker addresses to use, if connected to an OcrRouter
+    # Key: lang, Value: list[str]
+    routes = {}
+    # Key: address, Value: zerorpc.Client
+    worker_clients = {}
 
     @classmethod
     def init(cls, address="127.0.0.1:22268"):
         import zerorpc
 
         logger.info(f"Connecting to OCR server {address}")
+        cls.address = address
         cls.client = zerorpc.Client(timeout=5)
         cls.client.connect(f"tcp://{address}")
         try:
-            cls.client.hello()
-            logger.info("Successfully connected to OCR server")
+            protocol = cls.client.hello()
         except:
             cls.online = False
             logger.warning("Ocr server not running")
+            return
+        if protocol != OCR_PROTOCOL:
+            cls.online = False
+            logger.error(f'Ocr server protocol mismatch, server: {protocol}, client: {OCR_PROTOCOL}. '
+                         f'Please update Alas on the OCR server, using local OCR instead')
+            return
+        logger.info("Successfully connected to OCR server")
 
     @classmethod
     def close(cls):
+        for client in cls.worker_clients.values():
+            client.close()
+        cls.worker_clients = {}
+        cls.routes = {}
         if cls.client is not None:
             logger.info('Disconnect to OCR server')
             cls.client.close()
             logger.info('Successfully disconnected to OCR server')
             cls.client = None
 
+    @classmethod
+    def get_routes(cls, lang):
+        """
+        Args:
+            lang (str):
+
+        Returns:
+            list[str]: Addresses of healthy workers serving `lang`,
+                or empty list if OcrClientAddress is a single OCR server.
+        """
+        import zerorpc
+
+        if lang in cls.routes:
+            return cls.routes[lang]
+        try:
+            ports = cls.client.workers(lang)
+        except zerorpc.RemoteError:
+            # NameError, a single OCR server doesn't have workers
+            ports = []
+        host = cls.address.rsplit(':', 1)[0]
+        routes = [f'{host}:{port}' for port in ports]
+        if routes:
+            logger.info(f'OCR workers of {lang}: {routes}')
+        cls.routes[lang] = routes
+        return routes
+
+    @classmethod
+    def get_worker_client(cls, address):
+        import zerorpc
+
+        if address not in cls.worker_clients:
+            client = zerorpc.Client(timeout=5)
+            client.connect(f"tcp://{address}")
+            cls.worker_clients[address] = client
+        return cls.worker_clients[address]
+
+    def call(self, method, *args):
+        """
+        Call `method` on any healthy worker of self.lang, or on the OCR server if it has no workers.
+        Instances start from different workers, so they are spread across the worker pool.
+        """
+        import zerorpc
+
+        routes = self.get_routes(self.lang)
+        if routes:
+            start = os.getpid() % len(routes)
+            for address in routes[start:] + routes[:start]:
+                client = self.get_worker_client(address)
+                try:
+                    return client(method, self.lang, *args)
+                except (zerorpc.TimeoutExpired, zerorpc.LostRemote):
+                    logger.warning(f'OCR worker {address} not responding')
+                    client.close()
+                    ModelProxy.worker_clients.pop(address, None)
+            # All workers failed, ask OcrRouter for new workers next time
+            ModelProxy.routes.pop(self.lang, None)
+        return self.client(method, self.lang, *args)
+
     def __init__(self, lang) -> None:
         self.lang = lang
 
@@ -46,9 +163,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str = img_fp.dumps()
+            img_str = pack_image(img_fp)
             try:
-                return self.client("ocr", self.lang, img_str)
+                return self.call("ocr", img_str)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -63,9 +180,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str = img_fp.dumps()
+            img_str = pack_image(img_fp)
             try:
-                return self.client("ocr_for_single_line", self.lang, img_str)
+                return self.call("ocr_for_single_line", img_str)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -80,9 +197,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str_list = [img_fp.dumps() for img_fp in img_list]
+            img_str_list = [pack_image(img_fp) for img_fp in img_list]
             try:
-                return self.client("ocr_for_single_lines", self.lang, img_str_list)
+                return self.call("ocr_for_single_lines", img_str_list)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -91,7 +208,7 @@ class ModelProxy:
     def set_cand_alphabet(self, cand_alphabet: str):
         if self.online:
             try:
-                return self.client("set_cand_alphabet", self.lang, cand_alphabet)
+                return self.call("set_cand_alphabet", cand_alphabet)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -107,9 +224,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str = img_fp.dumps()
+            img_str = pack_image(img_fp)
             try:
-                return self.client("atomic_ocr", self.lang, img_str, cand_alphabet)
+                return self.call("atomic_ocr", img_str, cand_alphabet)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -125,9 +242,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str = img_fp.dumps()
+            img_str = pack_image(img_fp)
             try:
-                return self.client("atomic_ocr_for_single_line", self.lang, img_str, cand_alphabet)
+                return self.call("atomic_ocr_for_single_line", img_str, cand_alphabet)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -143,9 +260,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str_list = [img_fp.dumps() for img_fp in img_list]
+            img_str_list = [pack_image(img_fp) for img_fp in img_list]
             try:
-                return self.client("atomic_ocr_for_single_lines", self.lang, img_str_list, cand_alphabet)
+                return self.call("atomic_ocr_for_single_lines", img_str_list, cand_alphabet)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -160,9 +277,9 @@ class ModelProxy:
 
         """
         if self.online:
-            img_str_list = [img_fp.dumps() for img_fp in img_list]
+            img_str_list = [pack_image(img_fp) for img_fp in img_list]
             try:
-                return self.client("debug", self.lang, img_str_list)
+                return self.call("debug", img_str_list)
             except:
                 self.online = False
         from module.ocr.models import OCR_MODEL
@@ -171,7 +288,7 @@ class ModelProxy:
 
 class ModelProxyFactory:
     def __getattribute__(self, __name: str) -> ModelProxy:
-        if __name in ["azur_lane", "cnocr", "jp", "tw"]:
+        if __name in OCR_LANGUAGES:
             if ModelProxy.client is None:
                 ModelProxy.init(address=State.deploy_config.OcrClientAddress)
             return ModelProxy(lang=__name)
@@ -182,6 +299,173 @@ class ModelProxyFactory:
         ModelProxy.close()
 
 
+class OcrBatcher:
+    """
+    Coalesce concurrent OCR requests from multiple Alas instances into one model batch.
+
+    zerorpc handles each request in a greenlet. Requests are queued, and a batching greenlet
+    collects them for a short time window, then calls the model once per (lang, cand_alphabet, width bucket).
+    Model calls run in one worker thread, so the gevent hub keeps receiving requests during inference,
+    and requests arrived during inference are batched in the next round.
+
+    Model pads all images in a batch to the widest one, and padding changes the results of the others.
+    Requests are grouped by padded width rounded up to WIDTH_BUCKET,
+    and each group is sent with a blank image of the rounded width, so all of them are padded to it.
+    Result of a request only depends on itself, not on other requests in the same batch.
+    """
+    # Pixels, padded widths are rounded up to this
+    WIDTH_BUCKET = 64
+
+    def __init__(self, model, window=0.005, max_batch=64):
+        """
+        Args:
+            model (OcrModel):
+            window (float): Seconds to wait for more requests after the first one.
+            max_batch (int): Max amount of images in one model batch.
+        """
+        import gevent
+        import gevent.queue
+        import gevent.threadpool
+
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = gevent.queue.Queue()
+        # Models are not thread safe, and alphabet is set before inference, so there's only one thread
+        self.pool = gevent.threadpool.ThreadPool(1)
+
+        self.request_count = 0
+        self.batch_count = 0
+        self.image_count = 0
+        self.max_batch_size = 0
+        self.max_queue_depth = 0
+        self.last_batch_size = 0
+        self.last_queue_depth = 0
+        self.last_log = time.time()
+
+        gevent.spawn(self._loop)
+
+    def run(self, func, *args):
+        """
+        Call a model method in worker thread, blocks the calling greenlet only.
+        All model calls should go through this.
+        """
+        return self.pool.spawn(func, *args).get()
+
+    def submit(self, lang, img_list, cand_alphabet=None):
+        """
+        Args:
+            lang (str):
+            img_list (list[np.ndarray]):
+            cand_alphabet (str):
+
+        Returns:
+            list: Same as AlOcr.atomic_ocr_for_single_lines()
+        """
+        from gevent.event import AsyncResult
+
+        result = AsyncResult()
+        self.queue.put((lang, cand_alphabet, img_list, result))
+        return result.get()
+
+    def _collect(self):
+        import gevent.queue
+
+        batch = [self.queue.get()]
+        depth = self.queue.qsize() + 1
+        images = len(batch[0][2])
+        deadline = time.perf_counter() + self.window
+        while images < self.max_batch:
+            remain = deadline - time.perf_counter()
+            if remain <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remain)
+            except gevent.queue.Empty:
+                break
+            batch.append(request)
+            images += len(request[2])
+
+        self.request_count += len(batch)
+        self.batch_count += 1
+        self.image_count += images
+        self.last_batch_size = images
+        self.last_queue_depth = depth
+        self.max_batch_size = max(self.max_batch_size, images)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        return batch
+
+    @cached_property
+    def img_height(self):
+        from module.ocr.al_ocr import Hyperparams
+        return Hyperparams().img_height
+
+    def bucket_width(self, img_list):
+        """
+        Args:
+            img_list (list[np.ndarray]):
+
+        Returns:
+            int: Padded width of `img_list`, rounded up to WIDTH_BUCKET.
+        """
+        width = batch_width(img_list, height=self.img_height)
+        return -(-width // self.WIDTH_BUCKET) * self.WIDTH_BUCKET
+
+    def _loop(self):
+        while 1:
+            batch = self._collect()
+            # Group by model and alphabet, they are set before inference,
+            # and by padded width, so merging doesn't change results.
+            groups = {}
+            for request in batch:
+                if not request[2]:
+                    request[3].set([])
+                    continue
+                try:
+                    width = self.bucket_width(request[2])
+                except Exception as e:
+                    request[3].set_exception(e)
+                    continue
+                groups.setdefault((request[0], request[1], width), []).append(request)
+            for (lang, cand_alphabet, width), requests in groups.items():
+                img_list = [image for request in requests for image in request[2]]
+                img_list.append(blank_image(width, height=self.img_height))
+                try:
+                    result_list = self.run(
+                        self.model.__getattribute__(lang).atomic_ocr_for_single_lines, img_list, cand_alphabet)
+                except Exception as e:
+                    for request in requests:
+                        request[3].set_exception(e)
+                    continue
+                start = 0
+                for request in requests:
+                    end = start + len(request[2])
+                    request[3].set(result_list[start:end])
+                    start = end
+
+            if time.time() - self.last_log > 60:
+                logger.info(f'Ocr server stats: {self.stats()}')
+                self.last_log = time.time()
+
+    def stats(self):
+        """
+        Returns:
+            dict:
+        """
+        return {
+            'queue_depth': self.queue.qsize(),
+            'request_count': self.request_count,
+            'batch_count': self.batch_count,
+            'image_count': self.image_count,
+            'avg_batch_size': self.image_count / self.batch_count if self.batch_count else 0.,
+            'avg_requests_per_batch': self.request_count / self.batch_count if self.batch_count else 0.,
+            'last_batch_size': self.last_batch_size,
+            'last_queue_depth': self.last_queue_depth,
+            'max_batch_size': self.max_batch_size,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+
 def start_ocr_server(port=22268):
     import zerorpc
     import zmq
@@ -189,47 +473,53 @@ def start_ocr_server(port=22268):
     from module.ocr.models import OcrModel
 
     class OCRServer(OcrModel):
+        def __init__(self):
+            self.batcher = OcrBatcher(self)
+
         def hello(self):
-            return "hello"
+            return OCR_PROTOCOL
+
+        def stats(self):
+            return self.batcher.stats()
 
         def ocr(self, lang, img_fp):
-            img_fp = pickle.loads(img_fp)
+            img_fp = unpack_image(img_fp)
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.ocr(img_fp)
+            return self.batcher.run(cnocr.ocr, img_fp)
 
         def ocr_for_single_line(self, lang, img_fp):
-            img_fp = pickle.loads(img_fp)
+            img_fp = unpack_image(img_fp)
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.ocr_for_single_line(img_fp)
+            return self.batcher.run(cnocr.ocr_for_single_line, img_fp)
 
         def ocr_for_single_lines(self, lang, img_list):
-            img_list = [pickle.loads(img_fp) for img_fp in img_list]
+            img_list = [unpack_image(img_fp) for img_fp in img_list]
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.ocr_for_single_lines(img_list)
+            return self.batcher.run(cnocr.ocr_for_single_lines, img_list)
 
         def set_cand_alphabet(self, lang, cand_alphabet):
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.set_cand_alphabet(cand_alphabet)
+            return self.batcher.run(cnocr.set_cand_alphabet, cand_alphabet)
 
         def atomic_ocr(self, lang, img_fp, cand_alphabet):
-            img_fp = pickle.loads(img_fp)
+            img_fp = unpack_image(img_fp)
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.atomic_ocr(img_fp, cand_alphabet)
+            return self.batcher.run(cnocr.atomic_ocr, img_fp, cand_alphabet)
 
         def atomic_ocr_for_single_line(self, lang, img_fp, cand_alphabet):
-            img_fp = pickle.loads(img_fp)
+            img_fp = unpack_image(img_fp)
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.atomic_ocr_for_single_line(img_fp, cand_alphabet)
+            return self.batcher.run(cnocr.atomic_ocr_for_single_line, img_fp, cand_alphabet)
 
         def atomic_ocr_for_single_lines(self, lang, img_list, cand_alphabet):
-            img_list = [pickle.loads(img_fp) for img_fp in img_list]
-            cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.atomic_ocr_for_single_lines(img_list, cand_alphabet)
+            img_list = [unpack_image(img_fp) for img_fp in img_list]
+            # Ocr.ocr() calls this, batch requests from all instances
+            return self.batcher.submit(lang, img_list, cand_alphabet)
 
         def debug(self, lang, img_list):
-            img_list = [pickle.loads(img_fp) for img_fp in img_list]
+            img_list = [unpack_image(img_fp) for img_fp in img_list]
             cnocr: AlOcr = self.__getattribute__(lang)
-            return cnocr.debug(img_list)
+            return self.batcher.run(cnocr.debug, img_list)
 
     server = zerorpc.Server(OCRServer())
     try:
@@ -241,16 +531,176 @@ def start_ocr_server(port=22268):
     server.run()
 
 
-def start_ocr_server_process(port=22268):
+def start_ocr_worker(port, parent):
+    """
+    Run an OCR server as a worker of OcrRouter, exit when the router is gone.
+
+    Args:
+        port (int):
+        parent (int): PID of OcrRouter process.
+    """
+    import gevent
+    import psutil
+
+    def watchdog():
+        while 1:
+            gevent.sleep(5)
+            if not psutil.pid_exists(parent):
+                os._exit(0)
+
+    gevent.spawn(watchdog)
+    start_ocr_server(port=port)
+
+
+class OcrRouter:
+    """
+    Front end of a pool of OCR worker processes.
+
+    Each worker is an OCR server holding its own models, listening on port+1, port+2, ...
+    Router itself doesn't do OCR, ModelProxy asks router for healthy workers of a language
+    and calls workers directly, so there's no extra hop on each OCR request.
+    """
+
+    def __init__(self, port, workers):
+        """
+        Args:
+            port (int): Port of router.
+            workers (int): Amount of worker processes.
+        """
+        self.port = port
+        self.worker_ports = [port + 1 + index for index in range(workers)]
+        # Key: port, Value: multiprocessing.Process
+        self.processes = {}
+        # Key: port, Value: bool
+        self.healthy = {}
+        # Key: port, Value: zerorpc.Client
+        self.clients = {}
+
+    def start_worker(self, port):
+        logger.info(f'Starting OCR worker on port {port}')
+        worker = multiprocessing.Process(target=start_ocr_worker, args=(port, os.getpid()), daemon=True)
+        worker.start()
+        self.processes[port] = worker
+        self.healthy[port] = False
+
+    def check_worker(self, port):
+        """
+        Restart worker if process dead, and ping it.
+
+        Returns:
+            bool: If worker is healthy.
+        """
+        import zerorpc
+
+        if not self.processes[port].is_alive():
+            logger.warning(f'OCR worker on port {port} is dead, restart')
+            client = self.clients.pop(port, None)
+            if client is not None:
+                client.close()
+            self.start_worker(port)
+            return False
+
+        if port not in self.clients:
+            client = zerorpc.Client(timeout=2)
+            client.connect(f'tcp://127.0.0.1:{port}')
+            self.clients[port] = client
+        try:
+            self.clients[port].hello()
+            return True
+        except (zerorpc.TimeoutExpired, zerorpc.LostRemote):
+            # Still starting
+            return False
+
+    def health_check_loop(self, interval=5):
+        import gevent
+
+        while 1:
+            for port in self.worker_ports:
+                healthy = self.check_worker(port)
+                if healthy != self.healthy[port]:
+                    logger.info(f'OCR worker on port {port} healthy: {healthy}')
+                self.healthy[port] = healthy
+            gevent.sleep(interval)
+
+    def hello(self):
+        return OCR_PROTOCOL
+
+    def workers(self, lang):
+        """
+        Args:
+            lang (str):
+
+        Returns:
+            list[int]: Ports of healthy workers.
+                Rotated by language, so instances of different languages prefer different workers,
+                and each worker only loads the models it mostly serves.
+        """
+        ports = [port for port in self.worker_ports if self.healthy.get(port)]
+        if not ports:
+            return []
+        try:
+            start = OCR_LANGUAGES.index(lang) % len(ports)
+        except ValueError:
+            start = 0
+        return ports[start:] + ports[:start]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Key: port, Value: stats of worker, or None if unhealthy.
+        """
+        out = {}
+        for port in self.worker_ports:
+            if self.healthy.get(port):
+                try:
+                    out[port] = self.clients[port].stats()
+                    continue
+                except Exception:
+                    pass
+            out[port] = None
+        return out
+
+
+def start_ocr_router(port=22268, workers=2):
+    import gevent
+    import zerorpc
+    import zmq
+
+    router = OcrRouter(port=port, workers=workers)
+    server = zerorpc.Server(router)
+    try:
+        server.bind(f"tcp://*:{port}")
+    except zmq.error.ZMQError:
+        logger.error(f"Ocr router cannot bind on port {port}")
+        return
+    for worker_port in router.worker_ports:
+        router.start_worker(worker_port)
+    gevent.spawn(router.health_check_loop)
+    logger.info(f"Ocr router listen on port {port}, workers: {router.worker_ports}")
+    server.run()
+
+
+def start_ocr_server_process(port=22268, workers=1):
+    """
+    Args:
+        port (int):
+        workers (int): Amount of worker processes.
+            1 to run a single OCR server on `port`,
+            >1 to run an OcrRouter on `port` and workers on the following ports.
+    """
     global process
     if not alive():
-        process = multiprocessing.Process(target=start_ocr_server, args=(port,))
+        if workers > 1:
+            process = multiprocessing.Process(target=start_ocr_router, args=(port, workers))
+        else:
+            process = multiprocessing.Process(target=start_ocr_server, args=(port,))
         process.start()
 
 
 def stop_ocr_server_process():
     global process
     if alive():
+        # Workers exit on their own once router is gone
         process.kill()
         process = None
 
@@ -271,6 +721,15 @@ if __name__ == "__main__":
         type=int,
         help="Port to listen. Default to OcrServerPort in deploy setting",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Amount of worker processes. Default to OcrServerWorkers in deploy setting",
+    )
     args, _ = parser.parse_known_args()
     port = args.port or State.deploy_config.OcrServerPort
-    start_ocr_server(port=port)
+    workers = args.workers or State.deploy_config.OcrServerWorkers
+    if workers > 1:
+        start_ocr_router(port=port, workers=workers)
+    else:
+        start_ocr_server(port=port)
@@ -1,5 +1,7 @@
 import time
 
+from scipy import signal
+
 from module.base.utils import *
 from module.config.config import AzurLaneConfig
 from module.logger import logger
@@ -89,8 +91,13 @@ class GlobeDetection:
         cv2.subtract(b, r, dst=b)
         image = b
 
-        hori = self.perspective.find_peaks(image, is_horizontal=True, param=para, mask=None)
-        vert = self.perspective.find_peaks(image, is_horizontal=False, param=para, mask=None)
+        # Peaks on globe are dense and searched in short windows, where scipy is faster than PEAK_FINDER.
+        out = np.zeros(image.size, dtype=np.uint8)
+        out[signal.find_peaks(image.T.ravel(), **para)[0]] = 255
+        hori = out.reshape(image.shape[::-1]).T
+        out = np.zeros(image.size, dtype=np.uint8)
+        out[signal.find_peaks(image.ravel(), **para)[0]] = 255
+        vert = out.reshape(image.shape)
         image = cv2.bitwise_or(hori, vert)
 
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
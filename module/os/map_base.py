@@ -20,6 +20,8 @@ class OSCampaignMap(CampaignMap):
                 grid = OSGridInfo()
                 grid.location = (x, y)
                 self.grids[(x, y)] = grid
+        self._all_grids = None
+        self.path_engine_reset()
 
         # camera_data can be generate automatically, but it's better to set it manually.
         self.camera_data = [location2node(loca) for loca in camera_2d((0, 0, *self._shape), sight=self.camera_sight)]
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+from module.base.frame import FRAME_CACHE
+
+
+class PageIndex:
+    """
+    Order pages by how likely they are on the screenshot, so `UI.ui_get_current_page()` tries the right one first.
+
+    Signature of a page is a coarse color histogram of its check buttons.
+    Template matching only moves a button within the offset, so if a page is on the screenshot,
+    colors of its check button can be found in the histogram of the area around.
+    Pages that pass are checked first, others are checked afterwards, both in the original order.
+    The index only skips unlikely pages, if two pages match at the same time, the earlier one is detected as before.
+
+    Examples:
+        for page in PAGE_INDEX.candidates(image, {page_main: [MAIN_GOTO_FLEET], ...}):
+            if self.ui_page_appear(page):
+                return page
+    """
+    # Levels of each channel in color histograms, 4 levels make 64 bins
+    LEVELS = 4
+    # Ratio of check button pixels that have their colors found around, 0 to 1
+    THRESHOLD = 0.5
+
+    def __init__(self):
+        # Key: button name. Value: list of histograms, one for each frame
+        self.signatures = {}
+
+    @classmethod
+    def histogram(cls, image):
+        """
+        Args:
+            image (np.ndarray): RGB image.
+
+        Returns:
+            np.ndarray: Shape (LEVELS ** 3,), float32.
+        """
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        return cv2.calcHist([image], [0, 1, 2], None, [cls.LEVELS] * 3, [0, 256] * 3).ravel()
+
+    def signature(self, button):
+        """
+        Args:
+            button (Button):
+
+        Returns:
+            list[np.ndarray]: Histograms of each frame.
+        """
+        try:
+            return self.signatures[button.name]
+        except KeyError:
+            pass
+
+        button.ensure_template()
+        images = button.image if button.is_gif else [button.image]
+        signature = [self.histogram(image) for image in images]
+        self.signatures[button.name] = signature
+        return signature
+
+    def score(self, image, button, offset=(30, 30)):
+        """
+        Args:
+            image (np.ndarray): Screenshot.
+            button (Button):
+            offset (tuple): Detection area offset, (x, y).
+
+        Returns:
+            float: Ratio of button pixels that have their colors found around button area, 0 to 1.
+        """
+        area = np.array((-offset[0], -offset[1], offset[0], offset[1])) + button.area
+        around = self.histogram(FRAME_CACHE.crop(image, area))
+        return max(np.minimum(frame, around).sum() / max(frame.sum(), 1) for frame in self.signature(button))
+
+    def candidates(self, image, pages, offset=(30, 30)):
+        """
+        Args:
+            image (np.ndarray): Screenshot.
+            pages (dict): Key: Page, in the original order. Value: list[Button], check buttons of the page.
+            offset (tuple): Detection area offset, (x, y).
+
+        Returns:
+            list[Page]: All pages, likely ones first.
+        """
+        likely, others = [], []
+        for page, buttons in pages.items():
+            if any(self.score(image, button, offset=offset) >= self.THRESHOLD for button in buttons):
+                likely.append(page)
+            else:
+                others.append(page)
+
+        return likely + others
+
+
+PAGE_INDEX = PageIndex()
@@ -19,6 +19,7 @@ from module.os_handler.assets import (AUTO_SEARCH_REWARD, EXCHANGE_CHECK, RESET_
 from module.raid.assets import *
 from module.ui.assets import *
 from module.ui.page import (Page, page_campaign, page_event, page_main, page_main_white, page_sp)
+from module.ui.page_index import PAGE_INDEX
 from module.ui_white.assets import *
 
 
@@ -40,6 +41,24 @@ class UI(InfoHandler):
             return False
         return self.appear(page.check_button, offset=offset, interval=interval)
 
+    @staticmethod
+    def ui_page_check_buttons():
+        """
+        Returns:
+            dict: Key: Page, in the order of Page.iter_pages().
+                Value: list[Button], buttons checked in ui_page_appear().
+        """
+        pages = {}
+        for page in Page.iter_pages():
+            if page.check_button is None:
+                continue
+            # page_main_white is always detected as page_main
+            if page == page_main_white:
+                continue
+            pages[page] = [page.check_button]
+        pages[page_main] = [page_main_white.check_button, page_main.check_button]
+        return pages
+
     def is_in_main(self, offset=(30, 30), interval=0):
         return self.ui_page_appear(page_main, offset=offset, interval=interval)
 
@@ -183,9 +202,7 @@ class UI(InfoHandler):
                 break
 
             # Known pages
-            for page in Page.iter_pages():
-                if page.check_button is None:
-                    continue
+            for page in PAGE_INDEX.candidates(self.device.image, self.ui_page_check_buttons()):
                 if self.ui_page_appear(page=page):
                     logger.attr("UI", page.name)
                     self.ui_current = page
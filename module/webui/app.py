@@ -109,6 +109,8 @@ class AlasGUI(Frame):
         self.alas_name = ""
         self.alas_mod = "alas"
         self.alas_config = AzurLaneConfig("template")
+        # (scheduler, revision, alive) of the rendered overview tasks
+        self.overview_task_state = None
         self.initial()
 
     @use_scope("aside", clear=True)
@@ -420,6 +422,7 @@ class AlasGUI(Frame):
 
         self.task_handler.add(switch_scheduler.g(), 1, True)
         self.task_handler.add(switch_log_scroll.g(), 1, True)
+        self.overview_task_state = None
         self.task_handler.add(self.alas_update_overview_task, 10, True)
         self.task_handler.add(log.put_log(self.alas), 0.25, True)
 
@@ -513,6 +516,13 @@ class AlasGUI(Frame):
         self.alas_config.load()
         self.alas_config.get_next_task()
 
+        # Skip rendering if scheduler queue is unchanged
+        scheduler = self.alas_config.scheduler
+        state = (id(scheduler), scheduler.revision, self.alas.alive)
+        if state == self.overview_task_state:
+            return
+        self.overview_task_state = state
+
         if len(self.alas_config.pending_task) >= 1:
             if self.alas.alive:
                 running = self.alas_config.pending_task[:1]
@@ -1371,7 +1381,7 @@ def startup():
     if State.deploy_config.DiscordRichPresence:
         init_discord_rpc()
     if State.deploy_config.StartOcrServer:
-        start_ocr_server_process(State.deploy_config.OcrServerPort)
+        start_ocr_server_process(State.deploy_config.OcrServerPort, State.deploy_config.OcrServerWorkers)
     if (
         State.deploy_config.EnableRemoteAccess
         and State.deploy_config.Password is not None
@@ -0,0 +1,127 @@
+import threading
+from multiprocessing.connection import Connection
+from typing import List
+
+from rich.console import ConsoleRenderable
+
+
+class LogPipeWriter:
+    """
+    Send log renderables from Alas process to GUI process, in batches.
+
+    Logs used to go through a `multiprocessing.Manager().Queue()`,
+    every log line was a request to the manager process, then another request to fetch it.
+    Here logs are collected in a list and sent through a pipe by a background thread,
+    so logging never blocks on the GUI, and a burst of logs is one send.
+    """
+
+    def __init__(self, conn: Connection, interval: float = 0.05):
+        """
+        Args:
+            conn: Sending end of `multiprocessing.Pipe(duplex=False)`
+            interval: Seconds to wait for more logs before sending.
+        """
+        self.conn = conn
+        self.interval = interval
+        self.buffer: List[ConsoleRenderable] = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.send_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="LogPipeWriter", daemon=True)
+        self.thread.start()
+
+    def put(self, renderable: ConsoleRenderable) -> None:
+        with self.condition:
+            if self.closed:
+                return
+            self.buffer.append(renderable)
+            if len(self.buffer) == 1:
+                self.condition.notify()
+
+    def _send(self) -> bool:
+        with self.condition:
+            batch, self.buffer = self.buffer, []
+        if not batch:
+            return True
+        try:
+            with self.send_lock:
+                self.conn.send(batch)
+            return True
+        except (OSError, EOFError, ValueError):
+            # GUI closed the pipe, nobody is reading
+            return False
+
+    def _run(self) -> None:
+        while 1:
+            with self.condition:
+                while not self.buffer and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+            # Collect logs in a short period into one batch
+            with self.condition:
+                self.condition.wait(timeout=self.interval)
+            if not self._send():
+                with self.condition:
+                    self.closed = True
+                    self.buffer = []
+                return
+
+    def close(self) -> None:
+        """
+        Send remaining logs and close the pipe.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout=1)
+        self._send()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+
+class LogPipeReader:
+    """
+    Receive log renderables sent by `LogPipeWriter`.
+    """
+
+    def __init__(self, conn: Connection):
+        """
+        Args:
+            conn: Receiving end of `multiprocessing.Pipe(duplex=False)`
+        """
+        self.conn = conn
+        self.eof = False
+
+    def read(self, timeout: float = 1) -> List[ConsoleRenderable]:
+        """
+        Args:
+            timeout: Seconds to wait for the first batch.
+
+        Returns:
+            All logs received, or empty list if timeout or the other end closed.
+        """
+        renderables = []
+        if self.eof:
+            return renderables
+        try:
+            if not self.conn.poll(timeout):
+                return renderables
+            # Batched read, drain everything already in the pipe
+            while 1:
+                renderables.extend(self.conn.recv())
+                if not self.conn.poll(0):
+                    break
+        except (EOFError, OSError):
+            self.eof = True
+        return renderables
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        except OSError:
+            pass
@@ -1,9 +1,9 @@
 import argparse
 import os
-import queue
 import threading
-from multiprocessing import Process
-from typing import Dict, List, Union
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, Hashable, List, Tuple, Union
 
 import inflection
 from filelock import FileLock
@@ -14,6 +14,7 @@ from module.logger import logger, set_file_logger, set_func_logger
 from module.submodule.submodule import load_mod
 from module.submodule.utils import get_available_func, get_available_mod, get_available_mod_func, get_config_mod, \
     get_func_mod, list_mod_instance
+from module.webui.log_pipe import LogPipeReader, LogPipeWriter
 from module.webui.setting import State
 
 
@@ -22,10 +23,20 @@ class ProcessManager:
 
     def __init__(self, config_name: str = "alas") -> None:
         self.config_name = config_name
-        self._renderable_queue: queue.Queue[ConsoleRenderable] = State.manager.Queue()
+        self._log_reader: LogPipeReader = None
         self.renderables: List[ConsoleRenderable] = []
+        # Sequence number of renderables[0], increases when old renderables are dropped
+        self.renderables_offset = 0
         self.renderables_max_length = 400
         self.renderables_reduce_length = 80
+        self._renderables_lock = threading.Lock()
+        # Key: render key, such as (width, theme). Value: (sequence number of the first, rendered logs)
+        # Logs are rendered once for each layout, and shared by all viewers
+        self._rendered: Dict[Hashable, Tuple[int, List[str]]] = {}
+        self._rendered_max_keys = 8
+        self._rendered_lock = threading.Lock()
+        # (sequence number of the last renderable, its plain text)
+        self._last_text: Tuple[int, str] = (-1, "")
         self._process: Process = None
         self.thd_log_queue_handler: threading.Thread = None
 
@@ -33,16 +44,23 @@ class ProcessManager:
         if not self.alive:
             if func is None:
                 func = get_config_mod(self.config_name)
+            if self.thd_log_queue_handler is not None:
+                # Previous handler is draining logs of the last run
+                self.thd_log_queue_handler.join(timeout=1)
+            reader, writer = Pipe(duplex=False)
             self._process = Process(
                 target=ProcessManager.run_process,
                 args=(
                     self.config_name,
                     func,
-                    self._renderable_queue,
+                    writer,
                     ev,
                 ),
             )
             self._process.start()
+            # Only the child process holds the sending end, so reader gets EOF when child exits
+            writer.close()
+            self._log_reader = LogPipeReader(reader)
             self.start_log_queue_handler()
 
     def start_log_queue_handler(self):
@@ -61,9 +79,11 @@ class ProcessManager:
         with lock:
             if self.alive:
                 self._process.kill()
-                self.renderables.append(
+                if self.thd_log_queue_handler is not None:
+                    self.thd_log_queue_handler.join(timeout=1)
+                self.append_renderables([
                     f"[{self.config_name}] exited. Reason: Manual stop\n"
-                )
+                ])
             if self.thd_log_queue_handler is not None:
                 self.thd_log_queue_handler.join(timeout=1)
                 if self.thd_log_queue_handler.is_alive():
@@ -73,16 +93,97 @@ class ProcessManager:
         logger.info(f"[{self.config_name}] exited")
 
     def _thread_log_queue_handler(self) -> None:
+        reader = self._log_reader
         while self.alive:
-            try:
-                log = self._renderable_queue.get(timeout=1)
-            except queue.Empty:
-                continue
-            self.renderables.append(log)
-            if len(self.renderables) > self.renderables_max_length:
-                self.renderables = self.renderables[self.renderables_reduce_length :]
+            self.append_renderables(reader.read(timeout=1))
+        # Drain logs sent right before exit, such as the exit reason
+        while not reader.eof:
+            renderables = reader.read(timeout=0.5)
+            if not renderables:
+                break
+            self.append_renderables(renderables)
+        reader.close()
         logger.info("End of log queue handler loop")
 
+    def append_renderables(self, renderables: List[ConsoleRenderable]) -> None:
+        if not renderables:
+            return
+        with self._renderables_lock:
+            self.renderables.extend(renderables)
+            if len(self.renderables) > self.renderables_max_length:
+                # Drop in chunks, so the list isn't sliced on every log
+                reduce = len(self.renderables) - self.renderables_max_length + self.renderables_reduce_length
+                self.renderables = self.renderables[reduce:]
+                self.renderables_offset += reduce
+
+    @property
+    def renderables_seq(self) -> int:
+        """
+        Sequence number of the next renderable.
+        """
+        return self.renderables_offset + len(self.renderables)
+
+    def get_renderables(self, seq: int = 0) -> Tuple[int, List[ConsoleRenderable]]:
+        """
+        Args:
+            seq: Sequence number of the first renderable wanted, renderables already dropped are skipped.
+
+        Returns:
+            Sequence number of the next renderable, which is the `seq` for the next call.
+            Renderables since `seq`.
+        """
+        with self._renderables_lock:
+            start = max(seq - self.renderables_offset, 0)
+            return self.renderables_offset + len(self.renderables), self.renderables[start:]
+
+    def get_rendered(
+        self, seq: int, key: Hashable, render: Callable[[ConsoleRenderable], str]
+    ) -> Tuple[int, List[str]]:
+        """
+        Same as `get_renderables()`, but returns rendered logs.
+        Each log is rendered once for each `key`, viewers with the same key share the results.
+
+        Args:
+            seq: Sequence number of the first log wanted.
+            key: Viewers that render logs in the same way should have the same key, such as (width, theme).
+            render: Function to render a renderable.
+
+        Returns:
+            Sequence number of the next log, rendered logs since `seq`.
+        """
+        with self._rendered_lock:
+            with self._renderables_lock:
+                offset = self.renderables_offset
+                renderables = self.renderables[:]
+            cached_offset, rendered = self._rendered.pop(key, (offset, []))
+            if cached_offset != offset:
+                # Old logs dropped
+                rendered = rendered[offset - cached_offset:]
+            if len(rendered) < len(renderables):
+                rendered = rendered + [render(r) for r in renderables[len(rendered):]]
+            # Keep recently used keys only
+            self._rendered[key] = (offset, rendered)
+            while len(self._rendered) > self._rendered_max_keys:
+                self._rendered.pop(next(iter(self._rendered)))
+        return offset + len(rendered), rendered[max(seq - offset, 0):]
+
+    @property
+    def last_text(self) -> str:
+        """
+        Plain text of the last log, rendered once for each new log.
+        """
+        with self._renderables_lock:
+            seq = self.renderables_offset + len(self.renderables) - 1
+            if seq < 0:
+                return ""
+            renderable = self.renderables[-1]
+        if self._last_text[0] != seq:
+            console = Console(no_color=True)
+            with console.capture() as capture:
+                console.print(renderable)
+            self._last_text = (seq, capture.get().strip())
+        return self._last_text[1]
+
     @property
     def alive(self) -> bool:
         if self._process is not None:
@@ -97,10 +198,7 @@ class ProcessManager:
         elif len(self.renderables) == 0:
             return 2
         else:
-            console = Console(no_color=True)
-            with console.capture() as capture:
-                console.print(self.renderables[-1])
-            s = capture.get().strip()
+            s = self.last_text
             if s.endswith("Reason: Manual stop"):
                 return 2
             elif s.endswith("Reason: Finish"):
@@ -121,7 +219,7 @@ class ProcessManager:
 
     @staticmethod
     def run_process(
-        config_name, func: str, q: queue.Queue, e: threading.Event = None
+        config_name, func: str, conn: Connection, e: threading.Event = None
     ) -> None:
         parser = argparse.ArgumentParser()
         parser.add_argument(
@@ -137,7 +235,8 @@ class ProcessManager:
             logger.info("Electron detected, remove log output to stdout")
             from module.logger import console_hdlr
             logger.removeHandler(console_hdlr)
-        set_func_logger(func=q.put)
+        log_writer = LogPipeWriter(conn)
+        set_func_logger(func=log_writer.put)
 
         from module.config.config import AzurLaneConfig
 
@@ -167,6 +266,8 @@ class ProcessManager:
             logger.info(f"[{config_name}] exited. Reason: Finish\n")
         except Exception as e:
             logger.exception(e)
+        finally:
+            log_writer.close()
 
     @classmethod
     def running_instances(cls) -> List["ProcessManager"]:
@@ -1,12 +1,13 @@
 import datetime
-import operator
+import heapq
+import itertools
 import re
 import sys
 import threading
 import time
 import traceback
 from queue import Queue
-from typing import Callable, Generator, List
+from typing import Callable, Dict, Generator, List
 
 import pywebio
 from module.config.utils import deep_iter
@@ -103,6 +104,14 @@ class Task:
         self.delay = delay
         self.next_run = next_run if next_run else time.time()
         self.name = name if name is not None else self.g.__name__
+        # Seconds spent in the last run
+        self.runtime = 0.
+        # Seconds between scheduled time and actual start time of the last run
+        self.lag = 0.
+        self.total_runtime = 0.
+        self.runs = 0
+        # Heap entry in TaskHandler
+        self.entry = None
 
     def __str__(self) -> str:
         return f"<{self.name} (delay={self.delay})>"
@@ -117,6 +126,14 @@ class Task:
 
 
 class TaskHandler:
+    """
+    Run generator tasks periodically in one thread.
+
+    Tasks are kept in a heap keyed by next_run, the loop sleeps on a condition variable
+    until the next task is due, or a task is added, or handler stopped.
+    Heap entries of removed tasks are dropped when they reach the top.
+    """
+
     def __init__(self) -> None:
         # List of background running task
         self.tasks: List[Task] = []
@@ -128,6 +145,16 @@ class TaskHandler:
         self._thread: threading.Thread = None
         self._alive = False
         self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        # Heap of (next_run, counter, task), counter breaks ties in adding order
+        self._heap = []
+        self._counter = itertools.count()
+
+    def _push(self, task: Task) -> None:
+        # Only the latest entry of a task is valid
+        task.entry = next(self._counter)
+        heapq.heappush(self._heap, (task.next_run, task.entry, task))
+        self._condition.notify()
 
     def add(self, func, delay: float, pending_delete: bool = False) -> None:
         """
@@ -151,6 +178,7 @@ class TaskHandler:
         logger.info(f"Add task {task}")
         with self._lock:
             self.tasks.append(task)
+            self._push(task)
         if pending_delete:
             self.pending_remove_tasks.append(task)
 
@@ -196,40 +224,83 @@ class TaskHandler:
                     return task
             return None
 
+    def _wait_task(self) -> Task:
+        """
+        Block until the next task is due.
+
+        Returns:
+            The task to run, or None if handler stopped.
+        """
+        with self._condition:
+            while self._alive:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                next_run, entry, task = self._heap[0]
+                if task not in self.tasks or entry != task.entry:
+                    # Removed or rescheduled
+                    heapq.heappop(self._heap)
+                    continue
+                wait = next_run - time.time()
+                if wait > 0:
+                    self._condition.wait(timeout=wait)
+                    continue
+                heapq.heappop(self._heap)
+                return task
+            return None
+
     def loop(self) -> None:
         """
         Start task loop.
         You **should** run this function in an individual thread.
         """
-        self._alive = True
-        while self._alive:
-            if self.tasks:
-                with self._lock:
-                    self.tasks.sort(key=operator.attrgetter("next_run"))
-                    task = self.tasks[0]
-                if task.next_run < time.time():
-                    start_time = time.time()
-                    try:
-                        self._task = task
-                        # logger.debug(f'Start task {task.g.__name__}')
-                        task.send(self)
-                        # logger.debug(f'End task {task.g.__name__}')
-                    except Exception as e:
-                        logger.exception(e)
-                        self.remove_task(task, nowait=True)
-                    finally:
-                        self._task = None
-                    end_time = time.time()
-                    task.next_run += task.delay
-                    with self._lock:
-                        for task in self.tasks:
-                            task.next_run += end_time - start_time
-                else:
-                    time.sleep(0.05)
-            else:
-                time.sleep(0.5)
+        with self._lock:
+            self._alive = True
+        while 1:
+            task = self._wait_task()
+            if task is None:
+                break
+            start_time = time.time()
+            task.lag = start_time - task.next_run
+            try:
+                self._task = task
+                # logger.debug(f'Start task {task.g.__name__}')
+                task.send(self)
+                # logger.debug(f'End task {task.g.__name__}')
+            except Exception as e:
+                logger.exception(e)
+                self.remove_task(task, nowait=True)
+            finally:
+                self._task = None
+            end_time = time.time()
+            task.runtime = end_time - start_time
+            task.total_runtime += task.runtime
+            task.runs += 1
+            # Run at fixed rate, but don't run repeatedly to catch up if task was blocked
+            task.next_run = max(task.next_run + task.delay, end_time)
+            with self._lock:
+                if task in self.tasks:
+                    self._push(task)
         logger.info("End of task handler loop")
 
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            Key: task name. Value: runs, last runtime, average runtime and last lag in seconds.
+        """
+        with self._lock:
+            tasks = self.tasks.copy()
+        return {
+            task.name: {
+                "runs": task.runs,
+                "runtime": task.runtime,
+                "average": task.total_runtime / task.runs if task.runs else 0.,
+                "lag": task.lag,
+            }
+            for task in tasks
+        }
+
     def _get_thread(self) -> threading.Thread:
         thread = threading.Thread(target=self.loop, daemon=True)
         return thread
@@ -247,7 +318,9 @@ class TaskHandler:
 
     def stop(self) -> None:
         self.remove_pending_task()
-        self._alive = False
+        with self._lock:
+            self._alive = False
+            self._condition.notify_all()
         self._thread.join(timeout=2)
         if not self._thread.is_alive():
             logger.info("Finish task handler")
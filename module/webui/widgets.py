@@ -190,21 +190,20 @@ class RichLog:
         yield
         try:
             while True:
-                last_idx = len(pm.renderables)
-                html = "".join(map(self.render, pm.renderables[:]))
+                # Fetch logs by sequence number, so dropping old logs won't affect the cursor.
+                # Logs are rendered once and shared with other viewers of the same width and theme,
+                # only the logs after cursor are sent.
+                key = (self.console.width, self.terminal_theme)
+                seq, rendered = pm.get_rendered(0, key=key, render=self.render)
                 self.reset()
-                self.extend(html)
-                counter = last_idx
+                self.extend("".join(rendered))
+                counter = len(rendered)
                 while counter < pm.renderables_max_length * 2:
                     yield
-                    idx = len(pm.renderables)
-                    if idx < last_idx:
-                        last_idx -= pm.renderables_reduce_length
-                    if idx != last_idx:
-                        html = "".join(map(self.render, pm.renderables[last_idx:idx]))
-                        self.extend(html)
-                        counter += idx - last_idx
-                        last_idx = idx
+                    seq, rendered = pm.get_rendered(seq, key=key, render=self.render)
+                    if rendered:
+                        self.extend("".join(rendered))
+                        counter += len(rendered)
         except SessionException:
             pass
 
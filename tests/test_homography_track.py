@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from module.config.config import AzurLaneConfig
+from module.map_detection.homography import Homography
+from module.map_detection.utils import perspective_transform
+from module.map_detection.utils_assets import ASSETS
+
+STORAGE = ((8, 3), [(80.773, 281.635), (1164.829, 281.635), (-20.123, 609.332), (1259.794, 609.332)])
+
+
+@pytest.fixture(scope='module')
+def config():
+    return AzurLaneConfig('template')
+
+
+@pytest.fixture
+def homo(config):
+    hm = Homography(config)
+    hm.load_homography(storage=STORAGE)
+    return hm
+
+
+def lattice_image(homo, loca):
+    """
+    Draw tile centers on an empty image in homography space.
+
+    Args:
+        homo (Homography):
+        loca (np.ndarray): Lattice, same as `homo_loca`.
+
+    Returns:
+        np.ndarray: Monochrome image, as the edge image in `detect()`.
+    """
+    template = ASSETS.tile_center_image
+    height, width = template.shape
+    image = np.zeros(homo.homo_size[::-1], dtype=np.uint8)
+    tile = np.array(homo.config.HOMO_TILE)
+    first = (np.add(loca, homo.config.HOMO_CENTER_OFFSET)) % tile
+    for x in range(first[0], image.shape[1] - width + 1, tile[0]):
+        for y in range(first[1], image.shape[0] - height + 1, tile[1]):
+            image[y:y + height, x:x + width] = template
+    return image
+
+
+def screen_vector(homo, offset):
+    """
+    Args:
+        homo (Homography):
+        offset (tuple): Lattice movement in homography space.
+
+    Returns:
+        np.ndarray: Map movement on screen, starting from screen center.
+    """
+    center = np.subtract(homo.config.SCREEN_CENTER, homo.config.DETECTING_AREA[:2])
+    start = perspective_transform([center], data=homo.homo_data)[0]
+    end = perspective_transform([start + offset], data=homo.homo_invt)[0]
+    return end - center
+
+
+@pytest.mark.parametrize('offset', [(52, -225), (-97, 31), (140, 0)])
+def test_track_non_integer_tiles(homo, offset):
+    """
+    Swipe by fractions of a tile, predicted lattice should follow the map.
+    """
+    tile = np.array(homo.config.HOMO_TILE)
+    before = np.array([31, 77])
+    after = (before + offset) % tile
+    homo.track_loca = before.copy()
+
+    homo.track(screen_vector(homo, offset))
+    assert np.allclose(homo.track_loca, after, atol=0.01)
+
+    assert homo.search_tile_track(lattice_image(homo, after), threshold=homo.config.HOMO_CENTER_GOOD_THRESHOLD)
+    assert np.array_equal(homo.homo_loca % tile, after)
+
+
+def test_track_without_movement_misses(homo):
+    """
+    Lattice moved without `track()`, tracked search should fail and fallback to full search.
+    """
+    before = np.array([31, 77])
+    after = (before + (52, -225)) % homo.config.HOMO_TILE
+    homo.track_loca = before.copy()
+
+    assert not homo.search_tile_track(lattice_image(homo, after), threshold=homo.config.HOMO_CENTER_GOOD_THRESHOLD)
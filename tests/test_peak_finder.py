@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from module.config.config_manual import ManualConfig
+from module.map_detection.peak_finder import PeakFinder
+
+AREA = ManualConfig.DETECTING_AREA
+PARAMETERS = {
+    'internal': (ManualConfig.INTERNAL_LINES_FIND_PEAKS_PARAMETERS, (0, 0)),
+    'edge': (ManualConfig.EDGE_LINES_FIND_PEAKS_PARAMETERS, (AREA[2] - AREA[0], AREA[3] - AREA[1])),
+    'os_globe': (ManualConfig.OS_GLOBE_FIND_PEAKS_PARAMETERS, (0, 0)),
+    'os_local': (ManualConfig.OS_LOCAL_FIND_PEAKS_PARAMETERS, (0, 0)),
+}
+
+
+def scipy_image(image, is_horizontal, param, pad=0):
+    """
+    Peaks in flattened image by scipy, as Perspective.find_peaks before PeakFinder.
+    """
+    if is_horizontal:
+        image = image.T
+    if pad:
+        image = np.pad(image, ((0, 0), (0, pad)), mode='constant', constant_values=255)
+    out = np.zeros(image.size, dtype=np.uint8)
+    out[signal.find_peaks(image.ravel(), **param)[0]] = 255
+    out = out.reshape(image.shape)
+    if pad:
+        out = out[:, :-pad]
+    if is_horizontal:
+        out = out.T
+    return out
+
+
+def random_signal(random, length):
+    """
+    Random signal with flat peaks and plateaus, which are the corner cases.
+    """
+    x = random.randint(100, 256, length).astype(np.uint8)
+    return np.repeat(x, random.randint(1, 4, len(x)))
+
+
+def random_image(random, shape):
+    """
+    Random image with lines, flats and long plateaus.
+    """
+    image = random.randint(0, 256, (shape[0] // 4 + 1, shape[1] // 3 + 1)).astype(np.uint8)
+    image = np.repeat(np.repeat(image, 4, axis=0), 3, axis=1)[:shape[0], :shape[1]].copy()
+    image[:, random.randint(0, shape[1], 5)] = 240
+    image[random.randint(0, shape[0], 5), :] = 230
+    image[:shape[0] // 5, :shape[1] // 5] = 255
+    return image
+
+
+@pytest.mark.parametrize('name', list(PARAMETERS))
+def test_find_peaks_parity(name):
+    param, _ = PARAMETERS[name]
+    finder = PeakFinder()
+    random = np.random.RandomState(0)
+    for _ in range(100):
+        x = random_signal(random, random.randint(3, 5000))
+        assert np.array_equal(finder.find_peaks(x, **param), signal.find_peaks(x, **param)[0])
+
+
+@pytest.mark.parametrize('name', list(PARAMETERS))
+def test_image_hv_parity(name):
+    param, pad = PARAMETERS[name]
+    finder = PeakFinder()
+    random = np.random.RandomState(1)
+    for shape in [(60, 80), (120, 50), (60, 80)]:
+        image = random_image(random, shape)
+        mask = (random.rand(*shape) > 0.1).astype(np.uint8) * 255
+        hori, vert = finder.image_hv(image, param=param, pad=pad, mask=mask)
+        assert np.array_equal(hori, scipy_image(image, True, param, pad=pad[0]) & mask)
+        assert np.array_equal(vert, scipy_image(image, False, param, pad=pad[1]) & mask)
+        assert np.array_equal(finder.image(image, True, param, pad=pad[0]), scipy_image(image, True, param, pad[0]))
+        assert np.array_equal(finder.image(image, False, param, pad=pad[1]), scipy_image(image, False, param, pad[1]))
+
+
+def test_image_hv_segments_independent():
+    """
+    Peaks at the end of horizontal pass should not see samples of vertical pass.
+    """
+    param, _ = PARAMETERS['internal']
+    image = np.full((40, 60), 100, dtype=np.uint8)
+    # Rising edge at the last sample of horizontal pass, flat at the first samples of vertical pass
+    image[-1, -1] = 200
+    image[0, :3] = 200
+    image[:, 30] = 160
+    hori, vert = PeakFinder().image_hv(image, param=param)
+    assert np.array_equal(hori, scipy_image(image, True, param))
+    assert np.array_equal(vert, scipy_image(image, False, param))
+
+
+def test_unsupported_parameters():
+    param = {'height': 150, 'threshold': 1}
+    image = random_image(np.random.RandomState(2), (50, 70))
+    hori, vert = PeakFinder().image_hv(image, param=param)
+    assert np.array_equal(hori, scipy_image(image, True, param))
+    assert np.array_equal(vert, scipy_image(image, False, param))